@@ -1,15 +1,38 @@
 from dataclasses import dataclass
 from typing import Sequence
-import aiosqlite
-from pydantic_ai import Agent, Tool
+from pydantic_ai import Agent, RunContext, Tool
 from pydantic_ai.models.groq import GroqModel
 
+from ai_services.snapshot import CustomerSnapshot
 from config.settings import Settings
+from customer_transaction_db.analytics import TransactionAnalytics
+from customer_transaction_db.connection import SQLiteConnectionPool
 
 @dataclass
 class Dependencies:
     settings: Settings
-    sqlite_db: aiosqlite.Connection
+    transactions_db: SQLiteConnectionPool
+    analytics: TransactionAnalytics | None = None
+    customer_id: str = ""
+    snapshot: CustomerSnapshot | None = None
+
+
+def customer_snapshot_instructions(ctx: RunContext[Dependencies]) -> str | None:
+    """
+    Instructions giving the agent the customer snapshot of the session, once prefetched.
+
+    Instructions are sent with every request, whatever the message history, unlike the
+    system prompt.
+
+    Args:
+        ctx: The context of the current run.
+
+    Returns:
+        The snapshot, or None while it is not ready.
+    """
+    if ctx.deps.snapshot is None:
+        return None
+    return ctx.deps.snapshot.instructions()
 
 
 def create_groq_agent(
@@ -18,7 +41,8 @@ def create_groq_agent(
     system_prompt: str,
 ) -> Agent[Dependencies]:
     """
-    Creates a PydanticAI Agent that uses Groq models.
+    Creates a PydanticAI Agent that uses Groq models, given the customer snapshot of the
+    session when there is one.
 
     Args:
         groq_model: Groq model for PydanticAI.
@@ -31,5 +55,23 @@ def create_groq_agent(
         model=groq_model,
         deps_type=Dependencies,
         system_prompt=system_prompt,
+        instructions=customer_snapshot_instructions,
         tools=tools,
     )
+
+
+def create_summary_agent(groq_model: GroqModel) -> Agent[None]:
+    """
+    Creates a PydanticAI Agent, without tools, that summarizes conversations.
+
+    Args:
+        groq_model: Groq model for PydanticAI.
+
+    Returns:
+        PydanticAI Agent writing conversation summaries.
+    """
+
+    return Agent(
+        model=groq_model,
+        system_prompt="You write short, factual summaries of conversations.",
+    )
@@ -0,0 +1,181 @@
+import asyncio
+import math
+import re
+from typing import Awaitable, Callable
+
+from loguru import logger
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelMessage, ModelRequest, SystemPromptPart
+
+from ai_services.utils import format_messages_for_agent
+from convo_history_db.writer import Message
+
+# Tokens a message costs on top of its content (role and separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+type Summarizer = Callable[[str, list[Message], int], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens of a text without a tokenizer: a word or punctuation
+    mark is a token, and long words count one token per four characters.
+
+    Args:
+        text: Text to estimate.
+
+    Returns:
+        Estimated number of tokens.
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECES.findall(text))
+
+
+def create_agent_summarizer(agent: Agent[None]) -> Summarizer:
+    """
+    Creates a summarizer folding messages into a running summary with an agent.
+
+    Args:
+        agent: Agent writing the summaries.
+
+    Returns:
+        Function taking the previous summary, the messages to fold in and the maximum
+        number of tokens of the summary, and returning the new summary.
+    """
+
+    async def summarize(
+        summary: str, messages: list[Message], max_tokens: int
+    ) -> str:
+        transcript = "\n".join(f"{m.sender}: {m.content}" for m in messages)
+        prompt = (
+            "Update the summary of a conversation between a bank customer (user) and "
+            "their banking assistant (agent) with the new messages below. Keep the "
+            "amounts, dates, merchants, categories and any open requests. Answer with "
+            f"the summary only, in at most {max_tokens * 3 // 4} words.\n\n"
+            f"Summary so far:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+        )
+        result = await agent.run(prompt)
+        return result.output.strip()
+
+    return summarize
+
+
+class ConversationContext:
+    """
+    Bounded context of a conversation for the agent: the most recent messages that fit
+    in a token budget, preceded by a running summary of the older ones.
+
+    The summary is brought up to date in the background after a turn completes, never
+    while a turn waits for its answer. Until it catches up, messages that left the window
+    but are not summarized yet are omitted.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        summary_max_tokens: int = 300,
+        summarizer: Summarizer | None = None,
+    ) -> None:
+        """
+        Initializes the ConversationContext object.
+
+        Args:
+            max_tokens: Budget of the context, summary included.
+            summary_max_tokens: Part of the budget reserved for the summary.
+            summarizer: Function writing the summary. Older messages are dropped if None.
+        """
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer
+        self.summary = ""
+        self.summarized = 0
+        self._summarizing: asyncio.Task[None] | None = None
+
+    def window_start(self, history: list[Message]) -> int:
+        """
+        Finds the oldest message of the window: the most recent messages fitting in the
+        budget left by the summary, starting with a user message.
+
+        Args:
+            history: Messages of the conversation, oldest first.
+
+        Returns:
+            Position of the first message of the window in the history.
+        """
+        budget = self.max_tokens - self.summary_max_tokens
+        start = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            budget -= estimate_tokens(history[i].content) + MESSAGE_OVERHEAD_TOKENS
+            if budget < 0:
+                break
+            start = i
+        while start < len(history) and history[start].sender != "user":
+            start += 1
+        return start
+
+    def messages(self, history: list[Message]) -> list[ModelMessage]:
+        """
+        Builds the message history of the next turn.
+
+        Args:
+            history: Messages of the conversation, oldest first.
+
+        Returns:
+            The summary of the older messages, if any, and the messages of the window.
+        """
+        start = self.window_start(history)
+        messages = format_messages_for_agent(conversation_history=history[start:])
+        if self.summary and start > 0:
+            messages.insert(
+                0,
+                ModelRequest(
+                    parts=[
+                        SystemPromptPart(
+                            content=f"Summary of the earlier conversation: {self.summary}"
+                        )
+                    ]
+                ),
+            )
+        return messages
+
+    def update(self, history: list[Message]) -> None:
+        """
+        Starts summarizing, in the background, the messages that left the window, unless
+        a summary is already being written.
+
+        Args:
+            history: Messages of the conversation, oldest first.
+        """
+        if self.summarizer is None or (self._summarizing and not self._summarizing.done()):
+            return
+        start = self.window_start(history)
+        if start <= self.summarized:
+            return
+        self._summarizing = asyncio.create_task(
+            self._summarize(history[self.summarized : start], start)
+        )
+
+    async def _summarize(self, messages: list[Message], upto: int) -> None:
+        """
+        Folds messages into the summary.
+
+        Args:
+            messages: Messages to fold in.
+            upto: Position in the history of the message following them.
+        """
+        assert self.summarizer is not None
+        try:
+            self.summary = await self.summarizer(self.summary, messages, self.summary_max_tokens)
+            self.summarized = upto
+            logger.debug(f"Summarized the conversation up to message {upto}")
+        except Exception as e:
+            logger.error(f"Error summarizing the conversation. Error: {e}")
+
+    async def close(self) -> None:
+        """
+        Cancels the summary being written, if any.
+        """
+        if self._summarizing is not None:
+            self._summarizing.cancel()
+            await asyncio.gather(self._summarizing, return_exceptions=True)
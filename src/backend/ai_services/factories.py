@@ -1,8 +1,26 @@
+from typing import cast
+
+import httpx
 from groq import AsyncGroq
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from pydantic_ai.models.groq import GroqModel
+from pydantic_ai.providers.groq import GroqProvider
 
+from ai_services.intents import IntentRouter
+from ai_services.tool_cache import ToolResultCache
 from config.settings import Settings
+from nlp_processor.segmentation import AdaptiveSegmenter
+from nlp_processor.local_tts import LocalSpeechSynthesis
+from nlp_processor.text_to_speech import (
+    OpenAISpeechSynthesis,
+    ResponseFormat,
+    SpeechSynthesisBackend,
+    SynthesisLimiter,
+    TextToSpeech,
+    Voice,
+)
+from nlp_processor.tts_cache import TTSCache
+from nlp_processor.tts_service import TTSService
 
 def create_groq_client(
     settings: Settings,
@@ -21,32 +39,185 @@ def create_groq_client(
 
 def create_openai_client(
     settings: Settings,
+    http_client: httpx.AsyncClient | None = None,
 ) -> AsyncOpenAI:
     """
     Creates a client for interacting with OpenAI API.
 
     Args:
         settings: Application settings.
+        http_client: HTTP client to use. The OpenAI default if None.
 
     Returns:
         Client for interacting with OpenAI API
     """
-    return AsyncOpenAI(api_key=settings.engine.OPENAI_API_KEY)
+    return AsyncOpenAI(
+        api_key=settings.engine.OPENAI_API_KEY,
+        http_client=http_client,
+    )
 
 
 def create_groq_model(
     groq_client: AsyncGroq,
+    model_name: str = "llama-3.3-70b-versatile",
 ) -> GroqModel:
     """
     Creates a Groq model for PydanticAI.
 
     Args:
         groq_client: Client for interacting with Groq API.
+        model_name: Name of the Groq model.
 
     Returns:
         Groq model for PydanticAI
     """
     return GroqModel(
-        model_name="llama-3.3-70b-versatile",
-        groq_client=groq_client,
+        model_name=model_name,
+        provider=GroqProvider(groq_client=groq_client),
     )
+
+
+def create_tts_cache(
+    settings: Settings,
+) -> TTSCache:
+    """
+    Creates the cache of synthesized audio shared by all text-to-speech handlers.
+
+    Args:
+        settings: Application settings.
+
+    Returns:
+        Cache of synthesized audio.
+    """
+    return TTSCache(
+        max_bytes=settings.tts.cache_max_bytes,
+        directory=settings.tts.cache_dir or None,
+        max_disk_bytes=settings.tts.cache_dir_max_bytes,
+    )
+
+
+def create_tts_handler(
+    settings: Settings,
+    backend: SpeechSynthesisBackend,
+    tts_cache: TTSCache | None = None,
+    limiter: SynthesisLimiter | None = None,
+) -> TextToSpeech:
+    """
+    Creates a handler for text-to-speech conversion.
+
+    Args:
+        settings: Application settings.
+        backend: Speech synthesis backend, the OpenAI API or the local engine.
+        tts_cache: Cache of synthesized audio.
+        limiter: Limiter capping concurrent syntheses in the process.
+
+    Returns:
+        Handler for text-to-speech conversion.
+    """
+    return TextToSpeech(
+        client=None,
+        backend=backend,
+        # the model is part of the cache keys, so that the voices are not mixed up
+        model_name=(
+            settings.tts.local_model if settings.tts.engine == "local" else settings.tts.model
+        ),
+        voice=cast(Voice, settings.tts.voice),
+        response_format=cast(ResponseFormat, settings.tts.response_format),
+        max_concurrency=settings.tts.max_concurrency,
+        segmenter=(
+            AdaptiveSegmenter()
+            if settings.tts.segmentation == "adaptive"
+            else None
+        ),
+        cache=tts_cache,
+        limiter=limiter,
+    )
+
+
+def create_tts_service(
+    settings: Settings,
+    local_tts: LocalSpeechSynthesis | None = None,
+) -> TTSService:
+    """
+    Creates the process-wide text-to-speech service, synthesizing with the local engine
+    if given, or else with its own OpenAI client whose HTTP connection pool is sized for
+    the synthesis concurrency.
+
+    Args:
+        settings: Application settings.
+        local_tts: Local text-to-speech engine, owned by the service once created.
+
+    Returns:
+        Text-to-speech service leasing handlers to connections.
+    """
+    backend: SpeechSynthesisBackend
+    if local_tts is not None:
+        backend = local_tts
+    else:
+        backend = OpenAISpeechSynthesis(
+            create_openai_client(
+                settings=settings,
+                http_client=DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.tts.max_connections,
+                        max_keepalive_connections=settings.tts.max_connections,
+                        keepalive_expiry=settings.tts.keepalive_expiry,
+                    ),
+                    http2=settings.tts.http2,
+                ),
+            )
+        )
+    tts_cache = create_tts_cache(settings=settings)
+    limiter = SynthesisLimiter(
+        max_concurrent=settings.tts.max_concurrent_syntheses
+    )
+    return TTSService(
+        backend=backend,
+        handler_factory=lambda: create_tts_handler(
+            settings=settings,
+            backend=backend,
+            tts_cache=tts_cache,
+            limiter=limiter,
+        ),
+        limiter=limiter,
+        cache=tts_cache,
+        max_idle_handlers=settings.tts.max_idle_handlers,
+    )
+
+
+def create_tool_cache(
+    settings: Settings,
+) -> ToolResultCache | None:
+    """
+    Creates the cache of tool results shared by all connections, if enabled.
+
+    Args:
+        settings: Application settings.
+
+    Returns:
+        Cache of tool results, or None if tool results are not cached.
+    """
+    if not settings.tool_cache.enabled:
+        return None
+    return ToolResultCache(
+        max_entries=settings.tool_cache.max_entries,
+        ttl=settings.tool_cache.ttl_seconds,
+    )
+
+
+def create_intent_router(
+    settings: Settings,
+) -> IntentRouter | None:
+    """
+    Creates the router answering greetings, thanks and goodbyes without the agent, if
+    enabled.
+
+    Args:
+        settings: Application settings.
+
+    Returns:
+        Router of trivial utterances, or None if every utterance goes to the agent.
+    """
+    if not settings.intent_router.enabled:
+        return None
+    return IntentRouter(max_words=settings.intent_router.max_words)
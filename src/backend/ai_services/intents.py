@@ -0,0 +1,156 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from loguru import logger
+
+from nlp_processor.tts_service import TTSService
+
+
+@dataclass(frozen=True)
+class Intent:
+    """
+    Trivial intent answered with a fixed response.
+
+    Attributes:
+        name: Name of the intent.
+        keywords: Words signalling the intent; one of them must be in the utterance.
+        companions: Other words the utterance may contain (e.g. "you" in "thank you").
+        response: Fixed response of the agent.
+    """
+
+    name: str
+    keywords: frozenset[str]
+    companions: frozenset[str]
+    response: str
+
+
+# Intents by priority: "thanks, bye" is a goodbye, "hi, thanks" is a thanks.
+INTENTS = (
+    Intent(
+        name="goodbye",
+        keywords=frozenset({"bye", "goodbye", "later", "night"}),
+        companions=frozenset({"see", "you", "good", "that", "thats", "all", "for", "now"}),
+        response="Goodbye! I am here to help you with your banking whenever you need.",
+    ),
+    Intent(
+        name="thanks",
+        keywords=frozenset({"thanks", "thank", "cheers"}),
+        companions=frozenset({"you", "very", "so", "much", "a", "lot", "many"}),
+        response="You're welcome! I am here to help you with your banking.",
+    ),
+    Intent(
+        name="greeting",
+        keywords=frozenset({"hi", "hello", "hey", "hiya", "howdy", "morning", "afternoon", "evening"}),
+        companions=frozenset({"there", "good"}),
+        response="Hello! I am here to help you with your banking.",
+    ),
+)
+
+# Words that do not change a trivial intent.
+FILLER_WORDS = frozenset(
+    {"oh", "um", "uh", "ok", "okay", "alright", "great", "perfect", "well", "and", "assistant"}
+)
+
+
+@dataclass
+class CannedResponse:
+    """
+    Response of a recognized intent.
+
+    Attributes:
+        intent: Name of the intent.
+        text: Text of the response.
+        audio: Chunks of the pre-rendered audio of the response, None if not rendered.
+    """
+
+    intent: str
+    text: str
+    audio: list[bytes] | None
+
+
+class IntentRouter:
+    """
+    Recognizes utterances that are only a greeting, thanks or goodbye, so that they are
+    answered with a fixed response and its pre-rendered audio, without the language
+    model or a synthesis.
+
+    An utterance is routed only if all its words belong to a single trivial exchange
+    (e.g. "Thanks a lot, bye!"); any other word (e.g. "Hi, what did I spend?") leaves it
+    to the agent.
+    """
+
+    def __init__(self, intents: tuple[Intent, ...] = INTENTS, max_words: int = 6) -> None:
+        """
+        Initializes the IntentRouter object.
+
+        Args:
+            intents: Intents to recognize, by priority.
+            max_words: Maximum number of words of a routed utterance.
+        """
+        self.intents = intents
+        self.max_words = max_words
+        self._vocabulary = FILLER_WORDS.union(
+            *(intent.keywords | intent.companions for intent in intents)
+        )
+        self._audio: dict[str, list[bytes]] = {}
+        self.checked = 0
+        self.routed: Counter[str] = Counter()
+
+    def match(self, transcription: str) -> CannedResponse | None:
+        """
+        Recognizes the trivial intent of an utterance.
+
+        Args:
+            transcription: Transcribed utterance of the user.
+
+        Returns:
+            Response of the intent, or None if the utterance is for the agent.
+        """
+        self.checked += 1
+        words = re.findall(r"[a-z]+", transcription.lower().replace("'", ""))
+        if not words or len(words) > self.max_words:
+            return None
+        if not all(word in self._vocabulary for word in words):
+            return None
+        for intent in self.intents:
+            if not intent.keywords.isdisjoint(words):
+                self.routed[intent.name] += 1
+                return CannedResponse(
+                    intent=intent.name,
+                    text=intent.response,
+                    audio=self._audio.get(intent.name),
+                )
+        return None
+
+    async def render(self, tts_service: TTSService) -> None:
+        """
+        Synthesizes the audio of the responses. Until a response is rendered, it is
+        synthesized when used.
+
+        Args:
+            tts_service: Text-to-speech service of the application.
+        """
+        try:
+            async with tts_service.lease() as tts_handler:
+                for intent in self.intents:
+                    audio = [chunk async for chunk in tts_handler.feed(intent.response)]
+                    audio += [chunk async for chunk in tts_handler.flush()]
+                    self._audio[intent.name] = audio
+            logger.info(f"Rendered the responses of {len(self._audio)} intents")
+        except Exception as e:
+            logger.warning(f"Could not render the intent responses. Error: {e}")
+
+    def stats(self) -> dict[str, float]:
+        """
+        Router counters.
+
+        Returns:
+            Utterances checked, routed in total and per intent, and responses rendered.
+        """
+        return {
+            "checked": self.checked,
+            "routed": sum(self.routed.values()),
+            **{f"routed_{intent.name}": self.routed[intent.name] for intent in self.intents},
+            "rendered": len(self._audio),
+        }
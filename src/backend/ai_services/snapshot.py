@@ -0,0 +1,50 @@
+import json
+from dataclasses import dataclass
+from typing import Any
+
+
+def _compact(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+@dataclass
+class CustomerSnapshot:
+    """
+    Summary of the customer's transactions, computed when a session opens and sent to
+    the agent with every request, so that the common questions are answered without a
+    tool call.
+
+    Attributes:
+        as_of: Date (YYYY-MM-DD) the snapshot ends on.
+        recent: Most recent transactions, most recent first.
+        this_week_start: First date (YYYY-MM-DD) of "this week".
+        this_week: Total amount spent per category this week.
+        last_month_start: First date (YYYY-MM-DD) of "last month".
+        last_month: Spending, budget and budget status per category over the last month.
+    """
+
+    as_of: str
+    recent: list[dict[str, Any]]
+    this_week_start: str
+    this_week: dict[str, float]
+    last_month_start: str
+    last_month: dict[str, dict[str, Any]]
+
+    def instructions(self) -> str:
+        """
+        Formats the snapshot as instructions for the agent.
+
+        Returns:
+            The snapshot, compactly, and when to answer from it rather than with the tools.
+        """
+        return (
+            f"Customer snapshot as of {self.as_of}:\n"
+            f"- Last {len(self.recent)} transactions: {_compact(self.recent)}\n"
+            f"- Spending by category this week (since {self.this_week_start}): "
+            f"{_compact(self.this_week)}\n"
+            f"- Spending by category last month (since {self.last_month_start}), with "
+            f"budget status: {_compact(self.last_month)}\n"
+            "Answer questions covered by this snapshot directly from it, without calling "
+            "a tool. Call the tools only for other periods, categories, merchants, more "
+            "transactions or unusual spending."
+        )
@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import inspect
+import json
+from collections import OrderedDict, defaultdict
+from time import monotonic, perf_counter
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+import aiosqlite
+from loguru import logger
+from pydantic_ai import RunContext
+
+from ai_services.agent import Dependencies
+from ai_services.tools import MONTH_FORMATS, normalize_time_period, reformat_date
+from customer_transaction_db.queries import fetch_data_version
+
+T = TypeVar("T")
+
+
+def normalize_arguments(arguments: dict[str, Any]) -> dict[str, Any]:
+    """
+    Brings tool arguments the tools treat as equivalent to one form: dates to
+    YYYY-MM-DD, months to YYYY-MM, counts to integers and time periods to lower case.
+
+    Args:
+        arguments: Tool arguments by name.
+
+    Returns:
+        Normalized arguments.
+    """
+    normalized = {}
+    for name, value in arguments.items():
+        if name == "last_n" and str(value).strip().isdigit():
+            value = str(int(value))
+        elif isinstance(value, str):
+            if name.endswith("_date"):
+                value = reformat_date(value)
+            elif name.endswith("_month"):
+                value = reformat_date(value, MONTH_FORMATS)
+            elif name == "time_period":
+                value = normalize_time_period(value)
+        normalized[name] = value
+    return normalized
+
+
+class ToolResultCache:
+    """
+    LRU cache of tool results, per customer and normalized arguments, that expire after
+    a TTL and are dropped as soon as the transactions change.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0) -> None:
+        """
+        Initializes the ToolResultCache object.
+
+        Args:
+            max_entries: Maximum number of results cached.
+            ttl: Seconds a result is reused for.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._version: int | None = None
+        self._lock = asyncio.Lock()
+        self.hits: defaultdict[str, int] = defaultdict(int)
+        self.misses: defaultdict[str, int] = defaultdict(int)
+        self.miss_seconds: defaultdict[str, float] = defaultdict(float)
+        self.invalidations = 0
+
+    async def sync(self, db: aiosqlite.Connection) -> None:
+        """
+        Drops the cached results if the transactions changed since the last call.
+
+        Args:
+            db: Connection to the customer transaction database.
+        """
+        version = await fetch_data_version(db)
+        if version == self._version:
+            return
+        async with self._lock:
+            if version == self._version:
+                return
+            if self._version is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, tool: str, key: Hashable) -> tuple[bool, Any]:
+        """
+        Looks up a result.
+
+        Args:
+            tool: Name of the tool.
+            key: Customer and normalized arguments of the call.
+
+        Returns:
+            Whether the result was cached, and the result.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < monotonic():
+            self._entries.pop(key, None)
+            self.misses[tool] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits[tool] += 1
+        return True, entry[1]
+
+    def put(self, tool: str, key: Hashable, result: Any, seconds: float) -> None:
+        """
+        Caches a result, evicting the least recently used ones beyond the size bound.
+
+        Args:
+            tool: Name of the tool.
+            key: Customer and normalized arguments of the call.
+            result: Result of the tool.
+            seconds: Time the tool took to compute the result.
+        """
+        self.miss_seconds[tool] += seconds
+        self._entries[key] = (monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Cache counters.
+
+        Returns:
+            Entries and invalidations, and per tool the hits, misses, hit rate and the
+            tool time saved, estimated from the average time of the misses.
+        """
+        counters: dict[str, float] = {
+            "entries": len(self._entries),
+            "invalidations": self.invalidations,
+        }
+        for tool in sorted(self.hits.keys() | self.misses.keys()):
+            hits, misses = self.hits[tool], self.misses[tool]
+            counters[f"{tool}_hits"] = hits
+            counters[f"{tool}_misses"] = misses
+            counters[f"{tool}_hit_rate"] = hits / (hits + misses)
+            counters[f"{tool}_seconds_saved"] = (
+                hits * self.miss_seconds[tool] / misses if misses else 0.0
+            )
+        return counters
+
+
+def cached_tool(
+    function: Callable[..., Awaitable[T]], cache: ToolResultCache
+) -> Callable[..., Awaitable[T]]:
+    """
+    Wraps a tool taking the run context so that its results are cached per customer
+    and normalized arguments. The wrapper keeps the signature and docstring of the tool,
+    which the agent turns into the tool schema.
+
+    Args:
+        function: Tool to wrap.
+        cache: Cache of tool results.
+
+    Returns:
+        Tool calling `function` with the model's arguments on cache misses.
+    """
+    signature = inspect.signature(function)
+    ctx_name = next(iter(signature.parameters))
+
+    @functools.wraps(function)
+    async def wrapper(ctx: RunContext[Dependencies], *args: Any, **kwargs: Any) -> T:
+        try:
+            async with ctx.deps.transactions_db.connection() as db:
+                await cache.sync(db)
+        except Exception as e:
+            logger.warning(f"Could not check the transactions version, not caching {function.__name__}. Error: {e}")
+            return await function(ctx, *args, **kwargs)
+
+        bound = signature.bind(ctx, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = normalize_arguments(
+            {name: value for name, value in bound.arguments.items() if name != ctx_name}
+        )
+        key = (
+            ctx.deps.customer_id,
+            function.__name__,
+            json.dumps(arguments, sort_keys=True, default=str),
+        )
+
+        hit, result = cache.get(function.__name__, key)
+        if hit:
+            logger.debug(f"Tool result cache hit for {function.__name__}")
+            return result
+        start = perf_counter()
+        result = await function(ctx, *args, **kwargs)
+        cache.put(function.__name__, key, result, perf_counter() - start)
+        return result
+
+    return wrapper
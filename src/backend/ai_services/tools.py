@@ -1,11 +1,129 @@
 from typing import List, Dict
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from loguru import logger
 from pydantic_ai import RunContext
 
 from ai_services.agent import Dependencies
-        
+from ai_services.snapshot import CustomerSnapshot
+from customer_transaction_db.queries import (
+    fetch_recent_transactions,
+    fetch_transactions_above,
+)
+from customer_transaction_db.rollups import fetch_rollup_average, fetch_rollup_spending
+
+# "Today" for the sample transaction data, which ends on this date.
+REFERENCE_DATE = date(2023, 10, 14)
+
+# Default budget per category.
+BUDGET_LIMITS = {
+    "Cosmetic": 20000,
+    "Travel": 100000,
+    "Clothing": 300000,
+    "Electronics": 150000,
+    "Restaurant": 200000,
+    "Market": 100000
+}
+
+# Formats of the dates and months the tools accept, the first being the one stored.
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%Y", "%d.%m.%Y")
+MONTH_FORMATS = ("%Y-%m", "%m-%Y", "%Y/%m", "%m/%Y", "%B %Y", "%b %Y")
+
+
+def reformat_date(value: str, formats: tuple[str, ...] = DATE_FORMATS) -> str:
+    """
+    Brings a date, or a month, to the first of its accepted formats.
+
+    Args:
+        value: Date in one of `formats`.
+        formats: Accepted formats, the first being the output format.
+
+    Returns:
+        The reformatted date, or `value` as is if no format matches.
+    """
+    for fmt in formats:
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime(formats[0])
+        except ValueError:
+            continue
+    return value
+
+
+def normalize_time_period(time_period: str) -> str:
+    """
+    Brings a time period to lower case with single spaces (e.g. "Last  Month").
+
+    Args:
+        time_period: Time period.
+
+    Returns:
+        Normalized time period.
+    """
+    return " ".join(time_period.lower().split())
+
+
+def period_start(time_period: str, default: str = "this week") -> str:
+    """
+    Resolves a relative time period to its first date.
+
+    Args:
+        time_period: Time period (e.g., "last month", "this week").
+        default: Time period used if `time_period` is not recognized.
+
+    Returns:
+        First date (YYYY-MM-DD) of the period, ending on the reference date.
+    """
+    time_period = normalize_time_period(time_period)
+    if "last month" not in time_period and "this week" not in time_period:
+        time_period = default
+    if "last month" in time_period:
+        start = (
+            REFERENCE_DATE.replace(month=REFERENCE_DATE.month - 1)
+            if REFERENCE_DATE.month > 1
+            else REFERENCE_DATE.replace(year=REFERENCE_DATE.year - 1, month=12)
+        )
+    else:
+        start = REFERENCE_DATE - timedelta(days=7)
+    return start.isoformat()
+
+
+def budget_status(spending: Dict[str, float], budget_limits: Dict[str, int]) -> Dict:
+    """
+    Compares the spending per category with the budgets.
+
+    Args:
+        spending: Total amount spent per category.
+        budget_limits: Budget limits per category.
+
+    Returns:
+        dict: The spending, budget and budget status per category.
+    """
+    budget_results = {}
+    for category, total_spent in spending.items():
+        budget = budget_limits.get(category, float('inf'))
+        budget_results[category] = {
+            "spent": total_spent,
+            "budget": budget,
+            "status": "over budget" if total_spent > budget else "within budget"
+        }
+    return budget_results
+
+
+def month_range(month: str) -> tuple[str, str]:
+    """
+    Resolves a month to its first and last dates.
+
+    Args:
+        month: Month (YYYY-MM, or another of `MONTH_FORMATS`).
+
+    Returns:
+        First and last dates (YYYY-MM-DD) of the month.
+    """
+    first = datetime.strptime(reformat_date(month, MONTH_FORMATS), "%Y-%m").date()
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return first.isoformat(), last.isoformat()
+
+
 async def get_recent_transactions(ctx: RunContext[Dependencies], start_date: str = None, end_date: str = "2023-10-14", category: str = None, merchant: str = None, last_n: str = "5") -> List[Dict]:
     """
     Retrieve last n transactions based on optional filters for start date, end date, category, and merchant.
@@ -21,48 +139,36 @@ async def get_recent_transactions(ctx: RunContext[Dependencies], start_date: str
     Returns:
         list: A list of matching transactions.
     """
-    query = """
-        SELECT Transaction_Amount, Date, Merchant_Name, Category 
-        FROM Ivanov_Transactions 
-        WHERE 1=1
-        """
-
-    if start_date:
-        query += f" AND strftime('%s', substr(Date, 7, 4) || '-' || substr(Date, 4, 2) || '-' || substr(Date, 1, 2)) >= strftime('%s', '{start_date}') "
-    if end_date:
-        query += f" AND strftime('%s', substr(Date, 7, 4) || '-' || substr(Date, 4, 2) || '-' || substr(Date, 1, 2)) <= strftime('%s', '{end_date}') "
-    if category:
-        query += f" AND Category = '{category}'"
-    if merchant:
-        query += f" AND Merchant_Name = '{merchant}'"
-    if last_n:
-        query += f" ORDER BY strftime('%s', substr(Date, 7, 4) || '-' || substr(Date, 4, 2) || '-' || substr(Date, 1, 2)) DESC LIMIT {last_n}"
-    
+    start_date = reformat_date(start_date) if start_date else start_date
+    end_date = reformat_date(end_date) if end_date else end_date
     try:
-        async for sqlite_db in ctx.deps.sqlite_db:
-            logger.debug(f"Executing query: {query}")
-            cursor = await sqlite_db.execute(query)
-            rows = await cursor.fetchall()
-            await cursor.close()
-            results = [dict(row) for row in rows]
-
-            return results
+        async with ctx.deps.transactions_db.connection() as sqlite_db:
+            if ctx.deps.analytics is not None:
+                columns = await ctx.deps.analytics.columns(sqlite_db)
+                return columns.recent(
+                    start_date=start_date,
+                    end_date=end_date,
+                    category=category,
+                    merchant=merchant,
+                    limit=int(last_n) if last_n else None,
+                )
+            return await fetch_recent_transactions(
+                sqlite_db,
+                start_date=start_date,
+                end_date=end_date,
+                category=category,
+                merchant=merchant,
+                limit=int(last_n) if last_n else None,
+            )
     except Exception as e:
-        logger.error(f"Error executing query {query}. Error: {e}")
+        logger.error(f"Error retrieving recent transactions. Error: {e}")
         return []
-        
+
 async def summarize_spending(
-        ctx: RunContext[Dependencies], 
-        time_period: str = "this week", 
+        ctx: RunContext[Dependencies],
+        time_period: str = "this week",
         return_budget_status: bool = False,
-        budget_limits: Dict[str, int] = {
-            "Cosmetic": 20000,
-            "Travel": 100000,
-            "Clothing": 300000,
-            "Electronics": 150000,
-            "Restaurant": 200000,
-            "Market": 100000
-        }) -> Dict:
+        budget_limits: Dict[str, int] = BUDGET_LIMITS) -> Dict:
     """
     Summarize spending for a given time period by category.
 
@@ -75,45 +181,23 @@ async def summarize_spending(
     Returns:
         dict: A breakdown of spending by category.
     """
-
-    if "last month" in time_period:
-        start_date = "DATE('2023-10-14', '-1 month')"
-    elif "this week" in time_period:
-        start_date = "DATE('2023-10-14', '-7 days')"
-    else:
-        start_date = "DATE('2023-10-14', '-7 days')"
-
-    query = f"""
-        SELECT Category, SUM(Transaction_Amount) as total_spent 
-        FROM Ivanov_Transactions 
-        WHERE strftime('%s', substr(Date, 7, 4) || '-' || substr(Date, 4, 2) || '-' || substr(Date, 1, 2)) >= strftime('%s', {start_date})
-        GROUP BY Category
-        """
     try:
-        logger.debug(f"Executing query: {query}")
-        # async for sqlite_db in ctx.deps.sqlite_db:
-        async for sqlite_db in ctx.deps.sqlite_db:
-            cursor = await sqlite_db.execute(query)
-            results = await cursor.fetchall()
-            await cursor.close()
-            results = {row[0]: row[1] for row in results}
-            logger.debug(f"Results: {results}") 
+        async with ctx.deps.transactions_db.connection() as sqlite_db:
+            if ctx.deps.analytics is not None:
+                columns = await ctx.deps.analytics.columns(sqlite_db)
+                results = columns.spending_by_category(start_date=period_start(time_period))
+            else:
+                results = await fetch_rollup_spending(
+                    sqlite_db, start_date=period_start(time_period)
+                )
+            logger.debug(f"Results: {results}")
             if return_budget_status:
-                budget_results = {}
-                for category, total_spent in results.items():
-                    budget = budget_limits.get(category, float('inf'))
-                    budget_results[category] = {
-                        "spent": total_spent,
-                        "budget": budget,
-                        "status": "over budget" if total_spent > budget else "within budget"
-                    }
-
-                return budget_results
+                return budget_status(results, budget_limits)
             else:
                 return results
 
     except Exception as e:
-        logger.error(f"Error executing query {query}. Error: {e}")
+        logger.error(f"Error summarizing spending. Error: {e}")
         return {}
 
 async def detect_unusual_spending(ctx: RunContext[Dependencies], threshold: float = None, time_period: str = "last month", specific_month: str = None) -> list:
@@ -129,49 +213,81 @@ async def detect_unusual_spending(ctx: RunContext[Dependencies], threshold: floa
     Returns:
         list: A list of flagged transactions.
     """
-    if specific_month:
-        month_date = datetime.strptime(specific_month, "%Y-%m")
-        start_date = month_date.replace(day=1).strftime("%Y-%m-%d")
-        end_date = (month_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1).strftime("%Y-%m-%d")
-        date_filter = f" BETWEEN strftime('%s', '{start_date}') AND strftime('%s', '{end_date}')"
-    elif "last month" in time_period:
-        date_filter = ">= strftime('%s', DATE('2023-10-14', '-1 month'))"
-    elif "this week" in time_period:
-        date_filter = ">= strftime('%s', DATE('2023-10-14', '-7 days'))"
-    else:
-        date_filter = ">= strftime('%s', DATE('2023-10-14', '-1 month'))"
-
-    avg_query = f"""
-        SELECT AVG(Transaction_Amount) 
-        FROM Ivanov_Transactions 
-        WHERE strftime('%s', substr(Date, 7, 4) || '-' || substr(Date, 4, 2) || '-' || substr(Date, 1, 2)) {date_filter}
-        """
-
     try:
-        async for sqlite_db in ctx.deps.sqlite_db:
-            logger.debug(f"Executing query: {avg_query}")
-            avg_spending = await sqlite_db.execute(avg_query)
-            avg_spending = await avg_spending.fetchone()
-            avg_spending = avg_spending[0] if avg_spending else 0
+        if specific_month:
+            start_date, end_date = month_range(specific_month)
+        else:
+            start_date, end_date = period_start(time_period, default="last month"), None
+
+        async with ctx.deps.transactions_db.connection() as sqlite_db:
+            if ctx.deps.analytics is not None:
+                columns = await ctx.deps.analytics.columns(sqlite_db)
+                return columns.unusual(
+                    start_date=start_date, end_date=end_date, threshold=threshold
+                )
 
+            avg_spending = await fetch_rollup_average(
+                sqlite_db, start_date=start_date, end_date=end_date
+            )
             if avg_spending == 0:
                 logger.debug("No transactions found for the specified time period.")
                 return []
 
             threshold = threshold or avg_spending * 1.5
 
-            query = f"""
-                SELECT Transaction_Amount, Date, Merchant_Name, Category
-                FROM Ivanov_Transactions 
-                WHERE Transaction_Amount > {str(threshold)} AND strftime('%s', substr(Date, 7, 4) || '-' || substr(Date, 4, 2) || '-' || substr(Date, 1, 2)) >= strftime('%s', '{date_filter}')
-                """
-            logger.debug(f"Executing query: {query}")
-            cursor = await sqlite_db.execute(query)
-            rows = await cursor.fetchall()
-            await cursor.close()
-            results = [dict(row) for row in rows]
-
-            return results
+            return await fetch_transactions_above(
+                sqlite_db, threshold=threshold, start_date=start_date, end_date=end_date
+            )
     except Exception as e:
-        logger.error(f"Error executing query: {query}. Error: {e}")
+        logger.error(f"Error detecting unusual spending. Error: {e}")
         return []
+
+
+async def fetch_customer_snapshot(deps: Dependencies, last_n: int = 5) -> CustomerSnapshot:
+    """
+    Computes the answers to the most common questions: the last transactions, and the
+    spending per category this week and last month, with the budget status.
+
+    Args:
+        deps: Dependencies of the agent.
+        last_n: The number of recent transactions.
+
+    Returns:
+        Snapshot of the customer's transactions.
+    """
+    end_date = REFERENCE_DATE.isoformat()
+    this_week_start = period_start("this week")
+    last_month_start = period_start("last month")
+    async with deps.transactions_db.connection() as sqlite_db:
+        if deps.analytics is not None:
+            columns = await deps.analytics.columns(sqlite_db)
+            recent = columns.recent(end_date=end_date, limit=last_n)
+            this_week = columns.spending_by_category(start_date=this_week_start)
+            last_month = columns.spending_by_category(start_date=last_month_start)
+        else:
+            recent = await fetch_recent_transactions(sqlite_db, end_date=end_date, limit=last_n)
+            this_week = await fetch_rollup_spending(sqlite_db, start_date=this_week_start)
+            last_month = await fetch_rollup_spending(sqlite_db, start_date=last_month_start)
+    return CustomerSnapshot(
+        as_of=end_date,
+        recent=recent,
+        this_week_start=this_week_start,
+        this_week=this_week,
+        last_month_start=last_month_start,
+        last_month=budget_status(last_month, BUDGET_LIMITS),
+    )
+
+
+async def prefetch_customer_snapshot(deps: Dependencies, last_n: int = 5) -> None:
+    """
+    Computes the customer snapshot of a session and hands it to the agent. Until then,
+    or if it fails, the agent answers with the tools.
+
+    Args:
+        deps: Dependencies of the agent for the session.
+        last_n: The number of recent transactions.
+    """
+    try:
+        deps.snapshot = await fetch_customer_snapshot(deps, last_n=last_n)
+    except Exception as e:
+        logger.error(f"Error prefetching the customer snapshot. Error: {e}")
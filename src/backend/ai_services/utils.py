@@ -1,3 +1,5 @@
+from typing import Sequence
+
 from pydantic_ai.messages import (
     ModelMessage,
     ModelRequest,
@@ -6,28 +8,35 @@ from pydantic_ai.messages import (
     UserPromptPart,
 )
 
+from convo_history_db.writer import Message
+
 
 def format_messages_for_agent(
-    conversation_history: list[dict[str, str]],
+    conversation_history: Sequence[dict[str, str] | Message],
 ) -> list[ModelMessage]:
     """
     Format the conversation history for the PydanticAI agent.
 
     Args:
-        conversation_history: List of dictionaries containing the conversation history.
+        conversation_history: Messages of the conversation history, as records or
+            dictionaries with their sender and content.
 
     Returns:
         List of ModelMessage objects containing the conversation history.
     """
     messages: list[ModelMessage] = []
     for msg in conversation_history:
-        if msg["sender"] == "user":
+        if isinstance(msg, Message):
+            sender, content = msg.sender, msg.content
+        else:
+            sender, content = msg["sender"], msg["content"]
+        if sender == "user":
             messages.append(
-                ModelRequest(parts=[UserPromptPart(content=msg["content"])])
+                ModelRequest(parts=[UserPromptPart(content=content)])
             )
-        elif msg["sender"] == "agent":
+        elif sender == "agent":
             messages.append(
-                ModelResponse(parts=[TextPart(content=msg["content"])])
+                ModelResponse(parts=[TextPart(content=content)])
             )
         else:
             continue
@@ -1,3 +1,4 @@
+import asyncio
 from typing import AsyncIterator, cast
 from uuid import uuid4
 
@@ -8,15 +9,23 @@ from psycopg_pool import AsyncConnectionPool
 from pydantic import UUID4
 from pydantic_ai import Agent
 
+from api.metrics import Metrics
 from config.settings import get_settings
-from customer_transaction_db.connection import get_customer_sqlite_client
+from nlp_processor.speech_to_text import GroqSpeechToText, SpeechToTextBackend
 from nlp_processor.text_to_speech import TextToSpeech
+from nlp_processor.tts_service import TTSService
 from ai_services.agent import Dependencies
+from ai_services.intents import IntentRouter
+from ai_services.context import ConversationContext, create_agent_summarizer
+from ai_services.tools import prefetch_customer_snapshot
+from convo_history_db.writer import HistoryWriter
 
 
 async def get_db_conn(websocket: WebSocket) -> AsyncIterator[AsyncConnection]:
     """
-    Gets a connection to the database using the connection pool.
+    Gets a connection to the database using the connection pool, leased until the
+    request is done. Websocket sessions store their messages through the history
+    writer instead of holding a connection.
 
     Args:
         websocket: WebSocket connection.
@@ -29,6 +38,45 @@ async def get_db_conn(websocket: WebSocket) -> AsyncIterator[AsyncConnection]:
         yield conn
 
 
+async def get_history_writer(websocket: WebSocket) -> HistoryWriter:
+    """
+    Gets the write-behind writer of the conversation history database.
+
+    Args:
+        websocket: WebSocket connection.
+
+    Returns:
+        Writer shared by all connections.
+    """
+    return websocket.state.history_writer
+
+
+async def get_metrics(websocket: WebSocket) -> Metrics:
+    """
+    Gets the latency histograms of the voice turns.
+
+    Args:
+        websocket: WebSocket connection.
+
+    Returns:
+        Metrics shared by all connections.
+    """
+    return websocket.state.metrics
+
+
+async def get_intent_router(websocket: WebSocket) -> IntentRouter | None:
+    """
+    Gets the router answering greetings, thanks and goodbyes without the agent.
+
+    Args:
+        websocket: WebSocket connection.
+
+    Returns:
+        Router shared by all connections, or None if disabled.
+    """
+    return websocket.state.intent_router
+
+
 async def get_conversation_id() -> UUID4:
     """
     Creates a new unique conversation ID.
@@ -39,16 +87,55 @@ async def get_conversation_id() -> UUID4:
     return uuid4()
 
 
-async def get_agent_dependencies() -> Dependencies:
+async def get_agent_dependencies(websocket: WebSocket) -> AsyncIterator[Dependencies]:
     """
-    Gets the dependencies for the PydanticAI Agent.
+    Gets the dependencies for the PydanticAI Agent, prefetching the customer snapshot
+    in the background for the lifetime of the connection.
 
-    Returns:
+    Args:
+        websocket: WebSocket connection.
+
+    Yields:
         Dependencies instance.
     """
-    return Dependencies(
-        settings=get_settings(),
-        sqlite_db=get_customer_sqlite_client(),
+    settings = get_settings()
+    deps = Dependencies(
+        settings=settings,
+        transactions_db=websocket.state.transactions_pool,
+        analytics=websocket.state.transaction_analytics,
+        customer_id=settings.transactions.customer_id,
+    )
+    if not settings.context.customer_snapshot:
+        yield deps
+        return
+    prefetch = asyncio.create_task(
+        prefetch_customer_snapshot(deps, last_n=settings.context.snapshot_transactions)
+    )
+    try:
+        yield deps
+    finally:
+        prefetch.cancel()
+
+
+async def get_conversation_context(websocket: WebSocket) -> ConversationContext:
+    """
+    Creates the bounded conversation context of a connection.
+
+    Args:
+        websocket: WebSocket connection.
+
+    Returns:
+        Conversation context summarizing older messages with the summary agent.
+    """
+    settings = get_settings()
+    return ConversationContext(
+        max_tokens=settings.context.max_tokens,
+        summary_max_tokens=settings.context.summary_max_tokens,
+        summarizer=(
+            create_agent_summarizer(websocket.state.summary_agent)
+            if settings.context.summarize
+            else None
+        ),
     )
 
 
@@ -65,6 +152,27 @@ async def get_groq_client(websocket: WebSocket) -> AsyncGroq:
     return websocket.state.groq_client
 
 
+async def get_stt_backend(websocket: WebSocket) -> SpeechToTextBackend:
+    """
+    Gets a speech-to-text backend for transcribing audio.
+
+    Args:
+        websocket: WebSocket connection.
+
+    Returns:
+        The local speech-to-text engine if enabled, behind its batching scheduler if
+        batching is enabled, or a backend using the Groq API.
+    """
+    if websocket.state.stt_batcher is not None:
+        return websocket.state.stt_batcher
+    if websocket.state.local_stt is not None:
+        return websocket.state.local_stt
+    return GroqSpeechToText(
+        api_client=websocket.state.groq_client,
+        model_name=get_settings().stt.model,
+    )
+
+
 async def get_agent(websocket: WebSocket) -> Agent:
     """
     Gets a PydanticAI Agent that uses Groq models.
@@ -78,18 +186,16 @@ async def get_agent(websocket: WebSocket) -> Agent:
     return websocket.state.groq_agent
 
 
-async def get_tts_handler(websocket: WebSocket) -> TextToSpeech:
+async def get_tts_handler(websocket: WebSocket) -> AsyncIterator[TextToSpeech]:
     """
-    Gets a handler for text-to-speech conversion.
+    Leases a handler for text-to-speech conversion for the lifetime of the connection.
 
     Args:
         websocket: WebSocket connection.
 
-    Returns:
+    Yields:
         Handler for text-to-speech conversion.
     """
-    return TextToSpeech(
-        client=websocket.state.openai_client,
-        model_name="tts-1",
-        response_format="aac",
-    )
+    tts_service = cast(TTSService, websocket.state.tts_service)
+    async with tts_service.lease() as tts_handler:
+        yield tts_handler
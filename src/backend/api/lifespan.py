@@ -1,28 +1,48 @@
+import asyncio
 from contextlib import asynccontextmanager
 from typing import AsyncIterator, TypedDict
 
 from fastapi import FastAPI
 from groq import AsyncGroq
 from loguru import logger
-from openai import AsyncOpenAI
 from psycopg_pool import AsyncConnectionPool
 from pydantic_ai import Agent, Tool
 
 
-from config.settings import get_settings
-from convo_history_db.actions import create_main_table
+from api.metrics import Metrics, timed_tool
+from config.settings import Settings, get_settings
 from convo_history_db.connection import create_db_connection_pool
-from ai_services.agent import Dependencies, create_groq_agent
+from convo_history_db.migrations import maintain_partitions, migrate_history_db
+from convo_history_db.writer import HistoryWriter, create_history_writer
+from customer_transaction_db.analytics import (
+    TransactionAnalytics,
+    create_transaction_analytics,
+)
+from customer_transaction_db.connection import (
+    SQLiteConnectionPool,
+    create_transactions_db_pool,
+    open_transactions_db_pool,
+)
+from customer_transaction_db.migrations import migrate_transactions_db
+from ai_services.agent import Dependencies, create_groq_agent, create_summary_agent
 from ai_services.factories import (
     create_groq_client,
+    create_intent_router,
     create_groq_model,
-    create_openai_client,
+    create_tool_cache,
+    create_tts_service,
 )
+from ai_services.intents import IntentRouter
+from ai_services.tool_cache import ToolResultCache, cached_tool
 from ai_services.tools import (
     get_recent_transactions,
     summarize_spending,
     detect_unusual_spending,
 )
+from nlp_processor.batching import BatchingSpeechToText, create_stt_batcher
+from nlp_processor.local_stt import LocalSpeechToText, create_local_stt
+from nlp_processor.local_tts import LocalSpeechSynthesis, create_local_tts
+from nlp_processor.tts_service import TTSService
 
 
 class State(TypedDict):
@@ -30,15 +50,79 @@ class State(TypedDict):
 
     Attributes:
         pool: Conversation history database connection pool for async operations.
+        history_writer: Write-behind writer of the conversation history, batching the
+            messages of all connections.
+        transactions_pool: Read-only connection pool to the customer transaction database.
+        transaction_analytics: In-memory analytics engine serving the transaction tools,
+            None to serve them with SQL queries.
+        tool_cache: Cache of tool results, None if disabled.
         groq_client: Client for interacting with Groq API.
-        openai_client: Client for interacting with OpenAI API.
         groq_agent: PydanticAI Agent that uses Groq models.
+        summary_agent: PydanticAI Agent summarizing the older messages of conversations.
+        tts_service: Text-to-speech service shared by all connections.
+        intent_router: Router answering greetings, thanks and goodbyes without the
+            agent, None if disabled.
+        local_tts: Local text-to-speech engine of the service, None to synthesize with
+            the OpenAI API.
+        local_stt: Local speech-to-text engine, None to transcribe with the Groq API.
+        stt_batcher: Scheduler batching the utterances of all connections for the local
+            engine, None to transcribe them one by one.
+        metrics: Latency histograms of the voice turns.
     """
 
     pool: AsyncConnectionPool
+    history_writer: HistoryWriter
+    transactions_pool: SQLiteConnectionPool
+    transaction_analytics: TransactionAnalytics | None
+    tool_cache: ToolResultCache | None
     groq_client: AsyncGroq
-    openai_client: AsyncOpenAI
     groq_agent: Agent[Dependencies]
+    summary_agent: Agent[None]
+    tts_service: TTSService
+    intent_router: IntentRouter | None
+    local_tts: LocalSpeechSynthesis | None
+    local_stt: LocalSpeechToText | None
+    stt_batcher: BatchingSpeechToText | None
+    metrics: Metrics
+
+
+async def warm_up_tts_cache(tts_service: TTSService, settings: Settings) -> None:
+    """
+    Pre-synthesizes the configured warm-up phrases into the audio cache.
+
+    Args:
+        tts_service: Text-to-speech service owning the shared cache.
+        settings: Application settings.
+    """
+    phrases = [p for p in settings.tts.warmup_phrases.split("|") if p.strip()]
+    try:
+        async with tts_service.lease() as tts_handler:
+            await tts_handler.warm_up(phrases)
+        logger.info(f"Warmed up the TTS cache with {len(phrases)} phrases")
+    except Exception as e:
+        logger.warning(f"Could not warm up the TTS cache. Error: {e}")
+
+
+async def maintain_message_partitions(
+    pool: AsyncConnectionPool, settings: Settings, interval: float = 24 * 60 * 60
+) -> None:
+    """
+    Creates the upcoming monthly partitions of the messages table and drops the ones
+    past retention, once a day.
+
+    Args:
+        pool: Connection pool to the conversation history database.
+        settings: Application settings.
+        interval: Seconds between two maintenance runs.
+    """
+    while True:
+        try:
+            await maintain_partitions(
+                pool, retention_months=settings.database.messages_retention_months
+            )
+        except Exception as e:
+            logger.warning(f"Could not maintain the message partitions. Error: {e}")
+        await asyncio.sleep(interval)
 
 
 @asynccontextmanager
@@ -56,24 +140,36 @@ async def app_lifespan(app: FastAPI) -> AsyncIterator[State]:
     """
     settings = get_settings()
     pool = create_db_connection_pool(settings=settings)
-    openai_client = create_openai_client(settings=settings)
+    history_writer = create_history_writer(pool=pool, settings=settings)
+    transactions_pool = create_transactions_db_pool(settings=settings)
+    transaction_analytics = create_transaction_analytics(settings=settings)
+    tool_cache = create_tool_cache(settings=settings)
+    local_tts = create_local_tts(settings=settings)
+    tts_service = create_tts_service(settings=settings, local_tts=local_tts)
+    intent_router = create_intent_router(settings=settings)
+    local_stt = create_local_stt(settings=settings)
+    stt_batcher = create_stt_batcher(local_stt, settings=settings)
     groq_client = create_groq_client(settings=settings)
     _groq_model = create_groq_model(groq_client=groq_client)
+    summary_agent = create_summary_agent(
+        groq_model=create_groq_model(
+            groq_client=groq_client, model_name=settings.context.summary_model
+        )
+    )
     groq_agent = create_groq_agent(
         groq_model=_groq_model,
         tools=[
             Tool(
-                function=get_recent_transactions, 
-                takes_ctx=True, 
-            ),
-            Tool(
-                function=summarize_spending, 
+                function=timed_tool(
+                    tool if tool_cache is None else cached_tool(tool, tool_cache)
+                ),
                 takes_ctx=True,
-            ),
-            Tool(
-                function=detect_unusual_spending, 
-                takes_ctx=True, 
-            ),
+            )
+            for tool in (
+                get_recent_transactions,
+                summarize_spending,
+                detect_unusual_spending,
+            )
         ],
         system_prompt = """
             You are a helpful and polite bank assistant, dedicated to providing concise and clear information about the user's bank transactions.
@@ -94,20 +190,79 @@ async def app_lifespan(app: FastAPI) -> AsyncIterator[State]:
 
     logger.info("Opening database connection pool")
     await pool.open()
-    await create_main_table(pool)
+    await migrate_history_db(
+        pool, partitioned=settings.database.messages_partitioned
+    )
+    history_writer.start()
+    partition_maintenance = (
+        asyncio.create_task(maintain_message_partitions(pool=pool, settings=settings))
+        if settings.database.messages_partitioned
+        else None
+    )
+
+    logger.info("Opening customer transaction database connection pool")
+    await migrate_transactions_db(transactions_pool.db_path)
+    await open_transactions_db_pool(transactions_pool)
+
+    if local_stt is not None:
+        logger.info("Starting the local speech-to-text workers")
+        await local_stt.start()
+    if stt_batcher is not None:
+        stt_batcher.start()
+
+    if local_tts is not None:
+        logger.info("Starting the local text-to-speech workers")
+        await local_tts.start()
+
+    tts_warm_up = asyncio.create_task(
+        warm_up_tts_cache(tts_service=tts_service, settings=settings)
+    )
+    intent_rendering = (
+        asyncio.create_task(intent_router.render(tts_service))
+        if intent_router is not None
+        else None
+    )
 
     yield {
         "pool": pool,
-        "openai_client": openai_client,
+        "history_writer": history_writer,
+        "transactions_pool": transactions_pool,
+        "transaction_analytics": transaction_analytics,
+        "tool_cache": tool_cache,
         "groq_client": groq_client,
         "groq_agent": groq_agent,
+        "summary_agent": summary_agent,
+        "tts_service": tts_service,
+        "intent_router": intent_router,
+        "local_tts": local_tts,
+        "local_stt": local_stt,
+        "stt_batcher": stt_batcher,
+        "metrics": Metrics(),
     }
 
+    tts_warm_up.cancel()
+    if intent_rendering is not None:
+        intent_rendering.cancel()
+    if partition_maintenance is not None:
+        partition_maintenance.cancel()
+
+    logger.info("Storing the queued conversation messages")
+    await history_writer.close()
+
     logger.info("Closing database connection pool")
     await pool.close()
 
-    logger.info("Closing OpenAI client")
-    await openai_client.close()
+    logger.info("Closing customer transaction database connection pool")
+    await transactions_pool.close()
+
+    if stt_batcher is not None:
+        await stt_batcher.close()
+    if local_stt is not None:
+        logger.info("Stopping the local speech-to-text workers")
+        await local_stt.close()
+
+    logger.info("Closing TTS service")
+    await tts_service.close()
 
     logger.info("Closing Groq client")
     await groq_client.close()
@@ -0,0 +1,198 @@
+import bisect
+import functools
+from collections import defaultdict
+from typing import Awaitable, Callable, TypeVar
+
+from api.pipeline import TurnTimer, current_turn
+
+T = TypeVar("T")
+
+# Upper bounds of the latency buckets in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the buckets of model requests per turn.
+REQUEST_BUCKETS = (1, 2, 3, 4, 6, 8)
+
+# Upper bounds of the audio size buckets in bytes.
+SIZE_BUCKETS = tuple(1024 * 4**i for i in range(8))
+
+PREFIX = "voice2voice"
+
+
+class Histogram:
+    """
+    Histogram of observations with fixed buckets, optionally split by one label,
+    rendered in the Prometheus text format.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        label: str | None = None,
+    ) -> None:
+        """
+        Initializes the Histogram object.
+
+        Args:
+            name: Name of the metric.
+            description: Help text of the metric.
+            buckets: Upper bounds of the buckets, increasing.
+            label: Name of the label splitting the observations, if any.
+        """
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.label = label
+        # per label value: count per bucket (the last one unbounded), sum
+        self._counts: dict[str, list[int]] = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self._sums: dict[str, float] = defaultdict(float)
+
+    def observe(self, value: float, label_value: str = "") -> None:
+        """
+        Records an observation.
+
+        Args:
+            value: Observed value.
+            label_value: Value of the label of the observation.
+        """
+        self._counts[label_value][bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[label_value] += value
+
+    def render(self) -> list[str]:
+        """
+        Formats the histogram in the Prometheus text format.
+
+        Returns:
+            Lines of the histogram, with its cumulative buckets, sum and count.
+        """
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for label_value in sorted(self._counts):
+            labels = f'{self.label}="{label_value}",' if self.label else ""
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), self._counts[label_value]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+            labels = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{self.name}_sum{labels} {self._sums[label_value]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """
+    Latency histograms of the voice turns, exposed with the counters of the shared
+    resources at `/metrics`.
+
+    Histograms are aggregated over all conversations; the spans of each turn, tagged
+    with its conversation, are traced with logfire.
+    """
+
+    def __init__(self) -> None:
+        self.stages = Histogram(
+            f"{PREFIX}_turn_stage_seconds",
+            "Duration of the stages of the voice turns.",
+            label="stage",
+        )
+        self.marks = Histogram(
+            f"{PREFIX}_turn_mark_seconds",
+            "Time from the start of the voice turns to their milestones (e.g. first_token, first_audio).",
+            label="mark",
+        )
+        self.totals = Histogram(
+            f"{PREFIX}_turn_total_seconds",
+            "Time spent per voice turn in work interleaved with the stages (e.g. websocket_send).",
+            label="total",
+        )
+        self.tools = Histogram(
+            f"{PREFIX}_tool_call_seconds",
+            "Duration of the tool calls of the agent.",
+            label="tool",
+        )
+        self.llm_requests = Histogram(
+            f"{PREFIX}_turn_llm_requests",
+            "Requests to the language model per turn, 1 when answered without a tool call.",
+            buckets=REQUEST_BUCKETS,
+        )
+        self.websocket_sends = Histogram(
+            f"{PREFIX}_websocket_send_seconds",
+            "Duration of the audio frames sends, high when the client reads slowly.",
+        )
+        self.audio_received = Histogram(
+            f"{PREFIX}_audio_received_bytes",
+            "Size of the utterances received.",
+            buckets=SIZE_BUCKETS,
+        )
+        self.turns = 0
+
+    def observe_turn(self, timer: TurnTimer) -> None:
+        """
+        Records the stages, tool calls, marks and totals of a completed turn.
+
+        Args:
+            timer: Timer of the turn.
+        """
+        self.turns += 1
+        for stage in timer.stages:
+            if stage.name.startswith("tool:"):
+                self.tools.observe(stage.duration, stage.name.removeprefix("tool:"))
+            else:
+                self.stages.observe(stage.duration, stage.name)
+        for name, seconds in timer.totals.items():
+            self.totals.observe(seconds, name)
+        for name, offset in timer.marks.items():
+            self.marks.observe(offset, name)
+
+    def render(self, counters: dict[str, dict[str, float]]) -> str:
+        """
+        Formats the histograms, and the counters of the shared resources as gauges, in
+        the Prometheus text format.
+
+        Args:
+            counters: Counters per resource, as served at `/stats`.
+
+        Returns:
+            Metrics exposition.
+        """
+        lines = [f"# TYPE {PREFIX}_turns_total counter", f"{PREFIX}_turns_total {self.turns}"]
+        for histogram in (
+            self.stages,
+            self.marks,
+            self.totals,
+            self.tools,
+            self.llm_requests,
+            self.websocket_sends,
+            self.audio_received,
+        ):
+            lines += histogram.render()
+        for resource, values in counters.items():
+            for key, value in values.items():
+                name = f"{PREFIX}_{resource}_{key}"
+                lines += [f"# TYPE {name} gauge", f"{name} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+def timed_tool(function: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Wraps an agent tool so that each call is timed as a stage of the current turn.
+
+    Args:
+        function: Tool function.
+
+    Returns:
+        Tool function with the same signature, timing its calls.
+    """
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs) -> T:
+        timer = current_turn.get()
+        if timer is None:
+            return await function(*args, **kwargs)
+        with timer.stage(f"tool:{function.__name__}"):
+            return await function(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,304 @@
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Coroutine, Iterator
+
+import logfire
+from loguru import logger
+from pydantic import UUID4
+from pydantic_ai.messages import ModelMessage
+
+from ai_services.context import ConversationContext
+from ai_services.utils import format_messages_for_agent
+from convo_history_db.writer import HistoryWriter, Message
+
+
+@dataclass
+class StageTiming:
+    """Timing of a single stage of a voice turn.
+
+    Attributes:
+        name: Name of the stage.
+        start: Offset in seconds from the start of the turn.
+        end: Offset in seconds from the start of the turn.
+    """
+
+    name: str
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        """Duration of the stage in seconds."""
+
+        return self.end - self.start
+
+
+class TurnTimer:
+    """
+    Records when each stage of a voice turn starts and ends.
+
+    Offsets are relative to the creation of the timer so that stages running
+    concurrently (e.g. background database writes) can be seen overlapping
+    with the stages on the critical path. Each stage is also traced as a logfire
+    span tagged with the conversation.
+    """
+
+    def __init__(self, conversation_id: UUID4 | None = None) -> None:
+        """
+        Initializes the TurnTimer object.
+
+        Args:
+            conversation_id: Conversation of the turn, tagging its spans.
+        """
+        self.conversation_id = conversation_id
+        self._origin = perf_counter()
+        self.stages: list[StageTiming] = []
+        self.marks: dict[str, float] = {}
+        self.totals: dict[str, float] = defaultdict(float)
+
+    def elapsed(self) -> float:
+        """
+        Seconds elapsed since the start of the turn.
+
+        Returns:
+            Elapsed time in seconds.
+        """
+        return perf_counter() - self._origin
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Times the enclosed block as a stage of the turn.
+
+        Args:
+            name: Name of the stage.
+        """
+        start = self.elapsed()
+        try:
+            with logfire.span(
+                "turn stage {stage}",
+                stage=name,
+                conversation_id=str(self.conversation_id),
+            ):
+                yield
+        finally:
+            self.stages.append(
+                StageTiming(name=name, start=start, end=self.elapsed())
+            )
+
+    def mark(self, name: str) -> None:
+        """
+        Records a point in time (e.g. the first LLM token), keeping the first one.
+
+        Args:
+            name: Name of the mark.
+        """
+        self.marks.setdefault(name, self.elapsed())
+
+    def add(self, name: str, seconds: float) -> None:
+        """
+        Adds to a duration summed over the turn (e.g. the time spent sending audio).
+
+        Args:
+            name: Name of the total.
+            seconds: Duration to add.
+        """
+        self.totals[name] += seconds
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        """
+        Summarizes the turn for the client, summing the stages run several times
+        (e.g. a tool called twice).
+
+        Returns:
+            Durations of the stages, offsets of the marks and totals, in milliseconds.
+        """
+        stages: dict[str, float] = defaultdict(float)
+        for s in self.stages:
+            stages[s.name] += s.duration * 1000
+        return {
+            "stages": {name: round(ms, 1) for name, ms in stages.items()},
+            "marks": {name: round(s * 1000, 1) for name, s in self.marks.items()},
+            "totals": {name: round(s * 1000, 1) for name, s in self.totals.items()},
+        }
+
+    def report(self) -> str:
+        """
+        Formats the recorded stages and marks as a single log line.
+
+        Returns:
+            Human-readable timing report in milliseconds.
+        """
+        stages = " ".join(
+            f"{s.name}={s.duration * 1000:.1f}ms"
+            f"[{s.start * 1000:.0f}-{s.end * 1000:.0f}]"
+            for s in sorted(self.stages, key=lambda s: s.start)
+        )
+        marks = " ".join(
+            f"{name}@{offset * 1000:.0f}ms"
+            for name, offset in sorted(self.marks.items(), key=lambda m: m[1])
+        )
+        totals = " ".join(
+            f"{name}_total={seconds * 1000:.1f}ms" for name, seconds in self.totals.items()
+        )
+        return " ".join(part for part in (stages, marks, totals) if part)
+
+
+# Timer of the turn being processed, for the code the turn calls into (e.g. the tools).
+current_turn: ContextVar[TurnTimer | None] = ContextVar("current_turn", default=None)
+
+
+class ConversationSession:
+    """
+    Per-connection conversation state.
+
+    The conversation history is kept in memory, as compact message records, and is
+    authoritative for the live session. Messages are queued to the shared history
+    writer, which stores them in the background, in the order they were recorded.
+    """
+
+    def __init__(
+        self,
+        conversation_id: UUID4,
+        writer: HistoryWriter,
+        context: ConversationContext | None = None,
+    ) -> None:
+        """
+        Initializes the ConversationSession object.
+
+        Args:
+            conversation_id: Unique identifier for the conversation.
+            writer: Write-behind writer of the conversation history database.
+            context: Bounded context sent to the agent. The whole history if None.
+        """
+        self.conversation_id = conversation_id
+        self.writer = writer
+        self.context = context
+        self.history: list[Message] = []
+
+    def agent_messages(self) -> list[ModelMessage]:
+        """
+        Builds the message history of the next turn for the agent.
+
+        Returns:
+            Messages of the bounded context, or of the whole history.
+        """
+        if self.context is None:
+            return format_messages_for_agent(conversation_history=self.history)
+        return self.context.messages(self.history)
+
+    def record(self, sender: str, content: str) -> None:
+        """
+        Appends a message to the history and queues it to be stored. An agent
+        message completes a turn, so the context summary is brought up to date.
+
+        Args:
+            sender: Sender of the message. (e.g., "user" or "agent")
+            content: Content of the message.
+        """
+        message = Message(sender=sender, content=content)
+        self.history.append(message)
+        self.writer.submit(self.conversation_id, message)
+        if sender == "agent" and self.context is not None:
+            self.context.update(self.history)
+
+    async def close(self) -> None:
+        """
+        Stops summarizing, and waits for the messages of the session to be stored.
+        """
+        if self.context is not None:
+            await self.context.close()
+        await self.writer.flush()
+
+
+def spoken_prefix(generation: str, segments: list[str]) -> str:
+    """
+    Cuts a generated answer after the last of its segments that was spoken.
+
+    Segments may have been stripped of surrounding whitespace by the segmentation
+    policy, so each one is located in the answer after the end of the previous one.
+
+    Args:
+        generation: Text generated by the agent.
+        segments: Segments of the text whose audio was delivered, in order.
+
+    Returns:
+        The part of the answer that was spoken.
+    """
+    end = 0
+    for segment in segments:
+        start = generation.find(segment, end)
+        if start == -1:
+            break
+        end = start + len(segment)
+    return generation[:end]
+
+
+class TurnRunner:
+    """
+    Runs the turns of a connection in the background, one at a time.
+
+    Keeping turns off the receive loop lets the next utterance be read while an answer
+    is still being generated and spoken, so that it can interrupt it (barge-in).
+    """
+
+    def __init__(self) -> None:
+        self.interruptions = 0
+        self._turn: asyncio.Task[None] | None = None
+
+    @property
+    def busy(self) -> bool:
+        """Whether a turn is in progress."""
+
+        return self._turn is not None and not self._turn.done()
+
+    def start(self, turn: Coroutine[None, None, None]) -> None:
+        """
+        Starts a turn in the background. The previous turn must have finished or been
+        interrupted.
+
+        Args:
+            turn: Coroutine processing the turn.
+        """
+        self._turn = asyncio.create_task(turn)
+        self._turn.add_done_callback(self._log_failure)
+
+    async def interrupt(self) -> bool:
+        """
+        Cancels the turn in progress, if any, and waits for it to wind down.
+
+        Returns:
+            Whether a turn was interrupted.
+        """
+        turn = self._turn
+        if turn is None or turn.done():
+            return False
+        turn.cancel()
+        await asyncio.gather(turn, return_exceptions=True)
+        self.interruptions += 1
+        logger.info("Turn interrupted by a new utterance")
+        return True
+
+    @staticmethod
+    def _log_failure(turn: asyncio.Task[None]) -> None:
+        """
+        Logs the failure of a turn, which does not close the connection.
+
+        Args:
+            turn: Finished turn.
+        """
+        if not turn.cancelled() and (e := turn.exception()) is not None:
+            logger.opt(exception=e).error(f"Error processing turn. Error: {e}")
+
+    async def close(self) -> None:
+        """
+        Cancels the turn in progress, if any, as nobody is left to hear it.
+        """
+        turn = self._turn
+        if turn is not None:
+            turn.cancel()
+            await asyncio.gather(turn, return_exceptions=True)
@@ -0,0 +1,102 @@
+"""
+Times the columnar analytics engine against the SQL path of the transaction tools.
+
+For each size, generates a synthetic transactions.db, applies the migrations and times
+what every tool runs: the indexed and rollup-backed queries of the SQL path, and the
+vectorized passes over the in-memory columns (once loaded; the load itself is
+reported separately). Each call runs `--repeat` times; the median is reported.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_analytics [--rows 10000 100000 1000000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import aiosqlite
+from loguru import logger
+
+from ai_services.tools import period_start
+from benchmarks.bench_transaction_queries import create_synthetic_db, median_ms
+from customer_transaction_db.analytics import TransactionAnalytics
+from customer_transaction_db.migrations import migrate_transactions_db
+from customer_transaction_db.queries import fetch_recent_transactions, fetch_transactions_above
+from customer_transaction_db.rollups import fetch_rollup_average, fetch_rollup_spending
+
+
+async def sql_unusual(db: aiosqlite.Connection, start_date: str) -> list:
+    average = await fetch_rollup_average(db, start_date=start_date)
+    return await fetch_transactions_above(db, threshold=average * 1.5, start_date=start_date)
+
+
+async def bench(rows: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "transactions.db"
+        create_synthetic_db(path, rows)
+        await migrate_transactions_db(str(path))
+
+        last_month = period_start("last month")
+        this_week = period_start("this week")
+        async with aiosqlite.connect(path) as db:
+            db.row_factory = aiosqlite.Row
+            sql = {
+                "recent": await median_ms(
+                    lambda: fetch_recent_transactions(db, end_date="2023-10-14", category="Travel", limit=5),
+                    repeat,
+                ),
+                "spending": await median_ms(
+                    lambda: fetch_rollup_spending(db, start_date=this_week), repeat
+                ),
+                "unusual": await median_ms(lambda: sql_unusual(db, last_month), repeat),
+            }
+
+            analytics = TransactionAnalytics()
+            started = perf_counter()
+            columns = await analytics.columns(db)
+            load_ms = (perf_counter() - started) * 1000
+
+            async def columnar(run):
+                columns = await analytics.columns(db)
+                return run(columns)
+
+            vectorized = {
+                "recent": await median_ms(
+                    lambda: columnar(lambda c: c.recent(end_date="2023-10-14", category="Travel", limit=5)),
+                    repeat,
+                ),
+                "spending": await median_ms(
+                    lambda: columnar(lambda c: c.spending_by_category(start_date=this_week)), repeat
+                ),
+                "unusual": await median_ms(
+                    lambda: columnar(lambda c: c.unusual(start_date=last_month)), repeat
+                ),
+            }
+
+    memory_mb = sum(
+        getattr(columns, name).nbytes
+        for name in ("amounts", "days", "categories", "merchants", "robust_z", "rolling_z", "new_merchant")
+    ) / 1e6
+    print(f"{rows} transactions, median of {repeat} runs; columns loaded in {load_ms:.0f}ms, {memory_mb:.1f}MB")
+    print(f"{'tool':<12}{'sql':>12}{'columnar':>12}{'speedup':>10}")
+    for name, sql_ms in sql.items():
+        print(f"{name:<12}{sql_ms:>10.2f}ms{vectorized[name]:>10.2f}ms{sql_ms / vectorized[name]:>9.1f}x")
+    print()
+
+
+async def main(sizes: list[int], repeat: int) -> None:
+    for rows in sizes:
+        await bench(rows, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    asyncio.run(main(sizes=args.rows, repeat=args.repeat))
@@ -0,0 +1,93 @@
+"""
+Measures the silence trimming and re-encoding applied before transcription.
+
+For every clip, reports the received and uploaded sizes, the bytes saved, and the
+decode, trim and encode time per second of received audio. By default the clips are
+synthetic browser-like recordings (webm/opus at 48 kHz) with varying amounts of leading
+and trailing silence; pass a directory to benchmark real recordings instead.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_audio_preprocessing [clips_dir]
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from nlp_processor.audio import encode_audio, preprocess_audio
+
+SAMPLE_RATE = 48000
+
+SYNTHETIC_CLIPS = {
+    "tight": [("silence", 0.2), ("speech", 2.0), ("silence", 0.2)],
+    "slow_start": [("silence", 1.5), ("speech", 2.5), ("silence", 0.5)],
+    "long_tail": [("silence", 0.5), ("speech", 3.0), ("silence", 3.0)],
+    "pauses": [("silence", 1.0), ("speech", 1.5), ("silence", 1.0), ("speech", 1.5), ("silence", 2.0)],
+    "empty": [("silence", 3.0)],
+}
+
+
+def synthesize(segments: list[tuple[str, float]], seed: int = 0) -> bytes:
+    """
+    Synthesizes a clip of speech-like tones and background noise as webm/opus.
+
+    Args:
+        segments: ("speech" | "silence", seconds) segments.
+        seed: Seed of the background noise.
+
+    Returns:
+        Encoded clip.
+    """
+    rng = np.random.default_rng(seed)
+    parts = []
+    for kind, seconds in segments:
+        n = int(SAMPLE_RATE * seconds)
+        noise = 0.0005 * rng.standard_normal(n)
+        if kind == "speech":
+            t = np.arange(n) / SAMPLE_RATE
+            pitch = 180 + 40 * np.sin(2 * np.pi * 0.7 * t)
+            envelope = 1 + 0.6 * np.sin(2 * np.pi * 4 * t)
+            noise += 0.25 * np.sin(2 * np.pi * pitch * t) * envelope
+        parts.append(noise)
+    pcm = (np.concatenate(parts) * 32767).astype(np.int16)
+    return encode_audio(pcm, sample_rate=SAMPLE_RATE, container_format="webm", bit_rate=64000)
+
+
+def main(clips_dir: Path | None = None) -> None:
+    if clips_dir is None:
+        clips = {name: synthesize(segments) for name, segments in SYNTHETIC_CLIPS.items()}
+    else:
+        clips = {path.name: path.read_bytes() for path in sorted(clips_dir.iterdir()) if path.is_file()}
+
+    print(
+        f"{'clip':<16}{'audio':>7}{'speech':>8}{'received':>10}{'upload':>9}{'saved':>8}"
+        f"{'decode/s':>10}{'trim/s':>9}{'encode/s':>10}"
+    )
+    received_total = upload_total = 0
+    for name, data in clips.items():
+        prepared = preprocess_audio(data)
+        received_total += len(data)
+        if prepared is None:
+            print(f"{name:<16}{'-':>7}{'-':>8}{len(data):>10}{0:>9}{'100%':>8}   (dropped, no speech)")
+            continue
+        upload_total += len(prepared.data)
+        per_second = 1000 / prepared.duration
+        print(
+            f"{name:<16}{prepared.duration:>6.1f}s{prepared.speech_duration:>7.1f}s"
+            f"{len(data):>10}{len(prepared.data):>9}"
+            f"{1 - len(prepared.data) / len(data):>8.0%}"
+            f"{prepared.decode_seconds * per_second:>8.2f}ms"
+            f"{prepared.trim_seconds * per_second:>7.2f}ms"
+            f"{prepared.encode_seconds * per_second:>8.2f}ms"
+        )
+
+    print()
+    print(
+        f"total received {received_total} bytes, uploaded {upload_total} bytes "
+        f"({1 - upload_total / received_total:.0%} saved)"
+    )
+
+
+if __name__ == "__main__":
+    main(Path(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,149 @@
+"""
+Times conversation history fetches on a PostgreSQL database filled with messages.
+
+Recreates the messages table with its original schema (no index besides the primary
+key), fills it with `--messages` messages spread over `--conversations` conversations
+and the past year, and times fetching the history of random conversations. It then
+applies the migrations (per-message sequence and (conversation_id, seq) index, and
+monthly partitions with `--partitioned`) and times the fetches again. Each measure is
+the median of `--fetches` fetches.
+
+The messages table of the target database is dropped: point it at a scratch database.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_history_db --conninfo "dbname=scratch user=postgres" \
+        [--messages 5000000] [--conversations 100000] [--fetches 200] [--partitioned]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import uuid
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from loguru import logger
+from psycopg_pool import AsyncConnectionPool
+
+from config.settings import get_settings
+from convo_history_db.actions import get_conversation_history
+from convo_history_db.migrations import MIGRATIONS, migrate_history_db
+
+# The history query before the migration, for comparison.
+LEGACY_QUERY = (
+    "SELECT sender, content FROM messages WHERE conversation_id = %s "
+    "ORDER BY timestamp ASC, id ASC"
+)
+
+
+async def create_legacy_table(
+    pool: AsyncConnectionPool, messages: int, conversation_ids: list[uuid.UUID], seed: int = 0
+) -> None:
+    """
+    Recreates the messages table with its original schema and fills it with messages.
+
+    Args:
+        pool: Connection pool to the scratch database.
+        messages: Number of messages.
+        conversation_ids: Conversations the messages are spread over.
+        seed: Seed of the random messages.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    async with pool.connection() as conn:
+        for statement in (
+            "DROP TABLE IF EXISTS messages CASCADE",
+            "DROP TABLE IF EXISTS schema_migrations",
+            "DROP SEQUENCE IF EXISTS messages_seq",
+            *MIGRATIONS[0],
+        ):
+            await conn.execute(statement)
+        async with conn.cursor() as cur:
+            async with cur.copy(
+                "COPY messages (conversation_id, sender, timestamp, content) FROM STDIN"
+            ) as copy:
+                for i in range(messages):
+                    await copy.write_row(
+                        (
+                            rng.choice(conversation_ids),
+                            "user" if i % 2 == 0 else "agent",
+                            now - timedelta(seconds=rng.randrange(365 * 24 * 60 * 60)),
+                            f"How much did I spend on travel in week {i % 52}?",
+                        )
+                    )
+        await conn.execute("ANALYZE messages")
+
+
+async def median_ms(
+    pool: AsyncConnectionPool, fetch, conversation_ids: list[uuid.UUID], fetches: int
+) -> float:
+    rng = random.Random(1)
+    timings = []
+    for _ in range(fetches):
+        conversation_id = rng.choice(conversation_ids)
+        start = perf_counter()
+        await fetch(conversation_id)
+        timings.append((perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def main(
+    conninfo: str, messages: int, conversations: int, fetches: int, partitioned: bool
+) -> None:
+    rng = random.Random(0)
+    conversation_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(conversations)]
+    async with AsyncConnectionPool(conninfo, min_size=1, max_size=2, open=False) as pool:
+        logger.info(f"Filling the messages table with {messages} messages")
+        await create_legacy_table(pool, messages, conversation_ids)
+
+        async def legacy_fetch(conversation_id: uuid.UUID) -> None:
+            async with pool.connection() as conn:
+                cursor = await conn.execute(LEGACY_QUERY, (conversation_id,))
+                await cursor.fetchall()
+
+        before = await median_ms(pool, legacy_fetch, conversation_ids, fetches)
+
+        logger.info("Migrating the messages table")
+        start = perf_counter()
+        await migrate_history_db(pool, partitioned=partitioned)
+        migration_s = perf_counter() - start
+        async with pool.connection() as conn:
+            await conn.execute("ANALYZE messages")
+
+        after = await median_ms(
+            pool,
+            lambda conversation_id: get_conversation_history(pool, conversation_id),
+            conversation_ids,
+            fetches,
+        )
+
+    print(
+        f"{messages} messages in {conversations} conversations, "
+        f"median of {fetches} history fetches"
+    )
+    print(f"{'before':<12}{before:>10.2f}ms")
+    print(f"{'after':<12}{after:>10.2f}ms{before / after:>9.1f}x")
+    print(f"migration took {migration_s:.1f}s{' (partitioned)' if partitioned else ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conninfo", default=None, help="defaults to the DB_* settings")
+    parser.add_argument("--messages", type=int, default=5_000_000)
+    parser.add_argument("--conversations", type=int, default=100_000)
+    parser.add_argument("--fetches", type=int, default=200)
+    parser.add_argument("--partitioned", action="store_true")
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    asyncio.run(
+        main(
+            conninfo=args.conninfo or get_settings().database.conninfo,
+            messages=args.messages,
+            conversations=args.conversations,
+            fetches=args.fetches,
+            partitioned=args.partitioned,
+        )
+    )
@@ -0,0 +1,85 @@
+"""
+Measures the local speech-to-text engine on the audio fixtures.
+
+Starts the engine with 1 to `--workers` worker processes and transcribes every
+fixture clip `--repeat` times, all clips submitted at once so that the workers are
+kept busy. Reports, per number of workers, the start-up time (model load and
+warm-up), the real-time factor (inference time over audio duration, lower is faster),
+the latency of a single clip and the throughput in seconds of audio transcribed per
+second, overall and per worker. Each worker uses `--cpu-threads` inference threads.
+
+Needs faster-whisper (pip install 'backend[local-stt]'); the model is downloaded on
+first use.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_local_stt [--model base.en] [--workers 2] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+from pathlib import Path
+from time import perf_counter
+
+from loguru import logger
+
+from nlp_processor.local_stt import LocalSpeechToText
+
+FIXTURES = Path(__file__).parents[1] / "tests" / "nlp_processor_tests" / "fixtures" / "audio"
+
+
+async def bench(
+    clips: dict[str, bytes], model: str, workers: int, cpu_threads: int, repeat: int
+) -> None:
+    engine = LocalSpeechToText(model_name=model, workers=workers, cpu_threads=cpu_threads)
+    start = perf_counter()
+    await engine.start()
+    startup = perf_counter() - start
+
+    async def timed(name: str, data: bytes) -> float:
+        start = perf_counter()
+        await engine.transcribe(data, filename=name)
+        return perf_counter() - start
+
+    # one clip at a time, for the latency of an utterance
+    latencies = [await timed(name, data) for name, data in clips.items()]
+
+    start = perf_counter()
+    await asyncio.gather(
+        *(timed(name, data) for _ in range(repeat) for name, data in clips.items())
+    )
+    elapsed = perf_counter() - start
+    stats = engine.stats()
+    await engine.close()
+
+    audio = stats["audio_seconds_total"] * repeat / (repeat + 1)
+    print(
+        f"{workers:>7}{startup:>9.1f}s{stats['real_time_factor']:>8.3f}"
+        f"{statistics.median(latencies) * 1000:>10.0f}ms"
+        f"{audio / elapsed:>11.1f}x{audio / elapsed / workers:>11.1f}x"
+    )
+
+
+async def main(model: str, max_workers: int, cpu_threads: int, repeat: int) -> None:
+    clips = {path.name: path.read_bytes() for path in sorted(FIXTURES.iterdir())}
+    print(
+        f"{model}, {len(clips)} clips x {repeat}, {cpu_threads} threads per worker, "
+        f"{os.cpu_count()} CPUs"
+    )
+    print(f"{'workers':>7}{'startup':>10}{'RTF':>8}{'latency':>12}{'throughput':>12}{'per worker':>11}")
+    for workers in range(1, max_workers + 1):
+        await bench(clips, model, workers, cpu_threads, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default="base.en")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--cpu-threads", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    asyncio.run(main(args.model, args.workers, args.cpu_threads, args.repeat))
@@ -0,0 +1,97 @@
+"""
+Measures the local text-to-speech engine on banking answers.
+
+Starts the engine with 1 to `--workers` worker processes and synthesizes every sentence
+of `SENTENCES` `--repeat` times, all sentences submitted at once so that the workers
+are kept busy. Reports, per number of workers, the start-up time (voice load and
+warm-up), the real-time factor (synthesis and encoding time over audio duration, lower
+is faster), the latency of a single sentence and the throughput in seconds of audio
+synthesized per second, overall and per worker. Each worker uses `--cpu-threads`
+inference threads, so the per worker figure is the throughput per core with the
+default of 1.
+
+Needs piper-tts (pip install 'backend[local-tts]') and a Piper voice, e.g.
+    python -m piper.download_voices en_US-lessac-medium
+
+Usage (from src/backend):
+    python -m benchmarks.bench_local_tts --model en_US-lessac-medium.onnx [--workers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+from time import perf_counter
+
+from loguru import logger
+
+from nlp_processor.local_tts import LocalSpeechSynthesis
+from nlp_processor.text_to_speech import ResponseFormat
+
+SENTENCES = [
+    "Hello! I am here to help you with your banking.",
+    "You spent 245 pounds and 30 pence on groceries last month.",
+    "Your most recent transaction was 12 pounds at Pret A Manger on the 14th of October 2023.",
+    "That is 18 percent more than your usual monthly spending on restaurants.",
+    "I found three unusual transactions this week.",
+    "The largest one was 899 pounds at an electronics store.",
+    "You are within your budget for transport this month.",
+    "Is there anything else I can help you with?",
+]
+
+
+async def bench(
+    model: str, workers: int, cpu_threads: int, repeat: int, response_format: ResponseFormat
+) -> None:
+    engine = LocalSpeechSynthesis(model_path=model, workers=workers, cpu_threads=cpu_threads)
+    start = perf_counter()
+    await engine.start()
+    startup = perf_counter() - start
+
+    async def timed(text: str) -> float:
+        start = perf_counter()
+        async for _ in engine.synthesize(
+            text, model, "nova", response_format, speed=1.0, chunk_size=5 * 1024
+        ):
+            pass
+        return perf_counter() - start
+
+    # one sentence at a time, for the latency of a sentence
+    latencies = [await timed(text) for text in SENTENCES]
+
+    start = perf_counter()
+    await asyncio.gather(*(timed(text) for _ in range(repeat) for text in SENTENCES))
+    elapsed = perf_counter() - start
+    stats = engine.stats()
+    await engine.close()
+
+    audio = stats["audio_seconds_total"] * repeat / (repeat + 1)
+    print(
+        f"{workers:>7}{startup:>9.1f}s{stats['real_time_factor']:>8.3f}"
+        f"{statistics.median(latencies) * 1000:>10.0f}ms"
+        f"{audio / elapsed:>11.1f}x{audio / elapsed / workers:>11.1f}x"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(
+        f"{args.model}, {len(SENTENCES)} sentences x {args.repeat}, {args.format}, "
+        f"{args.cpu_threads} threads per worker, {os.cpu_count()} CPUs"
+    )
+    print(f"{'workers':>7}{'startup':>10}{'RTF':>8}{'latency':>12}{'throughput':>12}{'per worker':>11}")
+    for workers in range(1, args.workers + 1):
+        await bench(args.model, workers, args.cpu_threads, args.repeat, args.format)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default="en_US-lessac-medium.onnx")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cpu-threads", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format", default="aac", choices=["mp3", "opus", "aac", "flac", "wav", "pcm"])
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    asyncio.run(main(args))
@@ -0,0 +1,78 @@
+"""
+Replays recorded LLM delta streams through the TTS segmentation policies.
+
+Reports, for every stream and policy, when the first segment is flushed (time to the
+first synthesis request, in milliseconds from the start of the generation request),
+the number of synthesis requests and the mean segment length. The replay is
+deterministic: time comes from the recorded delta offsets, not from the clock.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_segmentation [path/to/streams.json]
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Callable
+
+from nlp_processor.segmentation import AdaptiveSegmenter, FixedSegmenter, Segmenter
+
+FIXTURE = Path(__file__).parent / "fixtures" / "llm_delta_streams.json"
+
+POLICIES: dict[str, Callable[[], Segmenter]] = {
+    "fixed": FixedSegmenter,
+    "adaptive": AdaptiveSegmenter,
+}
+
+
+def replay(
+    segmenter: Segmenter, deltas: list[tuple[int, str]]
+) -> tuple[int, list[str]]:
+    """
+    Replays a delta stream through a segmenter.
+
+    Args:
+        segmenter: Segmentation policy.
+        deltas: Recorded (offset in ms, text) pairs.
+
+    Returns:
+        Offset of the first flush in ms, and the flushed segments.
+    """
+    first_flush = None
+    segments: list[str] = []
+    for offset, text in deltas:
+        if new := segmenter.push(text):
+            first_flush = offset if first_flush is None else first_flush
+            segments.extend(new)
+    if rest := segmenter.flush():
+        first_flush = deltas[-1][0] if first_flush is None else first_flush
+        segments.append(rest)
+    return first_flush or 0, segments
+
+
+def main(path: Path = FIXTURE) -> None:
+    streams = json.loads(path.read_text())["streams"]
+
+    print(f"{'stream':<22}{'policy':<10}{'first flush':>13}{'requests':>10}{'mean len':>10}")
+    totals = {name: [0, 0] for name in POLICIES}
+    for stream in streams:
+        for name, policy in POLICIES.items():
+            first_flush, segments = replay(policy(), stream["deltas"])
+            totals[name][0] += first_flush
+            totals[name][1] += len(segments)
+            mean_length = sum(map(len, segments)) / len(segments)
+            print(
+                f"{stream['name']:<22}{name:<10}{first_flush:>11}ms"
+                f"{len(segments):>10}{mean_length:>10.1f}"
+            )
+
+    print()
+    for name, (first_flush, requests) in totals.items():
+        print(
+            f"{name:<10} mean first flush {first_flush / len(streams):7.1f}ms, "
+            f"total requests {requests}"
+        )
+
+
+if __name__ == "__main__":
+    main(Path(sys.argv[1]) if len(sys.argv) > 1 else FIXTURE)
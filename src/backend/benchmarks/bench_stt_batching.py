@@ -0,0 +1,125 @@
+"""
+Compares the local speech-to-text engine with and without cross-session batching.
+
+Starts the engine with `--workers` worker processes and replays the audio fixtures as
+utterances of concurrent sessions, arriving as a Poisson process at each rate of
+`--rates` utterances per second for `--duration` seconds. Each rate is run with the
+utterances transcribed one by one, then through the batching scheduler with batches of
+up to `--batch-size` utterances gathered for `--window` seconds. Reports, per rate and
+mode, the latency of an utterance (arrival to text) p50/p95/p99, the throughput in
+utterances per second, the average batch size and the utterances that timed out.
+
+Needs faster-whisper (pip install 'backend[local-stt]'); the model is downloaded on
+first use.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_stt_batching [--rates 2,5,10] [--batch-size 8]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+from loguru import logger
+
+from nlp_processor.batching import BatchingSpeechToText
+from nlp_processor.local_stt import LocalSpeechToText
+from nlp_processor.speech_to_text import SpeechToTextBackend
+
+FIXTURES = Path(__file__).parents[1] / "tests" / "nlp_processor_tests" / "fixtures" / "audio"
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def replay(
+    backend: SpeechToTextBackend, clips: list[bytes], rate: float, duration: float, seed: int
+) -> tuple[list[float], int, float]:
+    """
+    Submits utterances arriving as a Poisson process of `rate` per second.
+
+    Returns:
+        Latency of each transcribed utterance, number of failed utterances and elapsed
+        seconds until the last one was answered.
+    """
+    rng = random.Random(seed)
+    latencies: list[float] = []
+    failures = 0
+
+    async def utterance(data: bytes) -> None:
+        nonlocal failures
+        start = perf_counter()
+        try:
+            await backend.transcribe(data, filename="audio.wav")
+            latencies.append(perf_counter() - start)
+        except Exception:
+            failures += 1
+
+    start = perf_counter()
+    tasks = []
+    while perf_counter() - start < duration:
+        tasks.append(asyncio.create_task(utterance(rng.choice(clips))))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return latencies, failures, perf_counter() - start
+
+
+async def main(args: argparse.Namespace) -> None:
+    clips = [path.read_bytes() for path in sorted(FIXTURES.iterdir())]
+    engine = LocalSpeechToText(
+        model_name=args.model, workers=args.workers, cpu_threads=args.cpu_threads
+    )
+    await engine.start()
+    print(
+        f"{args.model}, {args.workers} workers x {args.cpu_threads} threads, "
+        f"batches of up to {args.batch_size} within {args.window * 1000:.0f}ms, "
+        f"{args.duration:.0f}s per run"
+    )
+    print(f"{'rate':>6} {'mode':<9}{'p50':>9}{'p95':>9}{'p99':>9}{'throughput':>12}{'batch':>7}{'timeouts':>9}")
+    for rate in (float(r) for r in args.rates.split(",")):
+        for mode in ("unbatched", "batched"):
+            batcher = None
+            backend: SpeechToTextBackend = engine
+            if mode == "batched":
+                batcher = BatchingSpeechToText(
+                    engine, max_batch_size=args.batch_size, window=args.window, timeout=args.timeout
+                )
+                batcher.start()
+                backend = batcher
+            latencies, failures, elapsed = await replay(
+                backend, clips, rate, args.duration, args.seed
+            )
+            batch = 1.0
+            if batcher is not None:
+                batch = batcher.stats()["batch_size_avg"]
+                await batcher.close()
+            ms = lambda q, latencies=latencies: percentile(latencies, q) * 1000  # noqa: E731
+            print(
+                f"{rate:>5.1f}/s {mode:<9}{ms(50):>7.0f}ms{ms(95):>7.0f}ms{ms(99):>7.0f}ms"
+                f"{len(latencies) / elapsed:>10.1f}/s{batch:>7.1f}{failures:>9}"
+            )
+    await engine.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default="base.en")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--cpu-threads", type=int, default=4)
+    parser.add_argument("--rates", default="2,5,10")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--window", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    asyncio.run(main(args))
@@ -0,0 +1,176 @@
+"""
+Times the transaction tool queries on a synthetic customer transaction database.
+
+Generates a transactions.db of the given size with the schema of the sample data
+(DD-MM-YYYY text dates), times the original full-scan queries, applies the migrations
+(ISO date column, indexes and spending rollups), and times the parameterized queries
+of the tools, answering sums and averages both from indexed scans and from the
+rollups. Each query runs `--repeat` times; the median is reported.
+
+Usage (from src/backend):
+    python -m benchmarks.bench_transaction_queries [--rows 50000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import functools
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Awaitable, Callable
+
+import aiosqlite
+from loguru import logger
+
+from ai_services.tools import month_range, period_start
+from customer_transaction_db.migrations import TRANSACTIONS_TABLE, migrate_transactions_db
+from customer_transaction_db.queries import (
+    fetch_average_amount,
+    fetch_recent_transactions,
+    fetch_spending_by_category,
+    fetch_transactions_above,
+)
+from customer_transaction_db.rollups import fetch_rollup_average, fetch_rollup_spending
+
+CATEGORIES = ["Cosmetic", "Travel", "Clothing", "Electronics", "Restaurant", "Market"]
+MERCHANTS = [f"Merchant {i}" for i in range(200)]
+
+LEGACY_DATE = "strftime('%s', substr(Date, 7, 4) || '-' || substr(Date, 4, 2) || '-' || substr(Date, 1, 2))"
+
+# The queries the tools ran before the migration, for comparison.
+LEGACY_QUERIES = {
+    "recent": f"""
+        SELECT Transaction_Amount, Date, Merchant_Name, Category FROM {TRANSACTIONS_TABLE}
+        WHERE 1=1 AND {LEGACY_DATE} <= strftime('%s', '2023-10-14') AND Category = 'Travel'
+        ORDER BY {LEGACY_DATE} DESC LIMIT 5
+        """,
+    "spending": f"""
+        SELECT Category, SUM(Transaction_Amount) as total_spent FROM {TRANSACTIONS_TABLE}
+        WHERE {LEGACY_DATE} >= strftime('%s', DATE('2023-10-14', '-1 month'))
+        GROUP BY Category
+        """,
+    "average": f"""
+        SELECT AVG(Transaction_Amount) FROM {TRANSACTIONS_TABLE}
+        WHERE {LEGACY_DATE} >= strftime('%s', DATE('2023-10-14', '-1 month'))
+        """,
+    "unusual": f"""
+        SELECT Transaction_Amount, Date, Merchant_Name, Category FROM {TRANSACTIONS_TABLE}
+        WHERE Transaction_Amount > 5000 AND {LEGACY_DATE} >= strftime('%s', DATE('2023-10-14', '-1 month'))
+        """,
+}
+
+
+def create_synthetic_db(path: Path, rows: int, seed: int = 0) -> None:
+    """
+    Creates a customer transaction database with random transactions.
+
+    Args:
+        path: Path of the database file.
+        rows: Number of transactions, spread over the years before 14-10-2023.
+        seed: Seed of the random transactions.
+    """
+    rng = random.Random(seed)
+    end = date(2023, 10, 14)
+    days = max(365, rows // 20)
+    with sqlite3.connect(path) as db:
+        db.execute(
+            f"""
+            CREATE TABLE {TRANSACTIONS_TABLE} (
+                Transaction_ID INTEGER PRIMARY KEY,
+                Date TEXT,
+                Merchant_Name TEXT,
+                Category TEXT,
+                Transaction_Amount REAL
+            )
+            """
+        )
+        db.executemany(
+            f"INSERT INTO {TRANSACTIONS_TABLE} (Date, Merchant_Name, Category, Transaction_Amount) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    (end - timedelta(days=rng.randrange(days))).strftime("%d-%m-%Y"),
+                    rng.choice(MERCHANTS),
+                    rng.choice(CATEGORIES),
+                    round(rng.lognormvariate(7, 1), 2),
+                )
+                for _ in range(rows)
+            ),
+        )
+
+
+async def median_ms(run: Callable[[], Awaitable[object]], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        await run()
+        timings.append((perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def main(rows: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "transactions.db"
+        create_synthetic_db(path, rows)
+
+        async with aiosqlite.connect(path) as db:
+            legacy = {
+                name: await median_ms(functools.partial(db.execute_fetchall, query), repeat)
+                for name, query in LEGACY_QUERIES.items()
+            }
+
+        await migrate_transactions_db(str(path))
+
+        last_month = period_start("last month")
+        august = month_range("2023-08")
+        async with aiosqlite.connect(path) as db:
+            db.row_factory = aiosqlite.Row
+            indexed = {
+                "recent": await median_ms(
+                    lambda: fetch_recent_transactions(db, end_date="2023-10-14", category="Travel", limit=5),
+                    repeat,
+                ),
+                "spending": await median_ms(
+                    lambda: fetch_spending_by_category(db, start_date=last_month), repeat
+                ),
+                "average": await median_ms(
+                    lambda: fetch_average_amount(db, start_date=last_month), repeat
+                ),
+                "spending_rollup": await median_ms(
+                    lambda: fetch_rollup_spending(db, start_date=last_month), repeat
+                ),
+                "average_rollup": await median_ms(
+                    lambda: fetch_rollup_average(db, start_date=last_month), repeat
+                ),
+                "unusual": await median_ms(
+                    lambda: fetch_transactions_above(db, threshold=5000, start_date=last_month),
+                    repeat,
+                ),
+                "unusual_month": await median_ms(
+                    lambda: fetch_transactions_above(db, threshold=5000, start_date=august[0], end_date=august[1]),
+                    repeat,
+                ),
+            }
+
+    print(f"{rows} transactions, median of {repeat} runs")
+    print(f"{'query':<16}{'full scan':>12}{'indexed':>12}{'speedup':>10}")
+    for name, indexed_ms in indexed.items():
+        legacy_ms = legacy.get(name.removesuffix("_rollup"))
+        if legacy_ms is None:
+            print(f"{name:<16}{'-':>12}{indexed_ms:>10.2f}ms{'-':>10}")
+        else:
+            print(f"{name:<16}{legacy_ms:>10.2f}ms{indexed_ms:>10.2f}ms{legacy_ms / indexed_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    asyncio.run(main(rows=args.rows, repeat=args.repeat))
@@ -0,0 +1,135 @@
+"""
+Checks the spending rollups against raw scans of the transactions, and times both.
+
+Builds a synthetic transactions.db, then for random date windows compares the
+per-category and per-merchant sums and the average amount answered from the rollups
+with the same figures computed by scanning the transactions. The check is repeated
+after appending, changing and deleting transactions, so that the maintenance triggers
+are covered too. Exits with status 1 on any mismatch.
+
+Usage (from src/backend):
+    python -m benchmarks.check_rollups [--rows 50000] [--windows 200]
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from time import perf_counter
+
+import aiosqlite
+from loguru import logger
+
+from benchmarks.bench_transaction_queries import CATEGORIES, MERCHANTS, create_synthetic_db
+from customer_transaction_db.migrations import TRANSACTIONS_TABLE, migrate_transactions_db
+from customer_transaction_db.queries import fetch_average_amount, fetch_spending_by_category
+from customer_transaction_db.rollups import fetch_rollup_average, fetch_rollup_spending
+
+
+async def scan_spending_by_merchant(
+    db: aiosqlite.Connection, start_date: str | None, end_date: str | None
+) -> dict[str, float]:
+    rows = await db.execute_fetchall(
+        f"""
+        SELECT Merchant_Name, SUM(Transaction_Amount) FROM {TRANSACTIONS_TABLE}
+        WHERE Date_ISO BETWEEN ? AND ? GROUP BY Merchant_Name
+        """,
+        (start_date or "0000-00-00", end_date or "9999-99-99"),
+    )
+    return {row[0]: row[1] for row in rows}
+
+
+def random_window(rng: random.Random) -> tuple[str | None, str | None]:
+    end = date(2023, 10, 14) - timedelta(days=rng.randrange(900))
+    start = end - timedelta(days=rng.choice([0, 6, 30, 45, 90, 365, 800]))
+    return (
+        None if rng.random() < 0.1 else start.isoformat(),
+        None if rng.random() < 0.1 else end.isoformat(),
+    )
+
+
+def same(a: dict[str, float], b: dict[str, float]) -> bool:
+    return a.keys() == b.keys() and all(math.isclose(a[k], b[k], rel_tol=1e-9, abs_tol=1e-6) for k in a)
+
+
+async def check(db: aiosqlite.Connection, windows: list[tuple[str | None, str | None]]) -> tuple[int, float, float]:
+    """
+    Compares the rollup answers with raw scans over the given windows.
+
+    Returns:
+        Number of mismatches, and total time spent on the rollups and on the scans in ms.
+    """
+    mismatches, rollup_ms, scan_ms = 0, 0.0, 0.0
+    for start_date, end_date in windows:
+        started = perf_counter()
+        by_category = await fetch_rollup_spending(db, start_date, end_date)
+        by_merchant = await fetch_rollup_spending(db, start_date, end_date, key="merchant")
+        average = await fetch_rollup_average(db, start_date, end_date)
+        rolled_up = perf_counter()
+        scanned = (
+            await fetch_spending_by_category(db, start_date, end_date),
+            await scan_spending_by_merchant(db, start_date, end_date),
+            await fetch_average_amount(db, start_date, end_date),
+        )
+        rollup_ms += (rolled_up - started) * 1000
+        scan_ms += (perf_counter() - rolled_up) * 1000
+
+        if not (
+            same(by_category, scanned[0])
+            and same(by_merchant, scanned[1])
+            and math.isclose(average, scanned[2], rel_tol=1e-9, abs_tol=1e-6)
+        ):
+            mismatches += 1
+            print(f"mismatch for window {start_date}..{end_date}")
+    return mismatches, rollup_ms, scan_ms
+
+
+async def main(rows: int, n_windows: int) -> int:
+    rng = random.Random(1)
+    windows = [random_window(rng) for _ in range(n_windows)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "transactions.db"
+        create_synthetic_db(path, rows)
+        await migrate_transactions_db(str(path))
+
+        async with aiosqlite.connect(path) as db:
+            db.row_factory = aiosqlite.Row
+            mismatches, rollup_ms, scan_ms = await check(db, windows)
+            print(f"initial: {mismatches} mismatches, rollups {rollup_ms / n_windows:.2f}ms, scans {scan_ms / n_windows:.2f}ms per window")
+
+            started = perf_counter()
+            await db.executemany(
+                f"INSERT INTO {TRANSACTIONS_TABLE} (Date, Merchant_Name, Category, Transaction_Amount) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        (date(2023, 10, 14) - timedelta(days=rng.randrange(60))).strftime("%d-%m-%Y"),
+                        rng.choice(MERCHANTS),
+                        rng.choice(CATEGORIES),
+                        round(rng.uniform(1, 5000), 2),
+                    )
+                    for _ in range(1000)
+                ],
+            )
+            await db.execute(f"UPDATE {TRANSACTIONS_TABLE} SET Category = 'Travel', Transaction_Amount = Transaction_Amount * 2 WHERE rowid % 97 = 0")
+            await db.execute(f"DELETE FROM {TRANSACTIONS_TABLE} WHERE rowid % 89 = 0")
+            await db.commit()
+            print(f"appended 1000, changed and deleted ~2% of the transactions in {(perf_counter() - started) * 1000:.0f}ms")
+
+            changed_mismatches, rollup_ms, scan_ms = await check(db, windows)
+            print(f"after changes: {changed_mismatches} mismatches, rollups {rollup_ms / n_windows:.2f}ms, scans {scan_ms / n_windows:.2f}ms per window")
+
+    return 1 if mismatches or changed_mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--windows", type=int, default=200)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    sys.exit(asyncio.run(main(rows=args.rows, n_windows=args.windows)))
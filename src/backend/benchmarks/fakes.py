@@ -0,0 +1,262 @@
+"""
+Local stand-ins for the network services of the assistant, for offline benchmarks.
+
+- `FakeGroq` answers transcription requests with scripted utterances.
+- `scripted_model` is a PydanticAI model answering the scripted utterances with the
+  recorded LLM delta streams, calling the matching tool first.
+- `FakeOpenAI` streams synthetic audio for speech requests.
+- `FakeHistoryPool` accepts the conversation history writes without a database.
+
+Each stand-in has a configurable latency, so that a benchmark measures the overhead
+of the process itself rather than of the providers.
+"""
+
+import asyncio
+import itertools
+import json
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import AsyncIterator
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, DeltaToolCalls, FunctionModel
+
+FIXTURE = Path(__file__).parent / "fixtures" / "llm_delta_streams.json"
+
+
+@dataclass(frozen=True)
+class ScriptedTurn:
+    """A turn of the scripted conversation.
+
+    Attributes:
+        utterance: Transcription of the user's audio.
+        tool: Name of the tool the agent calls first, if any.
+        arguments: Arguments of the tool call.
+        stream: Name of the recorded delta stream answering the turn.
+    """
+
+    utterance: str
+    tool: str | None
+    arguments: dict
+    stream: str
+
+
+SCRIPT = [
+    ScriptedTurn("Hello", None, {}, "greeting"),
+    ScriptedTurn(
+        "What were my last five transactions?",
+        "get_recent_transactions",
+        {"last_n": "5"},
+        "recent_transactions",
+    ),
+    ScriptedTurn(
+        "How much did I spend last month?",
+        "summarize_spending",
+        {"time_period": "last month"},
+        "spending_summary",
+    ),
+    ScriptedTurn(
+        "Am I within my budget this month?",
+        "summarize_spending",
+        {"time_period": "this month", "return_budget_status": True},
+        "budget_status",
+    ),
+    ScriptedTurn(
+        "Did I spend anything unusual last month?",
+        "detect_unusual_spending",
+        {"time_period": "last month"},
+        "unusual_spending",
+    ),
+]
+
+
+def load_streams(path: Path = FIXTURE) -> dict[str, list[str]]:
+    """
+    Loads the recorded LLM delta streams.
+
+    Args:
+        path: Path of the fixture.
+
+    Returns:
+        Text deltas of each stream, by name.
+    """
+    streams = json.loads(path.read_text())["streams"]
+    return {s["name"]: [text for _, text in s["deltas"]] for s in streams}
+
+
+class FakeGroq:
+    """
+    Stand-in for `AsyncGroq` transcribing every audio as the next utterance of the
+    script.
+    """
+
+    def __init__(self, latency: float = 0.3) -> None:
+        """
+        Initializes the FakeGroq object.
+
+        Args:
+            latency: Seconds a transcription takes.
+        """
+        self.latency = latency
+        self._utterances = itertools.cycle([turn.utterance for turn in SCRIPT])
+        self.audio = SimpleNamespace(
+            transcriptions=SimpleNamespace(create=self._transcribe)
+        )
+
+    async def _transcribe(self, model, file, **kwargs) -> SimpleNamespace:
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text=next(self._utterances))
+
+    async def close(self) -> None:
+        pass
+
+
+def scripted_model(
+    first_token_latency: float = 0.25, token_delay: float = 0.02
+) -> FunctionModel:
+    """
+    Creates a model answering the scripted utterances. The first request of a turn
+    calls the tool of the utterance, if any; the answer then streams the recorded
+    deltas of the utterance.
+
+    Args:
+        first_token_latency: Seconds before the first delta of a response.
+        token_delay: Seconds between two deltas.
+
+    Returns:
+        PydanticAI model, streaming or not.
+    """
+    streams = load_streams()
+    turns = {turn.utterance: turn for turn in SCRIPT}
+
+    def next_step(messages: list[ModelMessage]) -> tuple[ScriptedTurn | None, bool]:
+        """The scripted turn of the last utterance, and whether its tool was called."""
+        request = messages[-1]
+        called = isinstance(request, ModelRequest) and any(
+            isinstance(part, ToolReturnPart) for part in request.parts
+        )
+        for message in reversed(messages):
+            if isinstance(message, ModelRequest):
+                for part in message.parts:
+                    if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                        return turns.get(part.content), called
+        return None, called
+
+    async def stream(
+        messages: list[ModelMessage], info: AgentInfo
+    ) -> AsyncIterator[str | DeltaToolCalls]:
+        turn, called = next_step(messages)
+        await asyncio.sleep(first_token_latency)
+        if turn is not None and turn.tool is not None and not called:
+            yield {0: DeltaToolCall(name=turn.tool, json_args=json.dumps(turn.arguments))}
+            return
+        for i, delta in enumerate(streams[turn.stream if turn else "greeting"]):
+            if i:
+                await asyncio.sleep(token_delay)
+            yield delta
+
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        # summaries of the older messages
+        await asyncio.sleep(first_token_latency)
+        return ModelResponse(parts=[TextPart("The customer asked about their spending.")])
+
+    return FunctionModel(respond, stream_function=stream, model_name="scripted")
+
+
+class FakeAudioStream:
+    def __init__(self, size: int, chunk_delay: float) -> None:
+        self.size = size
+        self.chunk_delay = chunk_delay
+
+    async def iter_bytes(self, chunk_size: int) -> AsyncIterator[bytes]:
+        for offset in range(0, self.size, chunk_size):
+            await asyncio.sleep(self.chunk_delay)
+            yield bytes(min(chunk_size, self.size - offset))
+
+
+class FakeOpenAI:
+    """
+    Stand-in for `AsyncOpenAI` streaming silent audio for speech requests, sized like
+    compressed speech of the text.
+    """
+
+    def __init__(
+        self,
+        first_byte_latency: float = 0.15,
+        bytes_per_character: int = 250,
+        chunk_delay: float = 0.005,
+    ) -> None:
+        """
+        Initializes the FakeOpenAI object.
+
+        Args:
+            first_byte_latency: Seconds before the audio starts streaming.
+            bytes_per_character: Bytes of audio per character of text.
+            chunk_delay: Seconds between two chunks of audio.
+        """
+        self.first_byte_latency = first_byte_latency
+        self.bytes_per_character = bytes_per_character
+        self.chunk_delay = chunk_delay
+        self.audio = SimpleNamespace(
+            speech=SimpleNamespace(
+                with_streaming_response=SimpleNamespace(create=self._speech)
+            )
+        )
+
+    @asynccontextmanager
+    async def _speech(self, model, input, **kwargs) -> AsyncIterator[FakeAudioStream]:
+        await asyncio.sleep(self.first_byte_latency)
+        yield FakeAudioStream(len(input) * self.bytes_per_character, self.chunk_delay)
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeHistoryPool:
+    """
+    Stand-in for the conversation history connection pool, accepting the writes of the
+    history writer.
+    """
+
+    def __init__(self, latency: float = 0.002) -> None:
+        """
+        Initializes the FakeHistoryPool object.
+
+        Args:
+            latency: Seconds a database round-trip takes.
+        """
+        self.latency = latency
+        self.messages = 0
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator["FakeHistoryPool"]:
+        yield self
+
+    @asynccontextmanager
+    async def cursor(self) -> AsyncIterator["FakeHistoryPool"]:
+        yield self
+
+    async def execute(self, query, params=None) -> None:
+        await asyncio.sleep(self.latency)
+
+    async def executemany(self, query, rows) -> None:
+        await asyncio.sleep(self.latency)
+        self.messages += len(rows)
+
+    def get_stats(self) -> dict[str, int]:
+        return {"messages": self.messages}
@@ -0,0 +1,297 @@
+"""
+Drives concurrent voice sessions against the app served with offline stand-ins.
+
+Serves the FastAPI app in a child process with the providers replaced by the stand-ins
+of `benchmarks.fakes` (transcription, scripted LLM streams with tool calls, speech
+streaming and the history database), then connects `--sessions` websocket clients to
+`/voice_stream`, ramped up over `--ramp` seconds. Each client replays an audio fixture
+`--turns` times, waiting `--think` seconds after each answer. The tools query a
+synthetic transaction database of `--transactions` rows. Reports:
+
+- time to first audio (end of the upload to the first audio frame), p50/p95/p99
+- turn duration and completed turns per second
+- resident memory per session (peak RSS over the idle RSS of the server)
+- event-loop lag of the server, sampled every 10ms
+
+The provider latencies are set with the `--stt-latency`, `--first-token-latency`,
+`--token-delay` and `--tts-latency` options. The TTS cache is disabled, as the scripted
+answers would otherwise all be cached after the first turns.
+
+Usage (from src/backend):
+    python -m benchmarks.load_test [--sessions 50] [--turns 5] [--ramp 5] [--think 1]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+import websockets
+from loguru import logger
+
+AUDIO = Path(__file__).parents[1] / "tests" / "nlp_processor_tests" / "fixtures" / "audio" / "speech.wav"
+
+OFFLINE_ENV = {
+    "GROQ_API_KEY": "offline",
+    "OPENAI_API_KEY": "offline",
+    "DB_NAME": "offline",
+    "DB_USER": "offline",
+    "DB_PASSWORD": "offline",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "LOGFIRE_SEND_TO_LOGFIRE": "false",
+    "LOGFIRE_CONSOLE": "false",
+    "PYDANTIC_AI_NO_BANNER": "1",
+    "TTS_CACHE_MAX_BYTES": "0",
+}
+
+
+@dataclass
+class Latencies:
+    """Provider latencies of the stand-ins, in seconds."""
+
+    stt: float = 0.3
+    first_token: float = 0.25
+    token_delay: float = 0.02
+    tts: float = 0.15
+    db: float = 0.002
+
+
+def rss_bytes() -> int:
+    """Resident memory of the process, or its peak where /proc is not available."""
+
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class LoopMonitor:
+    """Samples how late the event loop wakes up a task sleeping `interval` seconds."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            start = perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(perf_counter() - start - self.interval)
+
+
+def serve(port: int, latencies: Latencies) -> None:
+    """
+    Serves the app with the offline stand-ins. Runs in the child process.
+
+    Args:
+        port: Port to listen on.
+        latencies: Provider latencies of the stand-ins.
+    """
+    from unittest.mock import patch
+
+    import uvicorn
+    from fastapi import Request
+
+    import server
+    from benchmarks.fakes import FakeGroq, FakeHistoryPool, FakeOpenAI, scripted_model
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    monitor = LoopMonitor()
+
+    @server.app.get("/bench/stats")
+    async def bench_stats(request: Request, reset: bool = False) -> dict:
+        monitor.start()
+        lag = monitor.samples
+        if reset:
+            monitor.samples = []
+        return {
+            "rss_bytes": rss_bytes(),
+            "lag_seconds": lag,
+            "history_messages": request.state.pool.messages,
+        }
+
+    async def migrate(pool, partitioned=False) -> int:
+        return 0
+
+    model = scripted_model(
+        first_token_latency=latencies.first_token, token_delay=latencies.token_delay
+    )
+    with (
+        patch.multiple(
+            "api.lifespan",
+            create_db_connection_pool=lambda settings: FakeHistoryPool(latency=latencies.db),
+            migrate_history_db=migrate,
+            create_groq_client=lambda settings: FakeGroq(latency=latencies.stt),
+            create_groq_model=lambda groq_client, model_name=None: model,
+        ),
+        patch(
+            "ai_services.factories.create_openai_client",
+            lambda settings, http_client=None: FakeOpenAI(first_byte_latency=latencies.tts),
+        ),
+    ):
+        uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+@dataclass
+class Results:
+    ttfa: list[float] = field(default_factory=list)
+    turns: list[float] = field(default_factory=list)
+    failures: int = 0
+
+
+async def session(url: str, audio: bytes, turns: int, think: float, results: Results) -> None:
+    """
+    Simulates a client speaking `turns` utterances and listening to the answers.
+    """
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            for _ in range(turns):
+                start = perf_counter()
+                await ws.send(audio)
+                first_audio = None
+                while True:
+                    frame = await ws.recv()
+                    if isinstance(frame, bytes):
+                        first_audio = first_audio or perf_counter()
+                    elif frame.startswith("Agent:"):
+                        break
+                    elif frame.startswith("Control: no_speech"):
+                        raise RuntimeError("No speech detected in the audio fixture")
+                if first_audio is None:
+                    raise RuntimeError("Answer without audio")
+                results.ttfa.append(first_audio - start)
+                results.turns.append(perf_counter() - start)
+                await asyncio.sleep(think)
+    except Exception as e:
+        results.failures += 1
+        logger.error(f"Session failed. Error: {e}")
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def drive(
+    port: int, sessions: int, turns: int, ramp: float, think: float
+) -> None:
+    base = f"http://127.0.0.1:{port}"
+    audio = AUDIO.read_bytes()
+    results = Results()
+    async with httpx.AsyncClient(base_url=base) as http:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                (await http.get("/bench/stats", params={"reset": True})).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+        await asyncio.sleep(1)
+        idle = (await http.get("/bench/stats", params={"reset": True})).json()["rss_bytes"]
+        peak = idle
+
+        async def sample_memory() -> None:
+            nonlocal peak
+            while True:
+                await asyncio.sleep(0.5)
+                peak = max(peak, (await http.get("/bench/stats")).json()["rss_bytes"])
+
+        sampler = asyncio.create_task(sample_memory())
+        start = perf_counter()
+        clients = []
+        for _ in range(sessions):
+            clients.append(
+                asyncio.create_task(
+                    session(f"ws://127.0.0.1:{port}/voice_stream?audio_mime=audio/wav", audio, turns, think, results)
+                )
+            )
+            await asyncio.sleep(ramp / sessions)
+        await asyncio.gather(*clients)
+        elapsed = perf_counter() - start
+        sampler.cancel()
+        stats = (await http.get("/bench/stats")).json()
+
+    lag = stats["lag_seconds"]
+    ms = lambda values, q: percentile(values, q) * 1000  # noqa: E731
+    print(f"{sessions} sessions x {turns} turns, {results.failures} failed sessions, {elapsed:.1f}s")
+    print(f"{'time to first audio':<22}p50 {ms(results.ttfa, 50):>7.0f}ms  p95 {ms(results.ttfa, 95):>7.0f}ms  p99 {ms(results.ttfa, 99):>7.0f}ms")
+    print(f"{'turn duration':<22}p50 {ms(results.turns, 50):>7.0f}ms  p95 {ms(results.turns, 95):>7.0f}ms  p99 {ms(results.turns, 99):>7.0f}ms")
+    print(f"{'event loop lag':<22}p50 {ms(lag, 50):>7.1f}ms  p99 {ms(lag, 99):>7.1f}ms  max {max(lag, default=0) * 1000:>7.1f}ms")
+    print(f"{'throughput':<22}{len(results.turns) / elapsed:.1f} turns/s")
+    print(
+        f"{'memory':<22}idle {idle / 2**20:.0f}MiB, peak {peak / 2**20:.0f}MiB, "
+        f"{(peak - idle) / max(sessions, 1) / 2**10:.0f}KiB per session"
+    )
+    print(f"{'history messages':<22}{stats['history_messages']}")
+
+
+def main(args: argparse.Namespace) -> None:
+    for key, value in OFFLINE_ENV.items():
+        os.environ.setdefault(key, value)
+    # imported once the environment is set, as the settings are read on import
+    from benchmarks.bench_transaction_queries import create_synthetic_db
+
+    transactions_dir = tempfile.TemporaryDirectory()
+    transactions_db = Path(transactions_dir.name) / "transactions.db"
+    create_synthetic_db(transactions_db, args.transactions)
+    os.environ["TRANSACTIONS_DB_PATH"] = str(transactions_db)
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    latencies = Latencies(
+        stt=args.stt_latency,
+        first_token=args.first_token_latency,
+        token_delay=args.token_delay,
+        tts=args.tts_latency,
+    )
+    server = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(port, latencies), daemon=True
+    )
+    server.start()
+    try:
+        asyncio.run(drive(port, args.sessions, args.turns, args.ramp, args.think))
+    finally:
+        server.terminate()
+        server.join()
+        transactions_dir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--ramp", type=float, default=5.0)
+    parser.add_argument("--think", type=float, default=1.0)
+    parser.add_argument("--transactions", type=int, default=10000)
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--first-token-latency", type=float, default=0.25)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tts-latency", type=float, default=0.15)
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    main(args)
@@ -1,8 +1,7 @@
-import os
-
 from functools import lru_cache
 
-from pydantic_settings import BaseSettings
+from pydantic import model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class DatabaseConfig(BaseSettings):
@@ -14,13 +13,44 @@ class DatabaseConfig(BaseSettings):
         password: Database password.
         host: Database host.
         port: Database port.
+        pool_min_size: Number of connections the pool keeps open.
+        pool_max_size: Maximum number of connections of the pool.
+        pool_timeout: Seconds an operation waits for a connection before failing.
+        pool_max_waiting: Maximum number of operations waiting for a connection, no
+            limit if 0.
+        pool_max_idle: Seconds an idle connection above `pool_min_size` is kept.
+        pool_max_lifetime: Seconds after which a connection is replaced.
+        write_batch_size: Maximum number of messages inserted per batch.
+        write_linger: Seconds the history writer waits for more messages before
+            writing a batch.
+        write_max_attempts: Number of times the history writer tries a batch before
+            dropping it.
+        write_flush_timeout: Seconds a closing session waits for its messages to be
+            stored.
+        messages_partitioned: Whether the messages table is partitioned by month.
+        messages_retention_months: Past months of messages kept besides the current
+            one when partitioned; all are kept if 0.
     """
 
-    name: str = os.getenv("DB_NAME")
-    user: str = os.getenv("DB_USER")
-    password: str = os.getenv("DB_PASSWORD")
-    host: str = os.getenv("DB_HOST")
-    port: str = os.getenv("DB_PORT")
+    model_config = SettingsConfigDict(env_prefix="DB_")
+
+    name: str
+    user: str
+    password: str
+    host: str
+    port: str
+    pool_min_size: int = 2
+    pool_max_size: int = 10
+    pool_timeout: float = 5
+    pool_max_waiting: int = 0
+    pool_max_idle: float = 600
+    pool_max_lifetime: float = 3600
+    write_batch_size: int = 500
+    write_linger: float = 0.05
+    write_max_attempts: int = 5
+    write_flush_timeout: float = 5
+    messages_partitioned: bool = False
+    messages_retention_months: int = 0
 
     @property
     def conninfo(self) -> str:
@@ -35,6 +65,97 @@ class DatabaseConfig(BaseSettings):
         )
 
 
+class TransactionsDBConfig(BaseSettings):
+    """
+    Customer transaction database configuration.
+
+    Attributes:
+        db_path: Path to the SQLite database. Defaults to the bundled transactions.db.
+        pool_size: Number of read-only connections shared by all sessions.
+        mmap_size: Bytes of the database file memory-mapped by each connection.
+        cache_size_kib: Page cache of each connection in KiB.
+        cached_statements: Number of prepared statements cached per connection.
+        analytics_engine: "sql" to serve the transaction tools with queries, or
+            "columnar" to serve them from an in-memory copy of the transactions.
+        analytics_window_days: Days of history the rolling z-scores of the columnar
+            engine look back.
+        analytics_min_history: Transactions of history a rolling z-score needs.
+        customer_id: Customer owning the transactions.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="TRANSACTIONS_")
+
+    db_path: str = ""
+    pool_size: int = 4
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size_kib: int = 16 * 1024
+    cached_statements: int = 128
+    analytics_engine: str = "sql"
+    analytics_window_days: int = 90
+    analytics_min_history: int = 5
+    customer_id: str = "Ivanov"
+
+
+class ContextConfig(BaseSettings):
+    """
+    Configuration of the conversation context sent to the agent every turn.
+
+    Attributes:
+        max_tokens: Estimated tokens of the conversation history sent with a turn,
+            summary included.
+        summary_max_tokens: Part of `max_tokens` reserved for the summary of the older
+            messages.
+        summarize: Whether messages leaving the window are summarized, or dropped.
+        summary_model: Groq model writing the summaries.
+        customer_snapshot: Whether a snapshot of the customer's transactions is computed
+            when a session opens and given to the agent, so that the common questions
+            are answered without a tool call.
+        snapshot_transactions: Number of recent transactions in the snapshot.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="CONTEXT_")
+
+    max_tokens: int = 2000
+    summary_max_tokens: int = 300
+    summarize: bool = True
+    summary_model: str = "llama-3.1-8b-instant"
+    customer_snapshot: bool = True
+    snapshot_transactions: int = 5
+
+
+class ToolCacheConfig(BaseSettings):
+    """
+    Configuration of the cache of tool results.
+
+    Attributes:
+        enabled: Whether tool results are cached.
+        max_entries: Maximum number of results cached.
+        ttl_seconds: Seconds a result is reused for.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="TOOL_CACHE_")
+
+    enabled: bool = True
+    max_entries: int = 1024
+    ttl_seconds: float = 300
+
+
+class IntentRouterConfig(BaseSettings):
+    """
+    Configuration of the router answering greetings, thanks and goodbyes without the
+    agent.
+
+    Attributes:
+        enabled: Whether trivial utterances are answered with fixed responses.
+        max_words: Maximum number of words of a routed utterance.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="INTENT_ROUTER_")
+
+    enabled: bool = True
+    max_words: int = 6
+
+
 class EngineConfig(BaseSettings):
     """
     API keys for external services.
@@ -44,8 +165,108 @@ class EngineConfig(BaseSettings):
         OPENAI_API_KEY: OpenAI API authentication key.
     """
 
-    GROQ_API_KEY: str = os.environ["GROQ_API_KEY"]
-    OPENAI_API_KEY: str = os.environ["OPENAI_API_KEY"]
+    GROQ_API_KEY: str
+    OPENAI_API_KEY: str
+
+
+class STTConfig(BaseSettings):
+    """
+    Speech-to-text configuration.
+
+    Attributes:
+        model: Speech-to-text model.
+        preprocess: Whether to trim silence and re-encode audio before upload, dropping
+            utterances without speech.
+        sample_rate: Sample rate of the preprocessed audio in Hz.
+        engine: "groq" to transcribe with the Groq API, or "local" to transcribe on the
+            CPU with a faster-whisper model.
+        local_model: faster-whisper model of the local engine.
+        local_workers: Worker processes of the local engine, each holding the model.
+        local_compute_type: Quantization of the weights of the local model.
+        local_cpu_threads: Inference threads of each worker of the local engine.
+        batch_max_size: Maximum number of utterances of concurrent connections the local
+            engine transcribes as one batch. 1 disables batching.
+        batch_window: Seconds an utterance waits for others to batch with.
+        batch_timeout: Seconds an utterance may wait for its batched transcription.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="STT_")
+
+    model: str = "whisper-large-v3-turbo"
+    preprocess: bool = True
+    sample_rate: int = 16000
+    engine: str = "groq"
+    local_model: str = "base.en"
+    local_workers: int = 1
+    local_compute_type: str = "int8"
+    local_cpu_threads: int = 2
+    batch_max_size: int = 1
+    batch_window: float = 0.02
+    batch_timeout: float = 10
+
+
+class TTSConfig(BaseSettings):
+    """
+    Text-to-speech configuration.
+
+    Attributes:
+        model: Text-to-speech model.
+        voice: Voice used for speech synthesis.
+        response_format: Format of the synthesized audio.
+        max_concurrency: Maximum number of sentences synthesized at once per turn.
+        segmentation: Text segmentation policy, "adaptive" or "fixed".
+        cache_max_bytes: Maximum size of the audio cached in memory.
+        cache_dir: Directory persisting the audio cache. Disabled if empty.
+        cache_dir_max_bytes: Maximum size of the audio persisted in `cache_dir`.
+        warmup_phrases: Phrases synthesized into the cache at startup, separated by "|".
+        max_concurrent_syntheses: Maximum number of syntheses running at once in the
+            process; further requests are queued.
+        max_connections: Maximum number of HTTP connections to the TTS API, or 0 for
+            `max_concurrent_syntheses`. Must not be lower than the latter, so that
+            syntheses are queued by the limiter rather than inside the HTTP client.
+        keepalive_expiry: Seconds an idle HTTP connection is kept alive.
+        http2: Whether to use HTTP/2 for the TTS API (requires the `h2` package).
+        max_idle_handlers: Maximum number of idle handlers kept for reuse.
+        engine: "openai" to synthesize with the OpenAI API, or "local" to synthesize on
+            the CPU with a Piper voice.
+        local_model: Path of the ONNX Piper voice of the local engine.
+        local_workers: Worker processes of the local engine, each holding the voice.
+        local_cpu_threads: Inference threads of each worker of the local engine.
+    """
+
+    model_config = SettingsConfigDict(env_prefix="TTS_")
+
+    model: str = "tts-1"
+    voice: str = "nova"
+    response_format: str = "aac"
+    max_concurrency: int = 3
+    segmentation: str = "adaptive"
+    cache_max_bytes: int = 32 * 1024 * 1024
+    cache_dir: str = ""
+    cache_dir_max_bytes: int = 512 * 1024 * 1024
+    warmup_phrases: str = "Hello!|I am here to help you with your banking."
+    max_concurrent_syntheses: int = 32
+    max_connections: int = 0
+    keepalive_expiry: float = 30
+    http2: bool = False
+    max_idle_handlers: int = 16
+    engine: str = "openai"
+    local_model: str = "en_US-lessac-medium.onnx"
+    local_workers: int = 2
+    local_cpu_threads: int = 1
+
+    @model_validator(mode="after")
+    def check_connection_pool(self) -> "TTSConfig":
+        """Checks that every allowed synthesis can get an HTTP connection."""
+
+        if not self.max_connections:
+            self.max_connections = self.max_concurrent_syntheses
+        if self.max_connections < self.max_concurrent_syntheses:
+            raise ValueError(
+                f"TTS_MAX_CONNECTIONS ({self.max_connections}) must be at least "
+                f"TTS_MAX_CONCURRENT_SYNTHESES ({self.max_concurrent_syntheses})"
+            )
+        return self
 
 
 class Settings(BaseSettings):
@@ -54,11 +275,23 @@ class Settings(BaseSettings):
 
     Attributes:
         database: Configuration for the database.
+        transactions: Configuration for the customer transaction database.
+        tool_cache: Configuration for the cache of tool results.
+        context: Configuration for the conversation context.
+        intent_router: Configuration for the router of trivial utterances.
         engine: API keys.
+        stt: Configuration for speech-to-text.
+        tts: Configuration for text-to-speech.
     """
 
     database: DatabaseConfig = DatabaseConfig()
+    transactions: TransactionsDBConfig = TransactionsDBConfig()
+    tool_cache: ToolCacheConfig = ToolCacheConfig()
+    context: ContextConfig = ContextConfig()
+    intent_router: IntentRouterConfig = IntentRouterConfig()
     engine: EngineConfig = EngineConfig()
+    stt: STTConfig = STTConfig()
+    tts: TTSConfig = TTSConfig()
 
 
 @lru_cache
@@ -8,6 +8,9 @@ def create_db_connection_pool(
     """
     Create a connection pool to the conversation history database. It is closed by default.
 
+    Connections are leased for single operations, never for a whole session, so the
+    pool is sized for the database operations in flight rather than the connected users.
+
     Args:
         settings: Application settings containing database connection information.
 
@@ -15,4 +18,14 @@ def create_db_connection_pool(
         Connection pool to the database.
     """
     
-    return AsyncConnectionPool(conninfo=settings.database.conninfo, open=False)
+    return AsyncConnectionPool(
+        conninfo=settings.database.conninfo,
+        open=False,
+        name="convo_history",
+        min_size=settings.database.pool_min_size,
+        max_size=settings.database.pool_max_size,
+        timeout=settings.database.pool_timeout,
+        max_waiting=settings.database.pool_max_waiting,
+        max_idle=settings.database.pool_max_idle,
+        max_lifetime=settings.database.pool_max_lifetime,
+    )
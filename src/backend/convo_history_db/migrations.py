@@ -0,0 +1,249 @@
+from datetime import date
+
+from loguru import logger
+from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool
+
+# Key of the advisory lock serializing migrations across application instances.
+MIGRATION_LOCK = 0x6D657373  # "mess"
+
+# Each migration brings the schema from version `i` to `i + 1` (schema_migrations).
+MIGRATIONS: list[list[str]] = [
+    # 1: the messages table, as originally created.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            id SERIAL PRIMARY KEY,
+            conversation_id UUID NOT NULL,
+            sender VARCHAR(10) NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            content TEXT NOT NULL
+        )
+        """,
+    ],
+    # 2: per-message sequence giving a stable order to messages recorded in the same
+    # instant (e.g. written in one batch), and the index serving the history of a
+    # conversation without scanning and sorting the table.
+    [
+        "CREATE SEQUENCE IF NOT EXISTS messages_seq",
+        "ALTER TABLE messages ADD COLUMN IF NOT EXISTS seq BIGINT",
+        """
+        UPDATE messages SET seq = ordered.seq
+        FROM (
+            SELECT id, row_number() OVER (ORDER BY timestamp, id) AS seq FROM messages
+        ) AS ordered
+        WHERE messages.id = ordered.id
+        """,
+        "SELECT setval('messages_seq', COALESCE((SELECT max(seq) FROM messages), 0) + 1, false)",
+        "ALTER TABLE messages ALTER COLUMN seq SET DEFAULT nextval('messages_seq')",
+        "ALTER TABLE messages ALTER COLUMN seq SET NOT NULL",
+        "ALTER SEQUENCE messages_seq OWNED BY messages.seq",
+        "CREATE INDEX IF NOT EXISTS idx_messages_conversation_seq ON messages (conversation_id, seq)",
+    ],
+]
+
+
+def _month(day: date, offset: int = 0) -> date:
+    """First day of the month `offset` months after the month of `day`."""
+
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"messages_y{month.year}m{month.month:02d}"
+
+
+async def _schema_version(conn: AsyncConnection) -> int:
+    await conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER NOT NULL)"
+    )
+    cursor = await conn.execute("SELECT max(version) FROM schema_migrations")
+    row = await cursor.fetchone()
+    return (row[0] if row else None) or 0
+
+
+async def _is_partitioned(conn: AsyncConnection) -> bool:
+    cursor = await conn.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'messages'::regclass"
+    )
+    return await cursor.fetchone() is not None
+
+
+async def _partition_by_month(conn: AsyncConnection) -> None:
+    """
+    Rebuilds the messages table as a table partitioned by month of `timestamp`, with a
+    default partition for messages outside the monthly ones.
+    """
+    cursor = await conn.execute("SELECT min(timestamp), max(timestamp) FROM messages")
+    first, last = await cursor.fetchone() or (None, None)
+    today = date.today()
+    first = _month(first.date() if first else today)
+    last = _month(last.date() if last else today)
+
+    statements = [
+        "ALTER TABLE messages RENAME TO messages_unpartitioned",
+        "ALTER INDEX idx_messages_conversation_seq RENAME TO idx_messages_unpartitioned_conversation_seq",
+        "ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey",
+        """
+        CREATE TABLE messages (
+            LIKE messages_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """,
+        "CREATE INDEX idx_messages_conversation_seq ON messages (conversation_id, seq)",
+        "CREATE TABLE messages_default PARTITION OF messages DEFAULT",
+    ]
+    month = first
+    while month <= _month(last, 1):
+        statements.append(_create_partition(month))
+        month = _month(month, 1)
+    statements += [
+        """
+        INSERT INTO messages (id, conversation_id, sender, timestamp, content, seq)
+        SELECT id, conversation_id, sender, COALESCE(timestamp, CURRENT_TIMESTAMP), content, seq
+        FROM messages_unpartitioned
+        """,
+        "ALTER SEQUENCE messages_id_seq OWNED BY messages.id",
+        "ALTER SEQUENCE messages_seq OWNED BY messages.seq",
+        "DROP TABLE messages_unpartitioned",
+    ]
+    for statement in statements:
+        await conn.execute(statement)
+
+
+def _create_partition(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF messages "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_month(month, 1).isoformat()}')"
+    )
+
+
+async def _add_partition(conn: AsyncConnection, month: date) -> None:
+    """
+    Creates the partition of a month, unless it exists. Messages of the month stored
+    while it was missing are in the default partition, which would make the creation
+    fail, so they are moved to the new partition with the default one detached.
+    """
+    bounds = (month.isoformat(), _month(month, 1).isoformat())
+    cursor = await conn.execute(
+        "SELECT 1 FROM messages_default WHERE timestamp >= %s AND timestamp < %s LIMIT 1",
+        bounds,
+    )
+    if await cursor.fetchone() is None:
+        await conn.execute(_create_partition(month))
+        return
+
+    logger.info(f"Moving the messages of {month:%Y-%m} out of the default partition")
+    columns = "id, conversation_id, sender, timestamp, content, seq"
+    await conn.execute("ALTER TABLE messages DETACH PARTITION messages_default")
+    await conn.execute(_create_partition(month))
+    await conn.execute(
+        f"""
+        INSERT INTO messages ({columns})
+        SELECT {columns} FROM messages_default WHERE timestamp >= %s AND timestamp < %s
+        """,
+        bounds,
+    )
+    await conn.execute(
+        "DELETE FROM messages_default WHERE timestamp >= %s AND timestamp < %s", bounds
+    )
+    await conn.execute("ALTER TABLE messages ATTACH PARTITION messages_default DEFAULT")
+
+
+async def migrate_history_db(
+    pool: AsyncConnectionPool, partitioned: bool = False
+) -> int:
+    """
+    Brings the conversation history database up to the latest schema version.
+
+    Every pending migration runs in its own transaction, holding an advisory lock so
+    that instances starting together migrate once. If `partitioned`, the messages table
+    is then rebuilt as a table partitioned by month, unless it already is.
+
+    Args:
+        pool: Connection pool to the database.
+        partitioned: Whether the messages table should be partitioned by month.
+
+    Returns:
+        Schema version of the database after the migration.
+    """
+    async with pool.connection() as conn:
+        while True:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+                version = await _schema_version(conn)
+                if version >= len(MIGRATIONS):
+                    break
+                logger.info(f"Migrating the conversation history database to version {version + 1}")
+                for statement in MIGRATIONS[version]:
+                    await conn.execute(statement)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version) VALUES (%s)", (version + 1,)
+                )
+
+        if partitioned:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+                if not await _is_partitioned(conn):
+                    logger.info("Partitioning the messages table by month")
+                    await _partition_by_month(conn)
+        return version
+
+
+async def maintain_partitions(
+    pool: AsyncConnectionPool, months_ahead: int = 2, retention_months: int = 0
+) -> list[str]:
+    """
+    Creates the monthly partitions of the current and coming months, and drops the
+    partitions of the months past the retention period. Does nothing if the messages
+    table is not partitioned.
+
+    Each month is created in its own transaction, so that a month failing (e.g. on a
+    lock timeout) neither undoes nor blocks the others, nor the drops.
+
+    Args:
+        pool: Connection pool to the database.
+        months_ahead: Number of months after the current one to create partitions for.
+        retention_months: Number of past months to keep, besides the current one; all
+            are kept if 0.
+
+    Returns:
+        Names of the dropped partitions.
+    """
+    today = date.today()
+    dropped = []
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+            if not await _is_partitioned(conn):
+                return []
+
+        for offset in range(months_ahead + 1):
+            month = _month(today, offset)
+            try:
+                async with conn.transaction():
+                    await conn.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+                    await _add_partition(conn, month)
+            except Exception as e:
+                logger.error(f"Could not create the message partition of {month:%Y-%m}. Error: {e}")
+
+        if retention_months > 0:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+                oldest_kept = _partition_name(_month(today, -retention_months))
+                cursor = await conn.execute(
+                    """
+                    SELECT child.relname FROM pg_inherits
+                    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                    WHERE pg_inherits.inhparent = 'messages'::regclass
+                    AND child.relname ~ '^messages_y[0-9]{4}m[0-9]{2}$'
+                    """
+                )
+                for (name,) in await cursor.fetchall():
+                    if name < oldest_kept:
+                        await conn.execute(f"DROP TABLE {name}")
+                        dropped.append(name)
+    if dropped:
+        logger.info(f"Dropped the message partitions past retention: {', '.join(sorted(dropped))}")
+    return dropped
@@ -0,0 +1,260 @@
+import asyncio
+from time import perf_counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from loguru import logger
+from psycopg_pool import AsyncConnectionPool
+from pydantic import UUID4
+
+from config.settings import Settings
+
+INSERT_MESSAGE = (
+    "INSERT INTO messages (conversation_id, sender, timestamp, content) "
+    "VALUES (%s, %s, %s, %s);"
+)
+
+
+@dataclass(slots=True, frozen=True)
+class Message:
+    """A message of a conversation.
+
+    Attributes:
+        sender: Sender of the message. (e.g., "user" or "agent")
+        content: Content of the message.
+        timestamp: When the message was recorded, in UTC.
+    """
+
+    sender: str
+    content: str
+    timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class HistoryWriter:
+    """
+    Write-behind writer of the conversation history database shared by all sessions.
+
+    Messages are queued without waiting for the database and inserted in batches, across
+    all conversations, with one `executemany` and one commit per batch. The writer
+    lingers briefly after the first queued message to gather a batch, and the next batch
+    is written as soon as the previous one is committed, so batches grow with the load.
+    Failed batches are retried in order, up to `max_attempts` times before they are
+    dropped, keeping at most `max_pending` messages queued.
+    """
+
+    def __init__(
+        self,
+        pool: AsyncConnectionPool,
+        batch_size: int = 500,
+        linger: float = 0.05,
+        max_pending: int = 100_000,
+        retry_delay: float = 1.0,
+        max_attempts: int = 5,
+        flush_timeout: float = 5.0,
+    ) -> None:
+        """
+        Initializes the HistoryWriter object. Messages are only written once `start`
+        is called.
+
+        Args:
+            pool: Connection pool to the conversation history database.
+            batch_size: Maximum number of messages inserted per batch.
+            linger: Seconds to wait for more messages before writing a batch.
+            max_pending: Maximum number of messages queued; the oldest are dropped
+                beyond it while the database is unavailable.
+            retry_delay: Seconds to wait before retrying a failed batch.
+            max_attempts: Number of times a batch is tried before it is dropped.
+            flush_timeout: Seconds a flush waits for the messages to be stored.
+        """
+        self.pool = pool
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_pending = max_pending
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.flush_timeout = flush_timeout
+        self._pending: list[tuple[UUID4, str, datetime, str]] = []
+        self._queued = asyncio.Event()
+        # messages submitted, and messages stored or dropped, in submission order
+        self._submitted = 0
+        self._done = 0
+        # flushes waiting for the messages up to a count to be done
+        self._waiters: list[tuple[int, asyncio.Future[None]]] = []
+        self._task: asyncio.Task[None] | None = None
+        self.batches = 0
+        self.messages = 0
+        self.failures = 0
+        self.dropped = 0
+        self.write_seconds = 0.0
+
+    def start(self) -> None:
+        """
+        Starts writing queued messages in the background.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, conversation_id: UUID4, message: Message) -> None:
+        """
+        Queues a message to be stored.
+
+        Args:
+            conversation_id: Unique identifier for the conversation.
+            message: Message to store.
+        """
+        self._pending.append(
+            (conversation_id, message.sender, message.timestamp, message.content)
+        )
+        self._submitted += 1
+        self._trim()
+        self._queued.set()
+
+    async def _run(self) -> None:
+        """
+        Writes the queued messages in batches until cancelled.
+        """
+        while True:
+            await self._queued.wait()
+            await asyncio.sleep(self.linger)
+            self._queued.clear()
+            while self._pending:
+                batch = self._pending[: self.batch_size]
+                del self._pending[: len(batch)]
+                await self._write(batch)
+                self._advance(len(batch))
+
+    async def _write(self, batch: list[tuple[UUID4, str, datetime, str]]) -> None:
+        """
+        Inserts a batch of messages, retrying it up to `max_attempts` times before
+        dropping it.
+
+        Args:
+            batch: Rows of the messages.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            start = perf_counter()
+            try:
+                async with self.pool.connection() as conn:
+                    async with conn.cursor() as cur:
+                        await cur.executemany(INSERT_MESSAGE, batch)
+            except Exception as e:
+                self.failures += 1
+                logger.error(
+                    f"Error storing {len(batch)} messages (attempt {attempt} of "
+                    f"{self.max_attempts}). Error: {e}"
+                )
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(self.retry_delay)
+                continue
+            self.batches += 1
+            self.messages += len(batch)
+            self.write_seconds += perf_counter() - start
+            return
+
+        self.dropped += len(batch)
+        conversations = sorted({str(row[0]) for row in batch})
+        logger.error(
+            f"Dropped {len(batch)} messages of conversations {conversations} after "
+            f"{self.max_attempts} failed attempts"
+        )
+
+    def _advance(self, count: int) -> None:
+        """
+        Counts messages as stored or dropped, waking up the flushes waiting for them.
+        """
+        self._done += count
+        waiting = []
+        for target, waiter in self._waiters:
+            if self._done >= target:
+                if not waiter.done():
+                    waiter.set_result(None)
+            else:
+                waiting.append((target, waiter))
+        self._waiters = waiting
+
+    def _trim(self) -> None:
+        """
+        Drops the oldest queued messages beyond `max_pending`.
+        """
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            logger.warning(f"Conversation history writer is behind, dropped {overflow} messages")
+            self._advance(overflow)
+
+    async def flush(self, timeout: float | None = None) -> None:
+        """
+        Waits until the messages submitted so far have been stored (or dropped), giving
+        up after a timeout.
+
+        Args:
+            timeout: Maximum number of seconds to wait, `flush_timeout` if None.
+        """
+        target = self._submitted
+        if self._task is None or self._task.done() or self._done >= target:
+            return
+        timeout = self.flush_timeout if timeout is None else timeout
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((target, waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except TimeoutError:
+            self._waiters.remove((target, waiter))
+            logger.error(
+                f"Could not store {target - self._done} messages within {timeout} "
+                f"seconds, {len(self._pending)} messages are still queued"
+            )
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Stores the queued messages, giving up after a timeout, and stops the writer.
+
+        Args:
+            timeout: Maximum number of seconds to wait for the queued messages.
+        """
+        await self.flush(timeout)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, float]:
+        """
+        Writer counters.
+
+        Returns:
+            Messages queued, batches and messages written, failed batches, dropped
+            messages and time spent writing the batches.
+        """
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "messages": self.messages,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "write_seconds_total": self.write_seconds,
+        }
+
+
+def create_history_writer(
+    pool: AsyncConnectionPool,
+    settings: Settings,
+) -> HistoryWriter:
+    """
+    Create the writer of the conversation history database. It is stopped by default.
+
+    Args:
+        pool: Connection pool to the conversation history database.
+        settings: Application settings containing the batching configuration.
+
+    Returns:
+        Write-behind writer of the conversation history.
+    """
+    return HistoryWriter(
+        pool=pool,
+        batch_size=settings.database.write_batch_size,
+        linger=settings.database.write_linger,
+        max_attempts=settings.database.write_max_attempts,
+        flush_timeout=settings.database.write_flush_timeout,
+    )
@@ -0,0 +1,391 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Iterable, Sequence, cast
+
+import aiosqlite
+import numpy as np
+from loguru import logger
+
+from config.settings import Settings
+from customer_transaction_db.migrations import TRANSACTIONS_TABLE
+from customer_transaction_db.queries import fetch_data_version
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+# Number of transactions scanned at a time, from the most recent, for the recent ones.
+RECENT_BLOCK = 4096
+
+# Scale making the median absolute deviation comparable to a standard deviation.
+MAD_SCALE = 0.6745
+
+
+def _day(iso_date: str | None, default: int) -> int:
+    """Day number of a YYYY-MM-DD date, `default` if None."""
+
+    return int((np.datetime64(iso_date, "D") - EPOCH).astype(int)) if iso_date else default
+
+
+def _encode(values: Iterable[str | None]) -> tuple[np.ndarray, list[str | None]]:
+    """
+    Dictionary-encodes a column.
+
+    Returns:
+        Code of every value, and the value of every code.
+    """
+    vocabulary: dict[str | None, int] = {}
+    codes = np.fromiter(
+        (vocabulary.setdefault(value, len(vocabulary)) for value in values),
+        dtype=np.int32,
+    )
+    return codes, list(vocabulary)
+
+
+@dataclass(frozen=True)
+class TransactionColumns:
+    """
+    Columnar, in-memory copy of the transactions, ordered by date, with per-transaction
+    statistics computed once when it is built.
+
+    Attributes:
+        amounts: Transaction amounts.
+        days: Transaction dates as days since 1970-01-01.
+        categories: Dictionary-encoded categories, see `category_names`.
+        merchants: Dictionary-encoded merchants, see `merchant_names`.
+        category_names: Category of every category code.
+        merchant_names: Merchant of every merchant code.
+        category_medians: Median amount of every category, or of all the transactions
+            for categories with too few of them.
+        robust_z: Distance of every amount from the median of its category, in scaled
+            median absolute deviations.
+        rolling_z: Z-score of every amount against the transactions of its category in
+            the preceding days (NaN without enough history).
+        new_merchant: Whether a transaction falls on the first day the customer paid its
+            merchant.
+    """
+
+    amounts: np.ndarray
+    days: np.ndarray
+    categories: np.ndarray
+    merchants: np.ndarray
+    category_names: list[str | None]
+    merchant_names: list[str | None]
+    category_medians: np.ndarray
+    robust_z: np.ndarray
+    rolling_z: np.ndarray
+    new_merchant: np.ndarray
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Sequence[Sequence[Any]],
+        window_days: int = 90,
+        min_history: int = 5,
+    ) -> "TransactionColumns":
+        """
+        Builds the columns from (Date_ISO, Merchant_Name, Category, Transaction_Amount)
+        rows ordered by date.
+
+        Args:
+            rows: Transactions, oldest first.
+            window_days: Number of preceding days the rolling z-scores look back.
+            min_history: Number of transactions the statistics of a category need.
+        """
+        amounts = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+        days = (np.array([row[0] for row in rows], dtype="datetime64[D]") - EPOCH).astype(np.int32)
+        merchants, merchant_names = _encode(row[1] for row in rows)
+        categories, category_names = _encode(row[2] for row in rows)
+
+        # categories without enough history are compared with all the transactions
+        overall = (np.median(amounts), np.median(np.abs(amounts - np.median(amounts)))) if len(rows) else (0.0, 0.0)
+        medians = np.zeros(len(category_names))
+        robust_z = np.full(len(rows), np.nan)
+        for code in range(len(category_names)):
+            in_category = categories == code
+            values = amounts[in_category]
+            if len(values) >= min_history:
+                median = np.median(values)
+                mad = np.median(np.abs(values - median))
+            else:
+                median, mad = overall
+            medians[code] = median
+            if mad > 0:
+                robust_z[in_category] = MAD_SCALE * (values - median) / mad
+
+        # merchants first seen on the day of the transaction
+        _, first = np.unique(merchants, return_index=True)
+        first_day = np.empty(len(merchant_names), dtype=np.int32)
+        first_day[merchants[first]] = days[first]
+        new_merchant = days == first_day[merchants]
+
+        return cls(
+            amounts=amounts,
+            days=days,
+            categories=categories,
+            merchants=merchants,
+            category_names=category_names,
+            merchant_names=merchant_names,
+            category_medians=medians,
+            robust_z=robust_z,
+            rolling_z=cls._rolling_z(amounts, days, categories, window_days, min_history),
+            new_merchant=new_merchant,
+        )
+
+    @staticmethod
+    def _rolling_z(
+        amounts: np.ndarray,
+        days: np.ndarray,
+        categories: np.ndarray,
+        window_days: int,
+        min_history: int,
+    ) -> np.ndarray:
+        """
+        Z-scores of the amounts against the transactions of the same category in the
+        `window_days` days before theirs, from prefix sums over the transactions grouped
+        by category and ordered by date.
+        """
+        if len(amounts) == 0:
+            return np.empty(0)
+        order = np.lexsort((days, categories))
+        offset = (days[order] - days.min()).astype(np.int64)
+        group = categories[order].astype(np.int64) << 32
+        key = group | offset
+
+        # preceding days of the same category: [first day of the window, own day)
+        lo = np.searchsorted(key, group | np.maximum(offset - window_days, 0), side="left")
+        hi = np.searchsorted(key, key, side="left")
+
+        values = amounts[order]
+        sums = np.concatenate(([0.0], np.cumsum(values)))
+        squares = np.concatenate(([0.0], np.cumsum(values * values)))
+        n = hi - lo
+        total = sums[hi] - sums[lo]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = total / n
+            var = np.maximum((squares[hi] - squares[lo] - total * mean) / (n - 1), 0.0)
+            z = np.where((n >= min_history) & (var > 0), (values - mean) / np.sqrt(var), np.nan)
+
+        rolling_z = np.empty(len(amounts))
+        rolling_z[order] = z
+        return rolling_z
+
+    def _window(self, start_date: str | None, end_date: str | None) -> slice:
+        """Positions of the transactions of an inclusive YYYY-MM-DD date range."""
+
+        # int32 bounds, so that the search does not convert the days to a wider type
+        start = np.searchsorted(self.days, np.int32(_day(start_date, np.iinfo(np.int32).min)), side="left")
+        end = np.searchsorted(self.days, np.int32(_day(end_date, np.iinfo(np.int32).max)), side="right")
+        return slice(start, end)
+
+    def _transaction(self, i: int) -> dict[str, Any]:
+        return {
+            "Transaction_Amount": float(self.amounts[i]),
+            "Date": (EPOCH + np.timedelta64(int(self.days[i]), "D")).item().strftime("%d-%m-%Y"),
+            "Merchant_Name": self.merchant_names[self.merchants[i]],
+            "Category": self.category_names[self.categories[i]],
+        }
+
+    def recent(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        category: str | None = None,
+        merchant: str | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Retrieves the most recent transactions matching the given filters.
+
+        Args:
+            start_date: First date (YYYY-MM-DD) of the transactions.
+            end_date: Last date (YYYY-MM-DD) of the transactions.
+            category: Category of the transactions.
+            merchant: Merchant of the transactions.
+            limit: Maximum number of transactions, all if None.
+
+        Returns:
+            Matching transactions, most recent first.
+        """
+        window = self._window(start_date, end_date)
+        filters = []
+        for value, codes, names in (
+            (category, self.categories, self.category_names),
+            (merchant, self.merchants, self.merchant_names),
+        ):
+            if value:
+                if value not in names:
+                    return []
+                filters.append((codes, names.index(value)))
+
+        # scan back from the end of the window until enough transactions are found
+        positions: list[int] = []
+        stop = window.stop
+        while stop > window.start and (limit is None or len(positions) < limit):
+            start = window.start if limit is None else max(window.start, stop - RECENT_BLOCK)
+            mask = np.ones(stop - start, dtype=bool)
+            for codes, code in filters:
+                mask &= codes[start:stop] == code
+            positions.extend((np.flatnonzero(mask) + start)[::-1].tolist())
+            stop = start
+        return [self._transaction(i) for i in positions[:limit]]
+
+    def spending_by_category(
+        self, start_date: str | None = None, end_date: str | None = None
+    ) -> dict[str, float]:
+        """
+        Sums the spending per category over a date range.
+
+        Args:
+            start_date: First date (YYYY-MM-DD) of the range.
+            end_date: Last date (YYYY-MM-DD) of the range.
+
+        Returns:
+            Total amount spent per category.
+        """
+        window = self._window(start_date, end_date)
+        n = len(self.category_names)
+        codes = self.categories[window]
+        totals = np.bincount(codes, weights=self.amounts[window], minlength=n)
+        counts = np.bincount(codes, minlength=n)
+        # like GROUP BY, transactions without a category are summed under None
+        return {
+            cast(str, self.category_names[code]): float(totals[code])
+            for code in np.flatnonzero(counts)
+        }
+
+    def unusual(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        threshold: float | None = None,
+        z_threshold: float = 3.5,
+    ) -> list[dict[str, Any]]:
+        """
+        Flags the transactions of a date range that stand out from the customer's usual
+        spending in their category: amounts far from the category median, amounts far
+        above the category's recent spending, and larger than usual first payments to a
+        merchant. With an explicit threshold, flags the amounts exceeding it instead.
+
+        Args:
+            start_date: First date (YYYY-MM-DD) of the range.
+            end_date: Last date (YYYY-MM-DD) of the range.
+            threshold: Amount the transactions must exceed, overriding the statistics.
+            z_threshold: Robust or rolling z-score above which an amount is unusual.
+
+        Returns:
+            Flagged transactions, most recent first, with the usual amount of their
+            category and the reasons they were flagged.
+        """
+        window = self._window(start_date, end_date)
+        amounts = self.amounts[window]
+        usual = self.category_medians[self.categories[window]]
+        far_from_median = self.robust_z[window] > z_threshold
+        above_recent = self.rolling_z[window] > z_threshold
+        new_merchant = self.new_merchant[window] & (amounts > usual)
+        if threshold is not None:
+            flagged = amounts > threshold
+        else:
+            flagged = far_from_median | above_recent | new_merchant
+
+        flags = []
+        for i in np.flatnonzero(flagged)[::-1]:
+            reasons = [
+                reason
+                for reason, hit in (
+                    ("far above the usual amount for the category", far_from_median[i]),
+                    ("well above recent spending in the category", above_recent[i]),
+                    ("first payment to this merchant", new_merchant[i]),
+                )
+                if hit
+            ]
+            flags.append(
+                self._transaction(window.start + i)
+                | {"Usual_Amount": round(float(usual[i]), 2), "Reasons": reasons}
+            )
+        return flags
+
+
+class TransactionAnalytics:
+    """
+    Serves the transaction tools from a columnar copy of the customer's transactions.
+
+    The columns are loaded once and shared by all sessions; they are rebuilt when the
+    version counter of the database shows the transactions changed.
+    """
+
+    def __init__(self, window_days: int = 90, min_history: int = 5) -> None:
+        """
+        Initializes the TransactionAnalytics object.
+
+        Args:
+            window_days: Number of preceding days the rolling z-scores look back.
+            min_history: Number of preceding transactions a rolling z-score needs.
+        """
+        self.window_days = window_days
+        self.min_history = min_history
+        self._columns: TransactionColumns | None = None
+        self._version: int | None = None
+        self._lock = asyncio.Lock()
+        self.loads = 0
+
+    async def columns(self, db: aiosqlite.Connection) -> TransactionColumns:
+        """
+        Gets the columns, (re)loading them if the transactions changed.
+
+        Args:
+            db: Connection to the customer transaction database.
+
+        Returns:
+            Columnar copy of the transactions.
+        """
+        version = await fetch_data_version(db)
+        if self._columns is not None and version == self._version:
+            return self._columns
+
+        async with self._lock:
+            if self._columns is None or version != self._version:
+                async with db.execute(
+                    f"""
+                    SELECT Date_ISO, Merchant_Name, Category, Transaction_Amount
+                    FROM {TRANSACTIONS_TABLE}
+                    WHERE Date_ISO IS NOT NULL AND Transaction_Amount IS NOT NULL
+                    ORDER BY Date_ISO, rowid
+                    """
+                ) as cursor:
+                    rows = list(await cursor.fetchall())
+                self._columns = await asyncio.to_thread(
+                    TransactionColumns.from_rows, rows, self.window_days, self.min_history
+                )
+                self._version = version
+                self.loads += 1
+                logger.info(f"Loaded {len(rows)} transactions at version {version} into memory")
+            return self._columns
+
+    def stats(self) -> dict[str, float]:
+        """
+        Analytics counters.
+
+        Returns:
+            Transactions held in memory, and number of loads.
+        """
+        return {
+            "transactions": 0 if self._columns is None else len(self._columns.amounts),
+            "loads": self.loads,
+        }
+
+
+def create_transaction_analytics(settings: Settings) -> TransactionAnalytics | None:
+    """
+    Create the in-memory analytics engine, if the settings select it.
+
+    Args:
+        settings: Application settings containing the analytics configuration.
+
+    Returns:
+        Analytics engine, or None to serve the tools with SQL queries.
+    """
+    if settings.transactions.analytics_engine != "columnar":
+        return None
+    return TransactionAnalytics(
+        window_days=settings.transactions.analytics_window_days,
+        min_history=settings.transactions.analytics_min_history,
+    )
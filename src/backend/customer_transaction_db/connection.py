@@ -1,19 +1,163 @@
+import asyncio
 import os.path
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import AsyncIterator
+
 import aiosqlite
+from loguru import logger
+
+from config.settings import Settings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "transactions.db")
 
-async def get_customer_sqlite_client():
+
+class SQLiteConnectionPool:
     """
-    Return a database connection for use as a dependency.
-    This connection has the Row row factory automatically attached.
+    Fixed-size pool of long-lived, read-only connections to a SQLite database.
+
+    Every connection (and so every aiosqlite worker thread) is opened once, when the
+    pool is opened, and leased to one query at a time. Connections are opened with
+    `mode=ro` and `query_only`, memory-map the database file, keep a tuned page cache
+    and cache their prepared statements; they have the Row row factory attached.
     """
 
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    db_path = os.path.join(BASE_DIR, "transactions.db")
-    db = await aiosqlite.connect(db_path)
-    db.row_factory = aiosqlite.Row
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 4,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kib: int = 16 * 1024,
+        cached_statements: int = 128,
+    ) -> None:
+        """
+        Initializes the SQLiteConnectionPool object. The pool is closed until `open`
+        is called.
+
+        Args:
+            db_path: Path to the SQLite database file.
+            size: Number of connections.
+            mmap_size: Bytes of the database file memory-mapped by each connection.
+            cache_size_kib: Page cache of each connection in KiB.
+            cached_statements: Number of prepared statements cached per connection.
+        """
+        self.db_path = db_path
+        self.size = size
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.cached_statements = cached_statements
+        self._connections: list[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self.waiting = 0
+        self.leases = 0
+        self.total_wait = 0.0
+
+    async def open(self) -> None:
+        """
+        Opens the connections of the pool.
+        """
+        for _ in range(self.size - len(self._connections)):
+            conn = await self._connect()
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """
+        Opens a read-only connection and tunes it for reading.
+        """
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"No database at {self.db_path}")
+        conn = await aiosqlite.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = aiosqlite.Row
+        await conn.execute("PRAGMA query_only = ON")
+        await conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        await conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        return conn
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Leases a connection for the duration of the block, waiting for one if all are
+        in use.
+
+        Yields:
+            Read-only connection to the database.
+        """
+        if not self._connections:
+            raise RuntimeError(f"The connection pool to {self.db_path} is not open")
+        start = perf_counter()
+        self.waiting += 1
+        try:
+            conn = await self._idle.get()
+        finally:
+            self.waiting -= 1
+        self.leases += 1
+        self.total_wait += perf_counter() - start
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Pool counters.
+
+        Returns:
+            Connections open and idle, leases waiting, leases and total lease wait time.
+        """
+        return {
+            "connections": len(self._connections),
+            "idle": self._idle.qsize(),
+            "waiting": self.waiting,
+            "leases": self.leases,
+            "lease_wait_seconds_total": self.total_wait,
+        }
 
-    yield db
-    # try:
-    #     yield db
-    # finally:
-    #     await db.close()
+    async def close(self) -> None:
+        """
+        Closes the connections of the pool.
+        """
+        connections, self._connections = self._connections, []
+        self._idle = asyncio.Queue()
+        for conn in connections:
+            await conn.close()
+
+
+def create_transactions_db_pool(settings: Settings) -> SQLiteConnectionPool:
+    """
+    Create a read-only connection pool to the customer transaction database. It is
+    closed by default.
+
+    Args:
+        settings: Application settings containing the pool configuration.
+
+    Returns:
+        Connection pool to the database.
+    """
+    return SQLiteConnectionPool(
+        db_path=settings.transactions.db_path or DB_PATH,
+        size=settings.transactions.pool_size,
+        mmap_size=settings.transactions.mmap_size,
+        cache_size_kib=settings.transactions.cache_size_kib,
+        cached_statements=settings.transactions.cached_statements,
+    )
+
+
+async def open_transactions_db_pool(pool: SQLiteConnectionPool) -> None:
+    """
+    Opens the pool, leaving it closed (so that the tools report errors instead of the
+    application failing to start) if the database cannot be opened.
+
+    Args:
+        pool: Connection pool to the customer transaction database.
+    """
+    try:
+        await pool.open()
+    except Exception as e:
+        logger.error(f"Could not open the customer transaction database {pool.db_path}. Error: {e}")
+        await pool.close()
@@ -0,0 +1,199 @@
+import os.path
+
+import aiosqlite
+from loguru import logger
+
+TRANSACTIONS_TABLE = "Ivanov_Transactions"
+
+
+def _iso_date(column: str) -> str:
+    """SQL expression converting a DD-MM-YYYY date column to YYYY-MM-DD."""
+
+    return f"substr({column}, 7, 4) || '-' || substr({column}, 4, 2) || '-' || substr({column}, 1, 2)"
+
+
+# Rollup tables: (name, period column, period expression over a DD-MM-YYYY date,
+# key column, key column of the transactions table).
+ROLLUPS = [
+    ("spending_daily_category", "day", _iso_date, "category", "Category"),
+    ("spending_monthly_category", "month", lambda c: f"substr({c}, 7, 4) || '-' || substr({c}, 4, 2)", "category", "Category"),
+    ("spending_daily_merchant", "day", _iso_date, "merchant", "Merchant_Name"),
+    ("spending_monthly_merchant", "month", lambda c: f"substr({c}, 7, 4) || '-' || substr({c}, 4, 2)", "merchant", "Merchant_Name"),
+]
+
+
+def _rollup_statements() -> list[str]:
+    """
+    Statements creating, filling and maintaining the spending rollups.
+
+    Every rollup holds the total and number of transactions per period and key. The
+    triggers keep them up to date as transactions are appended, changed or removed.
+    """
+    statements = []
+    add, remove = [], []
+    for table, period, period_of, key, source in ROLLUPS:
+        statements += [
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {period} TEXT NOT NULL,
+                {key} TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY ({period}, {key})
+            ) WITHOUT ROWID
+            """,
+            f"""
+            INSERT INTO {table} ({period}, {key}, total, count)
+            SELECT {period_of("Date")}, COALESCE({source}, ''), SUM(Transaction_Amount), COUNT(*)
+            FROM {TRANSACTIONS_TABLE}
+            GROUP BY 1, 2
+            """,
+        ]
+        add.append(
+            f"""
+            INSERT INTO {table} ({period}, {key}, total, count)
+            VALUES ({period_of("NEW.Date")}, COALESCE(NEW.{source}, ''), NEW.Transaction_Amount, 1)
+            ON CONFLICT ({period}, {key}) DO UPDATE
+            SET total = total + excluded.total, count = count + 1;
+            """
+        )
+        remove.append(
+            f"""
+            UPDATE {table}
+            SET total = total - OLD.Transaction_Amount, count = count - 1
+            WHERE {period} = {period_of("OLD.Date")} AND {key} = COALESCE(OLD.{source}, '');
+            DELETE FROM {table}
+            WHERE {period} = {period_of("OLD.Date")} AND {key} = COALESCE(OLD.{source}, '') AND count = 0;
+            """
+        )
+
+    columns = "Date, Category, Merchant_Name, Transaction_Amount"
+    statements += [
+        f"CREATE TRIGGER IF NOT EXISTS transactions_rollups_insert AFTER INSERT ON {TRANSACTIONS_TABLE} BEGIN {''.join(add)} END",
+        f"CREATE TRIGGER IF NOT EXISTS transactions_rollups_delete AFTER DELETE ON {TRANSACTIONS_TABLE} BEGIN {''.join(remove)} END",
+        f"CREATE TRIGGER IF NOT EXISTS transactions_rollups_update AFTER UPDATE OF {columns} ON {TRANSACTIONS_TABLE} BEGIN {''.join(remove)}{''.join(add)} END",
+    ]
+    return statements
+
+
+# Each migration brings the database from version `i` to `i + 1` (PRAGMA user_version).
+MIGRATIONS: list[list[str]] = [
+    # 1: ISO-8601 copy of the DD-MM-YYYY `Date` column, kept in sync by triggers, and
+    # indexes backing the range scans of the transaction tools.
+    [
+        f"ALTER TABLE {TRANSACTIONS_TABLE} ADD COLUMN Date_ISO TEXT",
+        f"""
+        UPDATE {TRANSACTIONS_TABLE}
+        SET Date_ISO = substr(Date, 7, 4) || '-' || substr(Date, 4, 2) || '-' || substr(Date, 1, 2)
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_date_iso_insert
+        AFTER INSERT ON {TRANSACTIONS_TABLE}
+        BEGIN
+            UPDATE {TRANSACTIONS_TABLE}
+            SET Date_ISO = substr(NEW.Date, 7, 4) || '-' || substr(NEW.Date, 4, 2) || '-' || substr(NEW.Date, 1, 2)
+            WHERE rowid = NEW.rowid;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_date_iso_update
+        AFTER UPDATE OF Date ON {TRANSACTIONS_TABLE}
+        BEGIN
+            UPDATE {TRANSACTIONS_TABLE}
+            SET Date_ISO = substr(NEW.Date, 7, 4) || '-' || substr(NEW.Date, 4, 2) || '-' || substr(NEW.Date, 1, 2)
+            WHERE rowid = NEW.rowid;
+        END
+        """,
+        f"CREATE INDEX IF NOT EXISTS idx_transactions_date ON {TRANSACTIONS_TABLE} (Date_ISO)",
+        f"CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON {TRANSACTIONS_TABLE} (Category, Date_ISO)",
+        f"CREATE INDEX IF NOT EXISTS idx_transactions_merchant_date ON {TRANSACTIONS_TABLE} (Merchant_Name, Date_ISO)",
+    ],
+    # 2: daily and monthly spending rollups per category and per merchant.
+    _rollup_statements(),
+    # 3: counter bumped on every change to the transactions, so that copies of them
+    # held in memory know when to reload.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS transactions_version (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            version INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO transactions_version (id, version) VALUES (0, 0)",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_version_insert
+        AFTER INSERT ON {TRANSACTIONS_TABLE}
+        BEGIN
+            UPDATE transactions_version SET version = version + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_version_delete
+        AFTER DELETE ON {TRANSACTIONS_TABLE}
+        BEGIN
+            UPDATE transactions_version SET version = version + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS transactions_version_update
+        AFTER UPDATE OF Date, Merchant_Name, Category, Transaction_Amount ON {TRANSACTIONS_TABLE}
+        BEGIN
+            UPDATE transactions_version SET version = version + 1;
+        END
+        """,
+    ],
+]
+
+
+async def migrate_transactions_db(db_path: str) -> int:
+    """
+    Brings the customer transaction database up to the latest schema version.
+
+    Every pending migration runs in its own transaction, so an interrupted upgrade is
+    resumed on the next start. A missing database (or transactions table) is left alone.
+
+    Args:
+        db_path: Path to the SQLite database file.
+
+    Returns:
+        Schema version of the database after the migration.
+    """
+    if not os.path.exists(db_path):
+        logger.warning(f"No customer transaction database at {db_path}, skipping migrations")
+        return 0
+
+    async with aiosqlite.connect(db_path) as db:
+        cursor = await db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (TRANSACTIONS_TABLE,),
+        )
+        if await cursor.fetchone() is None:
+            logger.warning(f"No {TRANSACTIONS_TABLE} table in {db_path}, skipping migrations")
+            return 0
+
+        # readers never block each other nor a writer appending transactions
+        await db.execute("PRAGMA journal_mode = WAL")
+
+        cursor = await db.execute("PRAGMA user_version")
+        row = await cursor.fetchone()
+        version = row[0] if row else 0
+        if version >= len(MIGRATIONS):
+            return version
+
+        for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            logger.info(f"Migrating the customer transaction database to version {target}")
+            await db.execute("BEGIN")
+            try:
+                for statement in statements:
+                    await db.execute(statement)
+                await db.execute(f"PRAGMA user_version = {target}")
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+            version = target
+
+        # refresh the planner statistics for the new indexes
+        await db.execute("ANALYZE")
+        await db.commit()
+        return version
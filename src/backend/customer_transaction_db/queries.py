@@ -0,0 +1,192 @@
+from typing import Any
+
+import aiosqlite
+from loguru import logger
+
+from customer_transaction_db.migrations import TRANSACTIONS_TABLE
+
+# The statements below only differ by the filters present, so their SQL text comes
+# from a small fixed set and sqlite3's per-connection statement cache keeps them
+# prepared. Values are always bound as parameters.
+
+TRANSACTION_COLUMNS = "Transaction_Amount, Date, Merchant_Name, Category"
+
+
+def _date_range_filters(
+    start_date: str | None, end_date: str | None
+) -> tuple[list[str], list[Any]]:
+    """
+    Builds the filters of an inclusive ISO-8601 date range on the indexed column.
+
+    Args:
+        start_date: First date (YYYY-MM-DD) of the range, unbounded if None.
+        end_date: Last date (YYYY-MM-DD) of the range, unbounded if None.
+
+    Returns:
+        SQL conditions and their parameters.
+    """
+    conditions: list[str] = []
+    params: list[Any] = []
+    if start_date:
+        conditions.append("Date_ISO >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append("Date_ISO <= ?")
+        params.append(end_date)
+    return conditions, params
+
+
+def _where(conditions: list[str]) -> str:
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+async def _fetch(
+    db: aiosqlite.Connection, query: str, params: list[Any]
+) -> list[aiosqlite.Row]:
+    logger.debug(f"Executing query: {' '.join(query.split())} with {params}")
+    async with db.execute(query, params) as cursor:
+        return list(await cursor.fetchall())
+
+
+async def fetch_recent_transactions(
+    db: aiosqlite.Connection,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    category: str | None = None,
+    merchant: str | None = None,
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Retrieves the most recent transactions matching the given filters.
+
+    Args:
+        db: Connection to the customer transaction database.
+        start_date: First date (YYYY-MM-DD) of the transactions.
+        end_date: Last date (YYYY-MM-DD) of the transactions.
+        category: Category of the transactions.
+        merchant: Merchant of the transactions.
+        limit: Maximum number of transactions, all if None.
+
+    Returns:
+        Matching transactions, most recent first.
+    """
+    conditions: list[str] = []
+    params: list[Any] = []
+    if category:
+        conditions.append("Category = ?")
+        params.append(category)
+    if merchant:
+        conditions.append("Merchant_Name = ?")
+        params.append(merchant)
+    date_conditions, date_params = _date_range_filters(start_date, end_date)
+    conditions += date_conditions
+    params += date_params
+
+    query = f"""
+        SELECT {TRANSACTION_COLUMNS}
+        FROM {TRANSACTIONS_TABLE}
+        {_where(conditions)}
+        ORDER BY Date_ISO DESC
+        """
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return [dict(row) for row in await _fetch(db, query, params)]
+
+
+async def fetch_spending_by_category(
+    db: aiosqlite.Connection,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> dict[str, float]:
+    """
+    Sums the spending per category over a date range.
+
+    Args:
+        db: Connection to the customer transaction database.
+        start_date: First date (YYYY-MM-DD) of the range.
+        end_date: Last date (YYYY-MM-DD) of the range.
+
+    Returns:
+        Total amount spent per category.
+    """
+    conditions, params = _date_range_filters(start_date, end_date)
+    query = f"""
+        SELECT Category, SUM(Transaction_Amount) AS total_spent
+        FROM {TRANSACTIONS_TABLE}
+        {_where(conditions)}
+        GROUP BY Category
+        """
+    return {row[0]: row[1] for row in await _fetch(db, query, params)}
+
+
+async def fetch_average_amount(
+    db: aiosqlite.Connection,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> float:
+    """
+    Averages the amount of the transactions over a date range.
+
+    Args:
+        db: Connection to the customer transaction database.
+        start_date: First date (YYYY-MM-DD) of the range.
+        end_date: Last date (YYYY-MM-DD) of the range.
+
+    Returns:
+        Average transaction amount, 0 if there are no transactions.
+    """
+    conditions, params = _date_range_filters(start_date, end_date)
+    query = f"""
+        SELECT AVG(Transaction_Amount)
+        FROM {TRANSACTIONS_TABLE}
+        {_where(conditions)}
+        """
+    rows = await _fetch(db, query, params)
+    return rows[0][0] or 0.0
+
+
+async def fetch_transactions_above(
+    db: aiosqlite.Connection,
+    threshold: float,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Retrieves the transactions of a date range whose amount exceeds a threshold.
+
+    Args:
+        db: Connection to the customer transaction database.
+        threshold: Amount the transactions must exceed.
+        start_date: First date (YYYY-MM-DD) of the range.
+        end_date: Last date (YYYY-MM-DD) of the range.
+
+    Returns:
+        Matching transactions, most recent first.
+    """
+    conditions, params = _date_range_filters(start_date, end_date)
+    conditions.append("Transaction_Amount > ?")
+    params.append(threshold)
+    query = f"""
+        SELECT {TRANSACTION_COLUMNS}
+        FROM {TRANSACTIONS_TABLE}
+        {_where(conditions)}
+        ORDER BY Date_ISO DESC
+        """
+    return [dict(row) for row in await _fetch(db, query, params)]
+
+
+async def fetch_data_version(db: aiosqlite.Connection) -> int:
+    """
+    Reads the counter bumped on every change to the transactions.
+
+    Args:
+        db: Connection to the customer transaction database.
+
+    Returns:
+        Version of the transactions.
+    """
+    async with db.execute("SELECT version FROM transactions_version") as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else 0
+
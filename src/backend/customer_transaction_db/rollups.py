@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+from typing import Any, Literal
+
+import aiosqlite
+from loguru import logger
+
+# Dates standing for an unbounded side of a window.
+EARLIEST = date(1, 1, 1)
+LATEST = date(9999, 12, 31)
+
+type RollupKey = Literal["category", "merchant"]
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _month_end(day: date) -> date:
+    if day.month == 12:
+        return day.replace(day=31)
+    return day.replace(month=day.month + 1, day=1) - timedelta(days=1)
+
+
+def split_window(
+    start_date: str | None, end_date: str | None
+) -> list[tuple[Literal["daily", "monthly"], str, str]]:
+    """
+    Covers an inclusive date window with as few rollup rows as possible: whole months
+    from the monthly rollups, and the partial months at its edges from the daily ones.
+
+    Args:
+        start_date: First date (YYYY-MM-DD) of the window, unbounded if None.
+        end_date: Last date (YYYY-MM-DD) of the window, unbounded if None.
+
+    Returns:
+        (granularity, first period, last period) ranges; periods are YYYY-MM-DD days or
+        YYYY-MM months.
+    """
+    start = date.fromisoformat(start_date) if start_date else EARLIEST
+    end = date.fromisoformat(end_date) if end_date else LATEST
+    if start > end:
+        return []
+
+    first_month = start if start.day == 1 else _month_end(start) + timedelta(days=1)
+    last_month = end if end == _month_end(end) else _month_start(end) - timedelta(days=1)
+    if first_month > last_month:
+        return [("daily", start.isoformat(), end.isoformat())]
+
+    ranges: list[tuple[Literal["daily", "monthly"], str, str]] = []
+    if start < first_month:
+        ranges.append(("daily", start.isoformat(), (first_month - timedelta(days=1)).isoformat()))
+    ranges.append(("monthly", first_month.isoformat()[:7], last_month.isoformat()[:7]))
+    if last_month < end:
+        ranges.append(("daily", (last_month + timedelta(days=1)).isoformat(), end.isoformat()))
+    return ranges
+
+
+def _window_query(
+    key: RollupKey, start_date: str | None, end_date: str | None
+) -> tuple[str, list[Any]]:
+    """
+    Builds the union of the rollup rows covering a window, as (key, total, count) rows.
+    """
+    parts, params = [], []
+    for granularity, first, last in split_window(start_date, end_date):
+        period = "day" if granularity == "daily" else "month"
+        parts.append(
+            f"SELECT {key} AS key, total, count FROM spending_{granularity}_{key} "
+            f"WHERE {period} BETWEEN ? AND ?"
+        )
+        params += [first, last]
+    return " UNION ALL ".join(parts), params
+
+
+async def fetch_rollup_spending(
+    db: aiosqlite.Connection,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    key: RollupKey = "category",
+) -> dict[str, float]:
+    """
+    Sums the spending per category (or merchant) over a date window from the rollups.
+
+    Args:
+        db: Connection to the customer transaction database.
+        start_date: First date (YYYY-MM-DD) of the window.
+        end_date: Last date (YYYY-MM-DD) of the window.
+        key: Whether to sum per "category" or per "merchant".
+
+    Returns:
+        Total amount spent per category (or merchant).
+    """
+    window, params = _window_query(key, start_date, end_date)
+    if not window:
+        return {}
+    query = f"SELECT key, SUM(total) FROM ({window}) GROUP BY key HAVING SUM(count) > 0"
+    logger.debug(f"Executing query: {query} with {params}")
+    async with db.execute(query, params) as cursor:
+        return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+async def fetch_rollup_average(
+    db: aiosqlite.Connection,
+    start_date: str | None = None,
+    end_date: str | None = None,
+) -> float:
+    """
+    Averages the amount of the transactions over a date window from the rollups.
+
+    Args:
+        db: Connection to the customer transaction database.
+        start_date: First date (YYYY-MM-DD) of the window.
+        end_date: Last date (YYYY-MM-DD) of the window.
+
+    Returns:
+        Average transaction amount, 0 if there are no transactions.
+    """
+    window, params = _window_query("category", start_date, end_date)
+    if not window:
+        return 0.0
+    query = f"SELECT SUM(total), SUM(count) FROM ({window})"
+    logger.debug(f"Executing query: {query} with {params}")
+    async with db.execute(query, params) as cursor:
+        row = await cursor.fetchone()
+    total, count = row or (0.0, 0)
+    return total / count if count else 0.0
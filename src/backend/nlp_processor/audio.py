@@ -0,0 +1,233 @@
+import asyncio
+from dataclasses import dataclass
+from io import BytesIO
+from time import perf_counter
+from typing import cast
+
+import av
+import numpy as np
+from loguru import logger
+
+from nlp_processor.audio_format import GROQ_FORMATS, WAV, resolve_format
+from nlp_processor.vad import speech_bounds
+
+
+@dataclass
+class PreparedAudio:
+    """
+    Audio ready to be uploaded for transcription.
+
+    Attributes:
+        data: Encoded audio bytes.
+        filename: File name telling the container format of the audio.
+        input_bytes: Size of the audio received from the client.
+        duration: Duration of the received audio in seconds.
+        speech_duration: Duration of the audio kept after trimming, in seconds.
+        decode_seconds: Time spent decoding the received audio.
+        trim_seconds: Time spent detecting speech.
+        encode_seconds: Time spent encoding the trimmed audio.
+    """
+
+    data: bytes
+    filename: str
+    input_bytes: int
+    duration: float
+    speech_duration: float
+    decode_seconds: float = 0.0
+    trim_seconds: float = 0.0
+    encode_seconds: float = 0.0
+
+
+def decode_audio(data: bytes, sample_rate: int = 16000) -> np.ndarray:
+    """
+    Decodes audio in any container/codec supported by FFmpeg to mono PCM, in memory.
+
+    Args:
+        data: Encoded audio bytes (e.g. webm/opus from the browser's MediaRecorder).
+        sample_rate: Sample rate to resample the audio to in Hz.
+
+    Returns:
+        Mono 16-bit PCM samples.
+    """
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+    chunks: list[np.ndarray] = []
+    with av.open(BytesIO(data), mode="r") as container:
+        for frame in container.decode(audio=0):
+            chunks.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(frame))
+    chunks.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(None))
+    if not chunks:
+        return np.zeros(0, dtype=np.int16)
+    return np.concatenate(chunks)
+
+
+def resample_audio(pcm: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Resamples mono PCM audio, in memory.
+
+    Args:
+        pcm: Mono 16-bit PCM samples.
+        sample_rate: Sample rate of the audio in Hz.
+        target_rate: Sample rate to resample the audio to in Hz.
+
+    Returns:
+        Mono 16-bit PCM samples at `target_rate`.
+    """
+    if sample_rate == target_rate or not len(pcm):
+        return pcm
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=target_rate)
+    frame = av.AudioFrame.from_ndarray(
+        np.ascontiguousarray(pcm, dtype=np.int16).reshape(1, -1),
+        format="s16",
+        layout="mono",
+    )
+    frame.sample_rate = sample_rate
+    chunks = [f.to_ndarray().reshape(-1) for f in resampler.resample(frame)]
+    chunks.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(None))
+    return np.concatenate(chunks)
+
+
+def encode_audio(
+    pcm: np.ndarray,
+    sample_rate: int = 16000,
+    container_format: str = "ogg",
+    codec: str = "libopus",
+    bit_rate: int = 24000,
+) -> bytes:
+    """
+    Encodes mono PCM audio, in memory.
+
+    Args:
+        pcm: Mono 16-bit PCM samples.
+        sample_rate: Sample rate of the audio in Hz.
+        container_format: Container format of the output.
+        codec: Audio codec of the output.
+        bit_rate: Target bit rate of lossy codecs in bits per second.
+
+    Returns:
+        Encoded audio bytes.
+    """
+    with BytesIO() as buffer:
+        with av.open(buffer, mode="w", format=container_format) as container:
+            stream = cast(
+                av.AudioStream,
+                container.add_stream(codec, rate=sample_rate, layout="mono"),
+            )
+            stream.bit_rate = bit_rate
+            frame = av.AudioFrame.from_ndarray(
+                np.ascontiguousarray(pcm, dtype=np.int16).reshape(1, -1),
+                format="s16",
+                layout="mono",
+            )
+            frame.sample_rate = sample_rate
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        return buffer.getvalue()
+
+
+def preprocess_audio(data: bytes, sample_rate: int = 16000) -> PreparedAudio | None:
+    """
+    Trims the silence around an utterance and re-encodes it compactly for upload.
+
+    Decodes the received audio, finds the speech with a vectorized energy pass, and
+    re-encodes only the speech as 16 kHz mono Ogg/Opus.
+
+    Args:
+        data: Encoded audio bytes received from the client.
+        sample_rate: Sample rate used for detection and re-encoding in Hz.
+
+    Returns:
+        The audio to upload, or None if the utterance contains no speech.
+    """
+    start = perf_counter()
+    pcm = decode_audio(data, sample_rate=sample_rate)
+    decoded = perf_counter()
+    bounds = speech_bounds(pcm, sample_rate=sample_rate)
+    trimmed = perf_counter()
+    if bounds is None:
+        return None
+
+    speech = pcm[bounds[0] : bounds[1]]
+    encoded = encode_audio(speech, sample_rate=sample_rate)
+    return PreparedAudio(
+        data=encoded,
+        filename="audio.ogg",
+        input_bytes=len(data),
+        duration=len(pcm) / sample_rate,
+        speech_duration=len(speech) / sample_rate,
+        decode_seconds=decoded - start,
+        trim_seconds=trimmed - decoded,
+        encode_seconds=perf_counter() - trimmed,
+    )
+
+
+def transcode_audio(data: bytes, sample_rate: int = 16000) -> PreparedAudio:
+    """
+    Re-encodes audio in a container the transcription backend does not accept as
+    16 kHz mono Ogg/Opus, without trimming.
+
+    Args:
+        data: Encoded audio bytes received from the client.
+        sample_rate: Sample rate of the re-encoded audio in Hz.
+
+    Returns:
+        The audio to upload.
+    """
+    start = perf_counter()
+    pcm = decode_audio(data, sample_rate=sample_rate)
+    decoded = perf_counter()
+    encoded = encode_audio(pcm, sample_rate=sample_rate)
+    return PreparedAudio(
+        data=encoded,
+        filename="audio.ogg",
+        input_bytes=len(data),
+        duration=len(pcm) / sample_rate,
+        speech_duration=len(pcm) / sample_rate,
+        decode_seconds=decoded - start,
+        encode_seconds=perf_counter() - decoded,
+    )
+
+
+async def prepare_audio(
+    data: bytes,
+    preprocess: bool = True,
+    sample_rate: int = 16000,
+    declared_mime_type: str | None = None,
+    supported_formats: frozenset[str] = GROQ_FORMATS,
+) -> PreparedAudio | None:
+    """
+    Prepares audio received from the client for transcription.
+
+    With preprocessing, the silence is trimmed and the speech re-encoded. Otherwise the
+    container format is determined from the magic bytes (or the declared MIME type) and
+    the audio is forwarded natively if the backend accepts it, or transcoded if not.
+    Decoding and encoding run in a worker thread so that they never block the event
+    loop, and audio that cannot be decoded is forwarded unchanged.
+
+    Args:
+        data: Encoded audio bytes received from the client.
+        preprocess: Whether to trim silence and re-encode the audio.
+        sample_rate: Sample rate used for detection and re-encoding in Hz.
+        declared_mime_type: MIME type declared by the client, if any.
+        supported_formats: Names of the containers the transcription backend accepts.
+
+    Returns:
+        The audio to upload, or None if the utterance contains no speech.
+    """
+    audio_format = resolve_format(data, declared_mime_type)
+    try:
+        if preprocess:
+            return await asyncio.to_thread(preprocess_audio, data, sample_rate)
+        if audio_format is None or audio_format.name not in supported_formats:
+            return await asyncio.to_thread(transcode_audio, data, sample_rate)
+    except (av.FFmpegError, ValueError) as e:
+        logger.warning(f"Could not decode audio, uploading as is. Error: {e}")
+
+    return PreparedAudio(
+        data=data,
+        filename=f"audio.{(audio_format or WAV).extension}",
+        input_bytes=len(data),
+        duration=0.0,
+        speech_duration=0.0,
+    )
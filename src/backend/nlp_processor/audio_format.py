@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """
+    Container format of uploaded audio.
+
+    Attributes:
+        name: Short name of the container.
+        mime_type: MIME type of the container.
+        extension: File extension telling the format to transcription APIs.
+    """
+
+    name: str
+    mime_type: str
+    extension: str
+
+
+WEBM = AudioFormat(name="webm", mime_type="audio/webm", extension="webm")
+OGG = AudioFormat(name="ogg", mime_type="audio/ogg", extension="ogg")
+WAV = AudioFormat(name="wav", mime_type="audio/wav", extension="wav")
+FLAC = AudioFormat(name="flac", mime_type="audio/flac", extension="flac")
+MP3 = AudioFormat(name="mp3", mime_type="audio/mpeg", extension="mp3")
+MP4 = AudioFormat(name="mp4", mime_type="audio/mp4", extension="m4a")
+AAC = AudioFormat(name="aac", mime_type="audio/aac", extension="aac")
+
+FORMATS = (WEBM, OGG, WAV, FLAC, MP3, MP4, AAC)
+
+_MIME_ALIASES = {
+    "audio/x-wav": WAV,
+    "audio/wave": WAV,
+    "audio/x-flac": FLAC,
+    "audio/mp3": MP3,
+    "audio/x-m4a": MP4,
+    "video/webm": WEBM,
+    "video/mp4": MP4,
+    "application/ogg": OGG,
+}
+
+# Containers accepted as-is by the Groq transcription API.
+GROQ_FORMATS = frozenset({"webm", "ogg", "wav", "flac", "mp3", "mp4"})
+
+
+def sniff_format(data: bytes) -> AudioFormat | None:
+    """
+    Identifies the container format of audio from its leading magic bytes.
+
+    Args:
+        data: Encoded audio bytes.
+
+    Returns:
+        The container format, or None if it is not recognized.
+    """
+    if data.startswith(b"\x1a\x45\xdf\xa3"):
+        return WEBM
+    if data.startswith(b"OggS"):
+        return OGG
+    if data.startswith(b"RIFF") and data[8:12] == b"WAVE":
+        return WAV
+    if data.startswith(b"fLaC"):
+        return FLAC
+    if data[4:8] == b"ftyp":
+        return MP4
+    if data.startswith(b"ID3"):
+        return MP3
+    if len(data) >= 2 and data[0] == 0xFF:
+        if data[1] & 0xF6 == 0xF0:
+            return AAC
+        if data[1] & 0xE0 == 0xE0:
+            return MP3
+    return None
+
+
+def format_from_mime(mime_type: str) -> AudioFormat | None:
+    """
+    Maps a MIME type (e.g. "audio/webm;codecs=opus") to its container format.
+
+    Args:
+        mime_type: MIME type declared by the client.
+
+    Returns:
+        The container format, or None if it is not recognized.
+    """
+    essence = mime_type.split(";", 1)[0].strip().lower()
+    for audio_format in FORMATS:
+        if audio_format.mime_type == essence:
+            return audio_format
+    return _MIME_ALIASES.get(essence)
+
+
+def resolve_format(
+    data: bytes, declared_mime_type: str | None = None
+) -> AudioFormat | None:
+    """
+    Determines the container format of uploaded audio.
+
+    The magic bytes take precedence over the declared MIME type, so a mislabelled
+    upload is still handled correctly.
+
+    Args:
+        data: Encoded audio bytes.
+        declared_mime_type: MIME type declared by the client, if any.
+
+    Returns:
+        The container format, or None if it cannot be determined.
+    """
+    if (audio_format := sniff_format(data)) is not None:
+        return audio_format
+    if declared_mime_type:
+        return format_from_mime(declared_mime_type)
+    return None
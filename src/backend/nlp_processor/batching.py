@@ -0,0 +1,231 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Protocol
+
+from loguru import logger
+
+from config.settings import Settings
+
+
+class BatchEngine(Protocol):
+    """
+    Transcribes several utterances at once.
+    """
+
+    workers: int
+
+    def transcribe_batch(self, audios: list[bytes]) -> Awaitable[list[str]]:
+        """
+        Transcribe utterances as one batch.
+
+        Args:
+            audios: Encoded audio of each utterance.
+
+        Returns:
+            Transcribed text of each utterance.
+        """
+        ...
+
+
+@dataclass(slots=True)
+class TranscriptionJob:
+    """A pending transcription.
+
+    Attributes:
+        audio: Encoded audio of the utterance.
+        deadline: Event loop time after which the transcription is abandoned.
+        future: Future receiving the transcribed text.
+        queued_at: Event loop time the job was submitted.
+    """
+
+    audio: bytes
+    deadline: float
+    future: asyncio.Future[str]
+    queued_at: float
+
+
+class BatchingSpeechToText:
+    """
+    Speech-to-text backend gathering the utterances of all connections into batches for
+    a local engine.
+
+    The first pending utterance waits at most `window` seconds for others, or until
+    `max_batch_size` are pending, and the batch is sent to a free worker of the engine.
+    While all workers are busy, utterances keep queueing, so batches grow with the
+    load. Each utterance has a deadline: it fails with a `TimeoutError` if it is not
+    transcribed in time, and is left out of the next batch once expired.
+    """
+
+    def __init__(
+        self,
+        engine: BatchEngine,
+        max_batch_size: int = 8,
+        window: float = 0.02,
+        timeout: float = 10.0,
+    ) -> None:
+        """
+        Initializes the BatchingSpeechToText object. Utterances are only transcribed
+        once `start` is called.
+
+        Args:
+            engine: Local engine transcribing the batches, one per worker at a time.
+            max_batch_size: Maximum number of utterances per batch.
+            window: Seconds the first pending utterance waits for others.
+            timeout: Seconds an utterance may take to be transcribed, queueing included.
+        """
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.timeout = timeout
+        self._pending: list[TranscriptionJob] = []
+        self._queued = asyncio.Event()
+        self._free = asyncio.Semaphore(engine.workers)
+        self._task: asyncio.Task[None] | None = None
+        self._batches: set[asyncio.Task[None]] = set()
+        self.batches = 0
+        self.jobs = 0
+        self.expired = 0
+        self.queue_seconds = 0.0
+
+    def start(self) -> None:
+        """
+        Starts dispatching batches in the background.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        job = TranscriptionJob(
+            audio=audio_data,
+            deadline=now + self.timeout,
+            future=loop.create_future(),
+            queued_at=now,
+        )
+        self._pending.append(job)
+        self._queued.set()
+        try:
+            async with asyncio.timeout_at(job.deadline):
+                return await asyncio.shield(job.future)
+        except TimeoutError:
+            self.expired += 1
+            raise
+        finally:
+            # an abandoned job is left out of the next batch, or its result ignored
+            job.future.cancel()
+
+    async def _run(self) -> None:
+        """
+        Dispatches batches of pending utterances to the free workers until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._queued.wait()
+            first = self._pending[0].queued_at if self._pending else loop.time()
+            while len(self._pending) < self.max_batch_size:
+                remaining = first + self.window - loop.time()
+                if remaining <= 0:
+                    break
+                self._queued.clear()
+                try:
+                    await asyncio.wait_for(self._queued.wait(), remaining)
+                except TimeoutError:
+                    break
+
+            await self._free.acquire()
+            now = loop.time()
+            batch: list[TranscriptionJob] = []
+            while self._pending and len(batch) < self.max_batch_size:
+                job = self._pending.pop(0)
+                if job.future.done() or job.deadline <= now:
+                    continue
+                self.queue_seconds += now - job.queued_at
+                batch.append(job)
+            if self._pending:
+                self._queued.set()
+            else:
+                self._queued.clear()
+            if not batch:
+                self._free.release()
+                continue
+            task = asyncio.create_task(self._transcribe(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _transcribe(self, batch: list[TranscriptionJob]) -> None:
+        """
+        Transcribes a batch on a worker, and hands each utterance its text.
+
+        Args:
+            batch: Jobs of the batch.
+        """
+        try:
+            texts = await self.engine.transcribe_batch([job.audio for job in batch])
+        except Exception as e:
+            logger.error(f"Error transcribing a batch of {len(batch)} utterances. Error: {e}")
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+        else:
+            for job, text in zip(batch, texts):
+                if not job.future.done():
+                    job.future.set_result(text)
+        finally:
+            self._free.release()
+        self.batches += 1
+        self.jobs += len(batch)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Scheduler counters.
+
+        Returns:
+            Utterances queued, batches, transcribed utterances, average batch size,
+            expired utterances and time spent queueing.
+        """
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "jobs": self.jobs,
+            "batch_size_avg": self.jobs / self.batches if self.batches else 0.0,
+            "expired": self.expired,
+            "queue_seconds_total": self.queue_seconds,
+        }
+
+    async def close(self) -> None:
+        """
+        Stops dispatching, cancelling the batches in progress.
+        """
+        for task in (self._task, *self._batches):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(
+            *(t for t in (self._task, *self._batches) if t is not None),
+            return_exceptions=True,
+        )
+        self._task = None
+
+
+def create_stt_batcher(
+    engine: BatchEngine | None, settings: Settings
+) -> BatchingSpeechToText | None:
+    """
+    Create the scheduler batching the utterances for the local speech-to-text engine,
+    if the settings enable batching.
+
+    Args:
+        engine: Local speech-to-text engine, None if transcribing with the Groq API.
+        settings: Application settings containing the speech-to-text configuration.
+
+    Returns:
+        Scheduler, stopped, or None to transcribe the utterances one by one.
+    """
+    if engine is None or settings.stt.batch_max_size <= 1:
+        return None
+    return BatchingSpeechToText(
+        engine,
+        max_batch_size=settings.stt.batch_max_size,
+        window=settings.stt.batch_window,
+        timeout=settings.stt.batch_timeout,
+    )
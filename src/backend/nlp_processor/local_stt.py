@@ -0,0 +1,336 @@
+import asyncio
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+import numpy as np
+from loguru import logger
+
+from config.settings import Settings
+from nlp_processor.audio import decode_audio
+
+if TYPE_CHECKING:
+    from faster_whisper import WhisperModel
+
+SAMPLE_RATE = 16000
+
+# Longest audio the model transcribes in one window, in samples.
+WINDOW_SAMPLES = 30 * SAMPLE_RATE
+
+# Model of the worker process, loaded once by `load_model`.
+_model: "WhisperModel | None" = None
+
+
+def load_model(model_name: str, compute_type: str, cpu_threads: int) -> None:
+    """
+    Loads the Whisper model of a worker process. Runs in the worker.
+
+    Args:
+        model_name: Name or path of the faster-whisper model (e.g. "base.en").
+        compute_type: Quantization of the weights (e.g. "int8").
+        cpu_threads: Threads of the inference.
+    """
+    global _model
+    from faster_whisper import WhisperModel
+
+    _model = WhisperModel(
+        model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads
+    )
+
+
+def _require_model() -> "WhisperModel":
+    """Model of the worker process. Runs in the worker, once `load_model` has run."""
+
+    if _model is None:
+        raise RuntimeError("The speech-to-text model is not loaded in this process")
+    return _model
+
+
+def transcribe_samples(
+    samples: np.ndarray, language: str, beam_size: int
+) -> tuple[str, float]:
+    """
+    Transcribes mono 16kHz PCM samples with the model of the worker.
+
+    Args:
+        samples: Mono 16-bit PCM samples at 16kHz.
+        language: Language of the audio.
+        beam_size: Beam size of the decoding, 1 for greedy decoding.
+
+    Returns:
+        Transcribed text, and seconds spent in inference.
+    """
+    start = perf_counter()
+    segments, _ = _require_model().transcribe(
+        samples.astype(np.float32) / 32768.0,
+        language=language,
+        beam_size=beam_size,
+        condition_on_previous_text=False,
+        vad_filter=False,
+    )
+    # segments are decoded lazily
+    text = "".join(segment.text for segment in segments).strip()
+    return text, perf_counter() - start
+
+
+def transcribe_in_worker(
+    audio_data: bytes, language: str, beam_size: int
+) -> tuple[str, float, float]:
+    """
+    Decodes and transcribes audio. Runs in the worker.
+
+    Args:
+        audio_data: Encoded audio.
+        language: Language of the audio.
+        beam_size: Beam size of the decoding.
+
+    Returns:
+        Transcribed text, duration of the audio and seconds spent in inference.
+    """
+    samples = decode_audio(audio_data, sample_rate=SAMPLE_RATE)
+    text, seconds = transcribe_samples(samples, language, beam_size)
+    return text, len(samples) / SAMPLE_RATE, seconds
+
+
+def transcribe_batch_in_worker(
+    audios: list[bytes], language: str, beam_size: int
+) -> tuple[list[str], float, float]:
+    """
+    Decodes and transcribes utterances as one batch: their features are padded to the
+    30 seconds window of the model and encoded and decoded together. Utterances longer
+    than the window are transcribed on their own. Runs in the worker.
+
+    Args:
+        audios: Encoded audio of each utterance.
+        language: Language of the audio.
+        beam_size: Beam size of the decoding.
+
+    Returns:
+        Transcribed text of each utterance, total duration of the audio and seconds
+        spent in inference.
+    """
+    from faster_whisper.audio import pad_or_trim
+    from faster_whisper.tokenizer import Tokenizer
+
+    model = _require_model()
+    samples = [decode_audio(audio, sample_rate=SAMPLE_RATE) for audio in audios]
+    start = perf_counter()
+    texts = [""] * len(samples)
+    batch = []
+    for i, utterance in enumerate(samples):
+        if len(utterance) <= WINDOW_SAMPLES:
+            batch.append(i)
+        else:
+            texts[i], _ = transcribe_samples(utterance, language, beam_size)
+
+    if batch:
+        features = np.stack(
+            [
+                pad_or_trim(
+                    model.feature_extractor(samples[i].astype(np.float32) / 32768.0)[..., :-1]
+                )
+                for i in batch
+            ]
+        )
+        tokenizer = Tokenizer(
+            model.hf_tokenizer,
+            model.model.is_multilingual,
+            task="transcribe",
+            language=language,
+        )
+        prompt = model.get_prompt(tokenizer, [], without_timestamps=True)
+        results = model.model.generate(
+            model.encode(features),
+            [prompt] * len(batch),
+            beam_size=beam_size,
+            max_length=model.max_length,
+            suppress_blank=True,
+            suppress_tokens=[-1],
+        )
+        for i, result in zip(batch, results):
+            texts[i] = tokenizer.decode(result.sequences_ids[0]).strip()
+    duration = sum(len(s) for s in samples) / SAMPLE_RATE
+    return texts, duration, perf_counter() - start
+
+
+def warm_up_worker(language: str) -> int:
+    """
+    Runs a first inference on a second of silence, so that the first utterance does
+    not pay for the lazy initializations of the runtime. Runs in the worker.
+
+    Args:
+        language: Language of the audio.
+
+    Returns:
+        Process ID of the worker.
+    """
+    transcribe_samples(np.zeros(SAMPLE_RATE, dtype=np.int16), language, beam_size=1)
+    return os.getpid()
+
+
+class LocalSpeechToText:
+    """
+    Speech-to-text backend running a quantized Whisper model on the CPU, in a pool of
+    worker processes shared by all connections.
+
+    Each worker loads the model once, when the pool is started, and transcribes one
+    utterance at a time, so inference never blocks the event loop and utterances of
+    concurrent connections are transcribed in parallel, up to the number of workers.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "base.en",
+        workers: int = 1,
+        compute_type: str = "int8",
+        cpu_threads: int = 2,
+        language: str = "en",
+        beam_size: int = 1,
+        executor: Executor | None = None,
+    ) -> None:
+        """
+        Initializes the LocalSpeechToText object. The workers are only started by
+        `start`.
+
+        Args:
+            model_name: Name or path of the faster-whisper model.
+            workers: Number of worker processes.
+            compute_type: Quantization of the weights.
+            cpu_threads: Threads of the inference of each worker.
+            language: Language of the audio.
+            beam_size: Beam size of the decoding, 1 for greedy decoding.
+            executor: Executor running the transcriptions. A pool of `workers` processes
+                loading the model if None.
+        """
+        self.model_name = model_name
+        self.workers = workers
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.language = language
+        self.beam_size = beam_size
+        self._executor = executor
+        self.transcriptions = 0
+        self.audio_seconds = 0.0
+        self.inference_seconds = 0.0
+
+    async def start(self) -> None:
+        """
+        Starts the worker processes and waits for each one to load the model and warm
+        up.
+
+        Raises:
+            RuntimeError: If faster-whisper is not installed, or the model could not be
+                loaded.
+        """
+        if self._executor is None:
+            if importlib.util.find_spec("faster_whisper") is None:
+                raise RuntimeError(
+                    "The local speech-to-text engine needs faster-whisper "
+                    "(pip install 'backend[local-stt]')"
+                )
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # not forked from the process running the event loop
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=load_model,
+                initargs=(self.model_name, self.compute_type, self.cpu_threads),
+            )
+        loop = asyncio.get_running_loop()
+        start = perf_counter()
+        try:
+            pids = await asyncio.gather(
+                *(
+                    loop.run_in_executor(self._executor, warm_up_worker, self.language)
+                    for _ in range(self.workers)
+                )
+            )
+        except BrokenProcessPool as e:
+            # the error of the worker is printed by the worker
+            raise RuntimeError(
+                f"Could not load the speech-to-text model {self.model_name}"
+            ) from e
+        logger.info(
+            f"Loaded {self.model_name} in {len(set(pids))} speech-to-text workers "
+            f"in {perf_counter() - start:.1f}s"
+        )
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        if self._executor is None:
+            raise RuntimeError("The local speech-to-text engine is not started")
+        text, duration, seconds = await asyncio.get_running_loop().run_in_executor(
+            self._executor, transcribe_in_worker, audio_data, self.language, self.beam_size
+        )
+        self.transcriptions += 1
+        self.audio_seconds += duration
+        self.inference_seconds += seconds
+        return text
+
+    async def transcribe_batch(self, audios: list[bytes]) -> list[str]:
+        """
+        Transcribes utterances as one batch in a worker.
+
+        Args:
+            audios: Encoded audio of each utterance.
+
+        Returns:
+            Transcribed text of each utterance.
+        """
+        if self._executor is None:
+            raise RuntimeError("The local speech-to-text engine is not started")
+        texts, duration, seconds = await asyncio.get_running_loop().run_in_executor(
+            self._executor, transcribe_batch_in_worker, audios, self.language, self.beam_size
+        )
+        self.transcriptions += len(audios)
+        self.audio_seconds += duration
+        self.inference_seconds += seconds
+        return texts
+
+    def stats(self) -> dict[str, float]:
+        """
+        Engine counters.
+
+        Returns:
+            Workers, transcriptions, seconds of audio transcribed and of inference, and
+            real-time factor (inference time over audio duration).
+        """
+        return {
+            "workers": self.workers,
+            "transcriptions": self.transcriptions,
+            "audio_seconds_total": self.audio_seconds,
+            "inference_seconds_total": self.inference_seconds,
+            "real_time_factor": (
+                self.inference_seconds / self.audio_seconds if self.audio_seconds else 0.0
+            ),
+        }
+
+    async def close(self) -> None:
+        """
+        Stops the worker processes, cancelling the queued transcriptions.
+        """
+        if self._executor is not None:
+            await asyncio.to_thread(self._executor.shutdown, cancel_futures=True)
+            self._executor = None
+
+
+def create_local_stt(settings: Settings) -> LocalSpeechToText | None:
+    """
+    Create the local speech-to-text engine, if the settings select it.
+
+    Args:
+        settings: Application settings containing the speech-to-text configuration.
+
+    Returns:
+        Local engine, stopped, or None to transcribe with the Groq API.
+    """
+    if settings.stt.engine != "local":
+        return None
+    return LocalSpeechToText(
+        model_name=settings.stt.local_model,
+        workers=settings.stt.local_workers,
+        compute_type=settings.stt.local_compute_type,
+        cpu_threads=settings.stt.local_cpu_threads,
+    )
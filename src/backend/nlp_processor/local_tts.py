@@ -0,0 +1,297 @@
+import asyncio
+import importlib.util
+import json
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from time import perf_counter
+from typing import TYPE_CHECKING, AsyncIterator
+
+import numpy as np
+from loguru import logger
+
+from config.settings import Settings
+from nlp_processor.audio import encode_audio, resample_audio
+from nlp_processor.text_to_speech import ResponseFormat, Voice
+
+if TYPE_CHECKING:
+    from piper import PiperVoice
+
+# Sample rate of the synthesized audio, the one of the OpenAI API.
+SAMPLE_RATE = 24000
+
+# Bit rate of the lossy response formats in bits per second.
+BIT_RATE = 48000
+
+# Container and codec of each response format, "pcm" being raw 16-bit samples.
+ENCODINGS: dict[str, tuple[str, str]] = {
+    "mp3": ("mp3", "libmp3lame"),
+    "opus": ("ogg", "libopus"),
+    "aac": ("adts", "aac"),
+    "flac": ("flac", "flac"),
+    "wav": ("wav", "pcm_s16le"),
+}
+
+# Voice of the worker process, loaded once by `load_voice`.
+_voice: "PiperVoice | None" = None
+
+
+def load_voice(model_path: str, cpu_threads: int) -> None:
+    """
+    Loads the Piper voice of a worker process. Runs in the worker.
+
+    Args:
+        model_path: Path of the ONNX voice model, with its JSON config next to it.
+        cpu_threads: Threads of the inference.
+    """
+    global _voice
+    import onnxruntime
+    from piper import PiperConfig, PiperVoice
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = cpu_threads
+    options.inter_op_num_threads = 1
+    with open(f"{model_path}.json", encoding="utf-8") as config:
+        _voice = PiperVoice(
+            config=PiperConfig.from_dict(json.load(config)),
+            session=onnxruntime.InferenceSession(
+                model_path, sess_options=options, providers=["CPUExecutionProvider"]
+            ),
+        )
+
+
+def _require_voice() -> "PiperVoice":
+    """Voice of the worker process. Runs in the worker, once `load_voice` has run."""
+
+    if _voice is None:
+        raise RuntimeError("The Piper voice is not loaded in this process")
+    return _voice
+
+
+def synthesize_samples(text: str, speed: float) -> np.ndarray:
+    """
+    Synthesizes text with the voice of the worker.
+
+    Args:
+        text: The text to convert to speech.
+        speed: The speed multiplier for speech synthesis.
+
+    Returns:
+        Mono 16-bit PCM samples at `SAMPLE_RATE`.
+    """
+    from piper import SynthesisConfig
+
+    voice = _require_voice()
+    config = SynthesisConfig(length_scale=voice.config.length_scale / speed)
+    chunks = [chunk.audio_int16_array for chunk in voice.synthesize(text, syn_config=config)]
+    if not chunks:
+        return np.zeros(0, dtype=np.int16)
+    return resample_audio(np.concatenate(chunks), voice.config.sample_rate, SAMPLE_RATE)
+
+
+def encode_speech(samples: np.ndarray, response_format: ResponseFormat) -> bytes:
+    """
+    Encodes synthesized speech to a response format of the OpenAI API.
+
+    Args:
+        samples: Mono 16-bit PCM samples at `SAMPLE_RATE`.
+        response_format: The format of the audio.
+
+    Returns:
+        Encoded audio bytes.
+    """
+    if response_format == "pcm":
+        return samples.astype("<i2").tobytes()
+    container_format, codec = ENCODINGS[response_format]
+    return encode_audio(
+        samples,
+        sample_rate=SAMPLE_RATE,
+        container_format=container_format,
+        codec=codec,
+        bit_rate=BIT_RATE,
+    )
+
+
+def synthesize_in_worker(
+    text: str, response_format: ResponseFormat, speed: float
+) -> tuple[bytes, float, float]:
+    """
+    Synthesizes and encodes text. Runs in the worker.
+
+    Args:
+        text: The text to convert to speech.
+        response_format: The format of the audio.
+        speed: The speed multiplier for speech synthesis.
+
+    Returns:
+        Encoded audio, duration of the audio and seconds spent synthesizing and
+        encoding.
+    """
+    start = perf_counter()
+    samples = synthesize_samples(text, speed)
+    audio = encode_speech(samples, response_format)
+    return audio, len(samples) / SAMPLE_RATE, perf_counter() - start
+
+
+def warm_up_worker() -> int:
+    """
+    Runs a first synthesis, so that the first sentence does not pay for the lazy
+    initializations of the runtime. Runs in the worker.
+
+    Returns:
+        Process ID of the worker.
+    """
+    synthesize_samples("Hello.", speed=1.0)
+    return os.getpid()
+
+
+class LocalSpeechSynthesis:
+    """
+    Speech synthesis backend running a Piper voice on the CPU, in a pool of worker
+    processes shared by all connections.
+
+    Each worker loads the voice once, when the pool is started, and synthesizes one
+    segment at a time, so synthesis never blocks the event loop and the segments
+    submitted at once by `TextToSpeech` (and those of concurrent connections) are
+    synthesized in parallel, up to the number of workers. The audio of a segment is
+    encoded in the worker and streamed once the segment is synthesized.
+
+    The voice is the one of the model: the `voice` asked by the handlers is ignored.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        workers: int = 2,
+        cpu_threads: int = 1,
+        executor: Executor | None = None,
+    ) -> None:
+        """
+        Initializes the LocalSpeechSynthesis object. The workers are only started by
+        `start`.
+
+        Args:
+            model_path: Path of the ONNX Piper voice model, with its JSON config next to
+                it (e.g. "en_US-lessac-medium.onnx" and "en_US-lessac-medium.onnx.json").
+            workers: Number of worker processes.
+            cpu_threads: Threads of the inference of each worker.
+            executor: Executor running the syntheses. A pool of `workers` processes
+                loading the voice if None.
+        """
+        self.model_path = model_path
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self._executor = executor
+        self.syntheses = 0
+        self.characters = 0
+        self.audio_seconds = 0.0
+        self.synthesis_seconds = 0.0
+
+    async def start(self) -> None:
+        """
+        Starts the worker processes and waits for each one to load the voice and warm
+        up.
+
+        Raises:
+            RuntimeError: If piper-tts is not installed, or the voice could not be
+                loaded.
+        """
+        if self._executor is None:
+            if importlib.util.find_spec("piper") is None:
+                raise RuntimeError(
+                    "The local text-to-speech engine needs piper-tts "
+                    "(pip install 'backend[local-tts]')"
+                )
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # not forked from the process running the event loop
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=load_voice,
+                initargs=(self.model_path, self.cpu_threads),
+            )
+        loop = asyncio.get_running_loop()
+        start = perf_counter()
+        try:
+            pids = await asyncio.gather(
+                *(
+                    loop.run_in_executor(self._executor, warm_up_worker)
+                    for _ in range(self.workers)
+                )
+            )
+        except BrokenProcessPool as e:
+            # the error of the worker is printed by the worker
+            raise RuntimeError(
+                f"Could not load the text-to-speech voice {self.model_path}"
+            ) from e
+        logger.info(
+            f"Loaded {self.model_path} in {len(set(pids))} text-to-speech workers "
+            f"in {perf_counter() - start:.1f}s"
+        )
+
+    async def synthesize(
+        self,
+        text: str,
+        model_name: str,
+        voice: Voice,
+        response_format: ResponseFormat,
+        speed: float,
+        chunk_size: int,
+    ) -> AsyncIterator[bytes]:
+        if self._executor is None:
+            raise RuntimeError("The local text-to-speech engine is not started")
+        audio, duration, seconds = await asyncio.get_running_loop().run_in_executor(
+            self._executor, synthesize_in_worker, text, response_format, speed
+        )
+        self.syntheses += 1
+        self.characters += len(text)
+        self.audio_seconds += duration
+        self.synthesis_seconds += seconds
+        for start in range(0, len(audio), chunk_size):
+            yield audio[start : start + chunk_size]
+
+    def stats(self) -> dict[str, float]:
+        """
+        Engine counters.
+
+        Returns:
+            Workers, syntheses, characters synthesized, seconds of audio synthesized and
+            of synthesis, and real-time factor (synthesis time over audio duration).
+        """
+        return {
+            "workers": self.workers,
+            "syntheses": self.syntheses,
+            "characters": self.characters,
+            "audio_seconds_total": self.audio_seconds,
+            "synthesis_seconds_total": self.synthesis_seconds,
+            "real_time_factor": (
+                self.synthesis_seconds / self.audio_seconds if self.audio_seconds else 0.0
+            ),
+        }
+
+    async def close(self) -> None:
+        """
+        Stops the worker processes, cancelling the queued syntheses.
+        """
+        if self._executor is not None:
+            await asyncio.to_thread(self._executor.shutdown, cancel_futures=True)
+            self._executor = None
+
+
+def create_local_tts(settings: Settings) -> LocalSpeechSynthesis | None:
+    """
+    Create the local text-to-speech engine, if the settings select it.
+
+    Args:
+        settings: Application settings containing the text-to-speech configuration.
+
+    Returns:
+        Local engine, stopped, or None to synthesize with the OpenAI API.
+    """
+    if settings.tts.engine != "local":
+        return None
+    return LocalSpeechSynthesis(
+        model_path=settings.tts.local_model,
+        workers=settings.tts.local_workers,
+        cpu_threads=settings.tts.local_cpu_threads,
+    )
@@ -0,0 +1,218 @@
+from typing import Protocol
+
+DEFAULT_ABBREVIATIONS: frozenset[str] = frozenset(
+    {
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "approx",
+        "e.g", "i.e", "inc", "ltd", "co", "dept", "est", "jan", "feb", "apr",
+        "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    }
+)
+
+
+class Segmenter(Protocol):
+    """
+    Policy deciding where streamed LLM text is cut into segments for speech synthesis.
+    """
+
+    def push(self, text: str) -> list[str]:
+        """
+        Adds streamed text and returns the segments that are ready to be spoken.
+        """
+        ...
+
+    def flush(self) -> str:
+        """
+        Returns the remaining buffered text and empties the buffer.
+        """
+        ...
+
+    def reset(self) -> None:
+        """
+        Discards the buffered text and starts a new answer.
+        """
+        ...
+
+
+class FixedSegmenter:
+    """
+    Cuts a segment when the buffer reaches a fixed size or ends with a sentence-ending
+    character.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 128,
+        sentence_endings: tuple[str, ...] = ("?", "!", ";", ":", "\n"),
+    ) -> None:
+        """
+        Initializes the FixedSegmenter object.
+
+        Args:
+            buffer_size: The size of the text buffer before a segment is cut.
+            sentence_endings: Characters that mark the end of a sentence.
+        """
+        self.buffer_size = buffer_size
+        self.sentence_endings = sentence_endings
+        self._buffer = ""
+
+    def push(self, text: str) -> list[str]:
+        self._buffer += text
+        if len(self._buffer) >= self.buffer_size or any(
+            self._buffer.endswith(se) for se in self.sentence_endings
+        ):
+            return [self.flush()]
+        return []
+
+    def flush(self) -> str:
+        text, self._buffer = self._buffer, ""
+        return text
+
+    def reset(self) -> None:
+        self._buffer = ""
+
+
+class AdaptiveSegmenter:
+    """
+    Cuts a short first segment to minimize the time to the first audio, then
+    progressively larger segments to reduce the number of synthesis requests.
+
+    The first segment ends at the first clause boundary (or after `first_max_words`
+    words). Later segments end at the first sentence boundary after a minimum length
+    that grows by `growth` with every segment, up to `max_chars`. A period or comma is
+    only treated as a boundary once the following character is known to be whitespace,
+    so decimals and amounts like "1,234.50" are never split, and periods after common
+    abbreviations and initials are ignored.
+    """
+
+    clause_endings = ",;:"
+    sentence_endings = ".!?;:\n"
+
+    def __init__(
+        self,
+        first_min_words: int = 2,
+        first_max_words: int = 8,
+        min_chars: int = 60,
+        growth: float = 2.0,
+        max_chars: int = 300,
+        abbreviations: frozenset[str] = DEFAULT_ABBREVIATIONS,
+    ) -> None:
+        """
+        Initializes the AdaptiveSegmenter object.
+
+        Args:
+            first_min_words: Minimum number of words before the first clause boundary.
+            first_max_words: Number of words after which the first segment is cut even
+                without a clause boundary.
+            min_chars: Minimum length of the second segment.
+            growth: Factor by which the minimum length grows with every segment.
+            max_chars: Length after which a segment is cut at the last clause or word
+                boundary.
+            abbreviations: Lowercase words whose trailing period does not end a sentence.
+        """
+        self.first_min_words = first_min_words
+        self.first_max_words = first_max_words
+        self.min_chars = min_chars
+        self.growth = growth
+        self.max_chars = max_chars
+        self.abbreviations = abbreviations
+        self._buffer = ""
+        self._segments = 0
+
+    def push(self, text: str) -> list[str]:
+        self._buffer += text
+        segments = []
+        while (end := self._find_end()) is not None:
+            segment, self._buffer = self._buffer[:end], self._buffer[end:].lstrip()
+            if segment.strip():
+                segments.append(segment.strip())
+                self._segments += 1
+        return segments
+
+    def flush(self) -> str:
+        text, self._buffer = self._buffer.strip(), ""
+        if text:
+            self._segments += 1
+        return text
+
+    def reset(self) -> None:
+        self._buffer = ""
+        self._segments = 0
+
+    def _min_length(self) -> int:
+        """
+        Minimum length of the next segment after the first one.
+        """
+        return min(
+            int(self.min_chars * self.growth ** (self._segments - 1)),
+            self.max_chars,
+        )
+
+    def _find_end(self) -> int | None:
+        """
+        Finds where the next segment ends in the buffer.
+
+        Returns:
+            Index just past the end of the next segment, or None if it is not known yet.
+        """
+        if self._segments == 0:
+            return self._find_first_end()
+
+        min_length = self._min_length()
+        for i in range(min_length - 1, len(self._buffer)):
+            if self._is_boundary(i, self.sentence_endings):
+                return i + 1
+        if len(self._buffer) >= self.max_chars:
+            return self._find_fallback_end(self.max_chars)
+        return None
+
+    def _find_first_end(self) -> int | None:
+        """
+        Finds where the first segment ends in the buffer.
+        """
+        words = 0
+        for i, char in enumerate(self._buffer):
+            if char.isspace() and i > 0 and not self._buffer[i - 1].isspace():
+                words += 1
+                if words >= self.first_max_words:
+                    return i
+            if self._is_boundary(i, self.sentence_endings + self.clause_endings):
+                if char in self.clause_endings and words + 1 < self.first_min_words:
+                    continue
+                return i + 1
+        return None
+
+    def _find_fallback_end(self, limit: int) -> int:
+        """
+        Finds the last clause or word boundary before `limit` for text without sentence
+        boundaries.
+        """
+        for endings in (self.clause_endings, None):
+            for i in range(limit - 1, 0, -1):
+                if endings is None:
+                    if self._buffer[i].isspace():
+                        return i
+                elif self._is_boundary(i, endings):
+                    return i + 1
+        return limit
+
+    def _is_boundary(self, i: int, endings: str) -> bool:
+        """
+        Checks whether the character at `i` ends a segment.
+
+        Args:
+            i: Index in the buffer.
+            endings: Characters that may end a segment.
+        """
+        char = self._buffer[i]
+        if char not in endings:
+            return False
+        if char == "\n":
+            return True
+        if i + 1 >= len(self._buffer) or not self._buffer[i + 1].isspace():
+            return False
+        if char == ".":
+            word = self._buffer[:i].rsplit(maxsplit=1)[-1] if self._buffer[:i].strip() else ""
+            word = word.lstrip("(\"'").lower()
+            if word in self.abbreviations or (len(word) == 1 and word.isalpha()):
+                return False
+        return True
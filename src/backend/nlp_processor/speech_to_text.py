@@ -1,4 +1,5 @@
 from io import BytesIO
+from typing import Protocol
 
 from groq import AsyncGroq
 
@@ -9,6 +10,7 @@ async def transcribe_audio_data(
     model_name: str,
     temperature: float = 0.0,
     language: str = "en",
+    filename: str = "audio.wav",
 ) -> str:
     """
     Transcribe audio to text using the Groq model
@@ -19,12 +21,13 @@ async def transcribe_audio_data(
         model_name: Name of the Groq model to use
         temperature: Temperature for sampling
         language: Language of the audio
+        filename: File name telling the API the container format of the audio
 
     Returns:
         Transcribed text
     """
     with BytesIO(initial_bytes=audio_data) as audio_stream:
-        audio_stream.name = "audio.wav"
+        audio_stream.name = filename
         response = await api_client.audio.transcriptions.create(
             model=model_name,
             file=audio_stream,
@@ -33,3 +36,59 @@ async def transcribe_audio_data(
         )
         text = response.text.strip()
         return text
+
+
+class SpeechToTextBackend(Protocol):
+    """
+    Transcribes complete pieces of audio to text.
+    """
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        """
+        Transcribe audio to text.
+
+        Args:
+            audio_data: Audio data to transcribe
+            filename: File name telling the container format of the audio
+
+        Returns:
+            Transcribed text
+        """
+        ...
+
+
+class GroqSpeechToText:
+    """
+    Speech-to-text backend using the Groq API.
+    """
+
+    def __init__(
+        self,
+        api_client: AsyncGroq,
+        model_name: str = "whisper-large-v3-turbo",
+        temperature: float = 0.0,
+        language: str = "en",
+    ) -> None:
+        """
+        Initializes the GroqSpeechToText object.
+
+        Args:
+            api_client: Groq API client
+            model_name: Name of the Groq model to use
+            temperature: Temperature for sampling
+            language: Language of the audio
+        """
+        self.api_client = api_client
+        self.model_name = model_name
+        self.temperature = temperature
+        self.language = language
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        return await transcribe_audio_data(
+            audio_data=audio_data,
+            api_client=self.api_client,
+            model_name=self.model_name,
+            temperature=self.temperature,
+            language=self.language,
+            filename=filename,
+        )
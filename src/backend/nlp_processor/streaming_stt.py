@@ -0,0 +1,240 @@
+import asyncio
+import wave
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from io import BytesIO
+from typing import AsyncIterator
+
+from loguru import logger
+
+from nlp_processor.speech_to_text import SpeechToTextBackend
+from nlp_processor.vad import Endpointer
+
+
+@dataclass
+class Transcript:
+    """
+    Transcription of the utterance being spoken.
+
+    Attributes:
+        text: Transcribed text.
+        is_final: False for a speculative transcription of the speech so far, True once
+            the end of speech has been detected.
+    """
+
+    text: str
+    is_final: bool
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """
+    Wraps mono 16-bit PCM audio in a WAV container, in memory.
+
+    Args:
+        pcm: Mono 16-bit little-endian PCM bytes.
+        sample_rate: Sample rate of the audio in Hz.
+
+    Returns:
+        WAV file bytes.
+    """
+    with BytesIO() as buffer:
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)
+        return buffer.getvalue()
+
+
+class StreamingTranscriber:
+    """
+    Transcribes a continuous stream of audio frames while the user is speaking.
+
+    Frames are segmented into utterances by an Endpointer. While an utterance is being
+    spoken, the speech so far is transcribed speculatively every `partial_interval_ms`
+    and emitted as a partial transcript. When the end of speech is detected, the final
+    transcript is emitted; if the last speculative transcription already covered all
+    the speech, its result is reused instead of transcribing again.
+    """
+
+    def __init__(
+        self,
+        backend: SpeechToTextBackend,
+        sample_rate: int = 16000,
+        partial_interval_ms: int = 800,
+        pre_roll_ms: int = 300,
+        endpointer: Endpointer | None = None,
+    ) -> None:
+        """
+        Initializes the StreamingTranscriber object.
+
+        Args:
+            backend: Backend transcribing complete pieces of audio.
+            sample_rate: Sample rate of the incoming mono 16-bit PCM audio in Hz.
+            partial_interval_ms: Duration of new audio between speculative transcriptions.
+            pre_roll_ms: Duration of audio kept before the detected start of speech.
+            endpointer: Voice activity detector segmenting the audio into utterances.
+        """
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.endpointer = endpointer or Endpointer(sample_rate=sample_rate)
+        frame_bytes = self.endpointer.frame_length * 2
+        self._partial_interval_bytes = sample_rate * 2 * partial_interval_ms // 1000
+        self._pre_roll: deque[bytes] = deque(
+            maxlen=max(1, sample_rate * 2 * pre_roll_ms // 1000 // frame_bytes)
+        )
+        self._in_utterance = False
+        self._utterance = bytearray()
+        self._utterance_id = 0
+        self._voiced_end = 0
+        self._last_partial_start = 0
+        self._partial: asyncio.Task[str] | None = None
+        self._partial_end = 0
+        self._final: asyncio.Task[None] | None = None
+        self._transcripts: asyncio.Queue[Transcript | None] = asyncio.Queue()
+        self.speculative_hits = 0
+        self.finals = 0
+
+    def feed(self, pcm: bytes) -> None:
+        """
+        Feeds audio frames, starting speculative and final transcriptions as needed.
+
+        Args:
+            pcm: Mono 16-bit little-endian PCM bytes.
+        """
+        for frame in self.endpointer.process(pcm):
+            if not self._in_utterance:
+                if frame.event != "start":
+                    self._pre_roll.append(frame.audio)
+                    continue
+                self._in_utterance = True
+                self._utterance = bytearray(b"".join(self._pre_roll))
+                self._pre_roll.clear()
+
+            self._utterance += frame.audio
+            if frame.voiced:
+                self._voiced_end = len(self._utterance)
+
+            if frame.event == "end":
+                self._finalize()
+            elif (
+                len(self._utterance) - self._last_partial_start
+                >= self._partial_interval_bytes
+                and (self._partial is None or self._partial.done())
+            ):
+                self._start_partial()
+
+    async def close(self) -> None:
+        """
+        Finalizes the utterance being spoken, if any, and ends the transcripts.
+        """
+        if self._in_utterance:
+            self._finalize()
+        if self._final is not None:
+            await self._final
+        self._transcripts.put_nowait(None)
+
+    async def transcripts(self) -> AsyncIterator[Transcript]:
+        """
+        Yields partial and final transcripts in order until `close` is called.
+
+        Yields:
+            Transcripts of the utterances.
+        """
+        while (transcript := await self._transcripts.get()) is not None:
+            yield transcript
+
+    def _start_partial(self) -> None:
+        """
+        Starts a speculative transcription of the speech so far.
+        """
+        self._last_partial_start = len(self._utterance)
+        self._partial_end = self._voiced_end
+        self._partial = asyncio.create_task(
+            self._transcribe(bytes(self._utterance[: self._voiced_end]))
+        )
+        self._partial.add_done_callback(
+            partial(self._emit_partial, self._utterance_id)
+        )
+
+    def _emit_partial(self, utterance_id: int, task: asyncio.Task[str]) -> None:
+        """
+        Emits the result of a speculative transcription, unless its utterance has ended
+        or the final transcript of the previous utterance is still pending (a partial
+        must never be emitted before the final transcript it follows).
+        """
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self._final is not None and not self._final.done():
+            return
+        if utterance_id == self._utterance_id and (text := task.result()):
+            self._transcripts.put_nowait(Transcript(text=text, is_final=False))
+
+    def _finalize(self) -> None:
+        """
+        Starts the final transcription of the utterance and resets for the next one.
+        """
+        speculative = None
+        if self._partial is not None:
+            if self._partial_end >= self._voiced_end:
+                speculative = self._partial
+            else:
+                self._partial.cancel()
+
+        self._final = asyncio.create_task(
+            self._finish(
+                previous=self._final,
+                speculative=speculative,
+                audio=bytes(self._utterance[: self._voiced_end]),
+            )
+        )
+        self._in_utterance = False
+        self._utterance = bytearray()
+        self._utterance_id += 1
+        self._voiced_end = 0
+        self._last_partial_start = 0
+        self._partial = None
+
+    async def _finish(
+        self,
+        previous: asyncio.Task[None] | None,
+        speculative: asyncio.Task[str] | None,
+        audio: bytes,
+    ) -> None:
+        """
+        Emits the final transcript of an utterance after the previous one.
+
+        Args:
+            previous: Task emitting the final transcript of the previous utterance.
+            speculative: Speculative transcription covering all the speech, if any.
+            audio: Audio of the utterance.
+        """
+        text = None
+        if speculative is not None:
+            try:
+                text = await speculative
+                self.speculative_hits += 1
+            except Exception:
+                text = None
+        if text is None:
+            try:
+                text = await self._transcribe(audio)
+            except Exception as e:
+                logger.error(f"Error transcribing utterance. Error: {e}")
+                text = ""
+
+        if previous is not None:
+            await previous
+        if text:
+            self.finals += 1
+            self._transcripts.put_nowait(Transcript(text=text, is_final=True))
+
+    async def _transcribe(self, pcm: bytes) -> str:
+        """
+        Transcribes PCM audio with the backend.
+        """
+        return await self.backend.transcribe(
+            audio_data=pcm_to_wav(pcm, self.sample_rate),
+            filename="audio.wav",
+        )
@@ -1,23 +1,160 @@
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from time import perf_counter
 from types import TracebackType
-from typing import AsyncIterator, Literal
+from typing import AsyncIterator, Iterable, Literal, Protocol
 
 from openai import AsyncOpenAI
 
+from nlp_processor.segmentation import FixedSegmenter, Segmenter
+from nlp_processor.tts_cache import TTSCache
+
 type Voice = Literal["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
 type ResponseFormat = Literal["mp3", "opus", "aac", "flac", "wav", "pcm"]
 
 
+class SynthesisLimiter:
+    """
+    Caps the number of speech syntheses running at once in the process.
+
+    Requests beyond the cap wait in a FIFO queue instead of opening more API
+    connections. Queue depth and wait times are tracked for capacity planning.
+    """
+
+    def __init__(self, max_concurrent: int) -> None:
+        """
+        Initializes the SynthesisLimiter object.
+
+        Args:
+            max_concurrent: Maximum number of syntheses running at once.
+        """
+        self.max_concurrent = max_concurrent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.waiting = 0
+        self.active = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """
+        Holds a synthesis slot for the duration of the block, waiting for one if needed.
+        """
+        start = perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        wait = perf_counter() - start
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+class SpeechSynthesisBackend(Protocol):
+    """
+    Synthesizes text to encoded audio.
+    """
+
+    def synthesize(
+        self,
+        text: str,
+        model_name: str,
+        voice: Voice,
+        response_format: ResponseFormat,
+        speed: float,
+        chunk_size: int,
+    ) -> AsyncIterator[bytes]:
+        """
+        Synthesize text to speech.
+
+        Args:
+            text: The text to convert to speech.
+            model_name: The name of the model to use.
+            voice: The voice to use for speech synthesis.
+            response_format: The format of the audio.
+            speed: The speed multiplier for speech synthesis.
+            chunk_size: The size in bytes of audio chunks to yield.
+
+        Yields:
+            Chunks of audio bytes, in order.
+        """
+        ...
+
+    async def close(self) -> None:
+        """
+        Releases the resources of the backend.
+        """
+        ...
+
+
+class OpenAISpeechSynthesis:
+    """
+    Speech synthesis backend using the OpenAI API.
+    """
+
+    def __init__(self, client: AsyncOpenAI) -> None:
+        """
+        Initializes the OpenAISpeechSynthesis object.
+
+        Args:
+            client: The OpenAI client to use for API calls.
+        """
+        self.client = client
+
+    async def synthesize(
+        self,
+        text: str,
+        model_name: str,
+        voice: Voice,
+        response_format: ResponseFormat,
+        speed: float,
+        chunk_size: int,
+    ) -> AsyncIterator[bytes]:
+        async with self.client.audio.speech.with_streaming_response.create(
+            model=model_name,
+            input=text,
+            voice=voice,
+            response_format=response_format,
+            speed=speed,
+        ) as audio_stream:
+            async for audio_chunk in audio_stream.iter_bytes(chunk_size=chunk_size):
+                yield audio_chunk
+
+    async def close(self) -> None:
+        """
+        Closes the OpenAI client and its connections.
+        """
+        await self.client.close()
+
+
 class TextToSpeech:
     """
-    Asynchronous context manager for streaming text-to-speech conversion using OpenAI's API.
+    Asynchronous context manager for streaming text-to-speech conversion, using OpenAI's
+    API or another speech synthesis backend.
 
-    Buffers incoming text and sends it to the API when the buffer reaches a certain size or
-    a sentence-ending character is encountered. Yields audio bytes in an asynchronous iterator.
+    Buffers incoming text and sends it to the API whenever the segmentation policy cuts a
+    segment; by default when the buffer reaches a certain size or a sentence-ending
+    character is encountered. Yields audio bytes in an asynchronous iterator.
+
+    Text can either be fed with `feed`/`flush`, which synthesize each segment inline, or
+    submitted with `submit`/`end`, which synthesize up to `max_concurrency` segments at
+    once in the background while `stream` yields their audio strictly in order. The
+    segments whose audio has been streamed completely are kept in `streamed_segments`,
+    so that an interrupted answer can be cut at what was actually delivered.
     """
 
     def __init__(
         self,
-        client: AsyncOpenAI,
+        client: AsyncOpenAI | None,
         model_name: str,
         voice: Voice = "nova",
         response_format: ResponseFormat = "aac",
@@ -31,12 +168,17 @@ class TextToSpeech:
             "\n",
         ),
         chunk_size: int = 1024 * 5,
+        max_concurrency: int = 1,
+        segmenter: Segmenter | None = None,
+        cache: TTSCache | None = None,
+        limiter: SynthesisLimiter | None = None,
+        backend: SpeechSynthesisBackend | None = None,
     ) -> None:
         """
         Initializes the TextToSpeech object.
 
         Args:
-            client: The OpenAI client to use for API calls.
+            client: The OpenAI client to use for API calls, if `backend` is None.
             model_name: The name of the model to use for text-to-speech conversion.
             voice: The voice to use for speech synthesis.
             response_format: The format of the audio response.
@@ -44,8 +186,21 @@ class TextToSpeech:
             buffer_size: The size of the text buffer before sending to the API.
             sentence_endings: Characters that mark the end of a sentence.
             chunk_size: The size in bytes of audio chunks to yield.
+            max_concurrency: The maximum number of segments synthesized at once when
+                submitting text.
+            segmenter: The policy cutting the text into segments. Defaults to a
+                FixedSegmenter using `buffer_size` and `sentence_endings`.
+            cache: The cache of previously synthesized audio. Disabled if None.
+            limiter: The limiter capping concurrent API requests. Unlimited if None.
+            backend: The backend synthesizing the segments. Defaults to the OpenAI API
+                through `client`.
         """
+        if backend is None:
+            if client is None:
+                raise ValueError("An OpenAI client or a speech synthesis backend is required")
+            backend = OpenAISpeechSynthesis(client)
         self.client = client
+        self.backend: SpeechSynthesisBackend = backend
         self.model_name = model_name
         self.voice: Voice = voice
         self.response_format: ResponseFormat = response_format
@@ -53,7 +208,26 @@ class TextToSpeech:
         self.buffer_size = buffer_size
         self.sentence_endings = sentence_endings
         self.chunk_size = chunk_size
-        self._buffer = ""
+        self.max_concurrency = max_concurrency
+        self.segmenter: Segmenter = segmenter or FixedSegmenter(
+            buffer_size=buffer_size, sentence_endings=sentence_endings
+        )
+        self.cache = cache
+        self.limiter = limiter
+        self._reset_queue()
+
+    def _reset_queue(self) -> None:
+        """
+        Resets the state used to synthesize submitted segments in the background.
+        """
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._segments: asyncio.Queue[
+            tuple[str, asyncio.Queue[bytes | Exception | None]] | None
+        ] = asyncio.Queue()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._failure: BaseException | None = None
+        self._aborted = asyncio.Event()
+        self.streamed_segments: list[str] = []
 
     async def __aenter__(self) -> "TextToSpeech":
         """
@@ -66,8 +240,8 @@ class TextToSpeech:
 
     async def feed(self, text: str) -> AsyncIterator[bytes]:
         """
-        Feeds text into the buffer and yields audio bytes if the buffer reaches the buffer size
-        or ends with a sentence-ending character.
+        Feeds text into the buffer and yields audio bytes for every segment the
+        segmentation policy cuts.
 
         Args:
             text: The text to add to the buffer.
@@ -75,11 +249,8 @@ class TextToSpeech:
         Yields:
             Audio bytes generated from the buffered text.
         """
-        self._buffer += text
-        if len(self._buffer) >= self.buffer_size or any(
-            self._buffer.endswith(se) for se in self.sentence_endings
-        ):
-            async for chunk in self.flush():
+        for segment in self.segmenter.push(text):
+            async for chunk in self._send_audio(segment):
                 yield chunk
 
     async def flush(self) -> AsyncIterator[bytes]:
@@ -89,14 +260,144 @@ class TextToSpeech:
         Yields:
             Audio bytes generated from the buffered text.
         """
-        if self._buffer:
-            async for chunk in self._send_audio(self._buffer):
+        if text := self.segmenter.flush():
+            async for chunk in self._send_audio(text):
                 yield chunk
-            self._buffer = ""
+
+    async def submit(self, text: str) -> None:
+        """
+        Feeds text into the buffer and submits every segment the segmentation policy cuts
+        for background synthesis.
+
+        Waits only when `max_concurrency` segments are already being synthesized or are
+        waiting to be streamed.
+
+        Args:
+            text: The text to add to the buffer.
+
+        Raises:
+            The error that stopped the consumer of `stream`, if it failed.
+        """
+        for segment in self.segmenter.push(text):
+            await self._submit_segment(segment)
+
+    async def end(self) -> None:
+        """
+        Submits the remaining buffered text and marks the end of the submitted text.
+        """
+        if text := self.segmenter.flush():
+            await self._submit_segment(text)
+        self._segments.put_nowait(None)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """
+        Yields the audio of the submitted segments in submission order until `end` is
+        called.
+
+        Yields:
+            Audio bytes generated from the submitted text.
+        """
+        try:
+            while (segment := await self._segments.get()) is not None:
+                text, audio = segment
+                try:
+                    while (chunk := await audio.get()) is not None:
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        yield chunk
+                finally:
+                    self._slots.release()
+                self.streamed_segments.append(text)
+        except Exception as e:
+            self.abort(e)
+            raise
+
+    def abort(self, error: BaseException) -> None:
+        """
+        Stops the synthesis after the consumer of `stream` has failed (e.g. on a
+        synthesis error or a closed connection), so that `submit` and `end` raise the
+        error instead of waiting forever for a slot that will never be freed.
+
+        Args:
+            error: The error that stopped the consumer.
+        """
+        if self._failure is None:
+            self._failure = error
+        self._aborted.set()
+        for task in self._tasks:
+            task.cancel()
+
+    async def _submit_segment(self, text: str) -> None:
+        """
+        Starts synthesizing a segment in the background, once a slot is free.
+
+        Args:
+            text: The text to convert to speech.
+        """
+        await self._acquire_slot()
+        audio: asyncio.Queue[bytes | Exception | None] = asyncio.Queue()
+        task = asyncio.create_task(self._synthesize(text, audio))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        self._segments.put_nowait((text, audio))
+
+    async def _acquire_slot(self) -> None:
+        """
+        Waits for a free synthesis slot, unless the consumer of `stream` fails first.
+
+        Raises:
+            The error that stopped the consumer of `stream`, if it failed.
+        """
+        if self._failure is None and not self._slots.locked():
+            await self._slots.acquire()
+            return
+
+        acquire = asyncio.create_task(self._slots.acquire())
+        aborted = asyncio.create_task(self._aborted.wait())
+        try:
+            await asyncio.wait((acquire, aborted), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            aborted.cancel()
+            if self._failure is not None or not acquire.done():
+                acquire.cancel()
+                if acquire.done() and not acquire.cancelled():
+                    self._slots.release()
+        if self._failure is not None:
+            raise self._failure
+
+    async def _synthesize(
+        self, text: str, audio: asyncio.Queue[bytes | Exception | None]
+    ) -> None:
+        """
+        Synthesizes a segment and puts its audio chunks on the segment's queue.
+
+        Args:
+            text: The text to convert to speech.
+            audio: The queue receiving the audio chunks, closed with None once the
+                segment is synthesized.
+        """
+        try:
+            async for chunk in self._send_audio(text):
+                audio.put_nowait(chunk)
+        except Exception as e:
+            audio.put_nowait(e)
+            return
+        audio.put_nowait(None)
+
+    async def warm_up(self, phrases: Iterable[str]) -> None:
+        """
+        Synthesizes phrases ahead of time so that they are served from the cache.
+
+        Args:
+            phrases: The phrases to synthesize.
+        """
+        for phrase in phrases:
+            async for _ in self._send_audio(phrase):
+                pass
 
     async def _send_audio(self, text: str) -> AsyncIterator[bytes]:
         """
-        Sends text to the TTS API and yields audio chunks.
+        Yields the audio of a text from the cache, or from the backend on a cache miss.
 
         Args:
             text: The text to convert to speech.
@@ -104,15 +405,43 @@ class TextToSpeech:
         Yields:
             Chunks of audio bytes generated from the input text.
         """
-        async with self.client.audio.speech.with_streaming_response.create(
-            model=self.model_name,
-            input=text,
-            voice=self.voice,
-            response_format=self.response_format,
-            speed=self.speed,
-        ) as audio_stream:
-            async for audio_chunk in audio_stream.iter_bytes(
-                chunk_size=self.chunk_size
+        if self.cache is None:
+            async for audio_chunk in self._request_audio(text):
+                yield audio_chunk
+            return
+
+        key = self.cache.key(
+            text, self.model_name, self.voice, self.response_format, self.speed
+        )
+        if (audio := await self.cache.load(key)) is not None:
+            for start in range(0, len(audio), self.chunk_size):
+                yield audio[start : start + self.chunk_size]
+            return
+
+        audio_chunks = []
+        async for audio_chunk in self._request_audio(text):
+            audio_chunks.append(audio_chunk)
+            yield audio_chunk
+        await self.cache.store(key, b"".join(audio_chunks))
+
+    async def _request_audio(self, text: str) -> AsyncIterator[bytes]:
+        """
+        Sends text to the speech synthesis backend and yields audio chunks.
+
+        Args:
+            text: The text to convert to speech.
+
+        Yields:
+            Chunks of audio bytes generated from the input text.
+        """
+        async with self.limiter.slot() if self.limiter else nullcontext():
+            async for audio_chunk in self.backend.synthesize(
+                text,
+                model_name=self.model_name,
+                voice=self.voice,
+                response_format=self.response_format,
+                speed=self.speed,
+                chunk_size=self.chunk_size,
             ):
                 yield audio_chunk
 
@@ -123,6 +452,12 @@ class TextToSpeech:
         exc_tb: TracebackType | None,
     ) -> None:
         """
-        Exits the asynchronous context manager.
+        Exits the asynchronous context manager, cancelling any synthesis still in
+        progress and waiting for it to stop.
         """
-        pass
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.segmenter.reset()
+        self._reset_queue()
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio.
+
+    Entries are keyed on everything that determines the audio (text, model, voice,
+    format and speed). Recently used entries are kept in memory, bounded by their total
+    size in bytes; optionally every entry is also written to a directory so that the
+    cache survives restarts. The directory is bounded too, pruning the least recently
+    used files (by modification time, which is refreshed on every disk hit).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        directory: str | Path | None = None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        """
+        Initializes the TTSCache object.
+
+        Args:
+            max_bytes: Maximum total size of the audio kept in memory.
+            directory: Directory for the on-disk tier. Disabled if None.
+            max_disk_bytes: Maximum total size of the audio kept in the directory.
+        """
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._files: OrderedDict[str, int] | None = None
+        self._disk_size = 0
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+
+    @staticmethod
+    def key(
+        text: str,
+        model_name: str,
+        voice: str,
+        response_format: str,
+        speed: float,
+    ) -> str:
+        """
+        Computes the cache key of a synthesis request.
+
+        Args:
+            text: The text to convert to speech.
+            model_name: The name of the text-to-speech model.
+            voice: The voice used for speech synthesis.
+            response_format: The format of the audio.
+            speed: The speed multiplier for speech synthesis.
+
+        Returns:
+            Hex digest identifying the audio.
+        """
+        content = "\x1f".join(
+            (text.strip(), model_name, voice, response_format, f"{speed:.2f}")
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    async def load(self, key: str) -> bytes | None:
+        """
+        Looks up audio in memory, then on disk.
+
+        Args:
+            key: Cache key of the audio.
+
+        Returns:
+            The cached audio, or None on a miss.
+        """
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        elif self.directory is not None and (
+            audio := await asyncio.to_thread(self._read, key)
+        ) is not None:
+            self._remember(key, audio)
+            self.hits += 1
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            return None
+        self.bytes_served += len(audio)
+        return audio
+
+    async def store(self, key: str, audio: bytes) -> None:
+        """
+        Stores audio in memory and, if enabled, on disk.
+
+        Args:
+            key: Cache key of the audio.
+            audio: The synthesized audio.
+        """
+        self._remember(key, audio)
+        if self.directory is not None:
+            await asyncio.to_thread(self._write, key, audio)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Cache counters.
+
+        Returns:
+            Hits (of which from disk), misses, bytes served from the cache, number and
+            size of the entries in memory, and size of the entries on disk.
+        """
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bytes_served": self.bytes_served,
+            "entries": len(self._entries),
+            "memory_bytes": self._size,
+            "disk_bytes": self._disk_size,
+        }
+
+    def _remember(self, key: str, audio: bytes) -> None:
+        """
+        Adds audio to the in-memory tier, evicting the least recently used entries.
+        """
+        if len(audio) > self.max_bytes:
+            return
+        if (previous := self._entries.pop(key, None)) is not None:
+            self._size -= len(previous)
+        self._entries[key] = audio
+        self._size += len(audio)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / key[:2] / key
+
+    def _index(self) -> OrderedDict[str, int]:
+        """
+        Lists the files of the on-disk tier from least to most recently used, scanning
+        the directory on first use. Must be called with the disk lock held.
+        """
+        if self._files is None:
+            assert self.directory is not None
+            files = [
+                (entry.stat().st_mtime, path.name, entry.stat().st_size)
+                for path in self.directory.iterdir()
+                if path.is_dir()
+                for entry in os.scandir(path)
+                if entry.is_file() and not entry.name.endswith(".tmp")
+            ]
+            self._files = OrderedDict((key, size) for _, key, size in sorted(files))
+            self._disk_size = sum(self._files.values())
+        return self._files
+
+    def _read(self, key: str) -> bytes | None:
+        """
+        Reads audio from the on-disk tier, marking it as recently used.
+        """
+        path = self._path(key)
+        try:
+            audio = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        with self._disk_lock:
+            files = self._index()
+            if key in files:
+                files.move_to_end(key)
+        return audio
+
+    def _write(self, key: str, audio: bytes) -> None:
+        """
+        Atomically writes audio to the on-disk tier, then prunes the least recently used
+        files beyond the size budget.
+        """
+        if len(audio) > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(audio)
+        os.replace(tmp_path, path)
+
+        with self._disk_lock:
+            files = self._index()
+            self._disk_size += len(audio) - files.pop(key, 0)
+            files[key] = len(audio)
+            while self._disk_size > self.max_disk_bytes:
+                evicted, size = files.popitem(last=False)
+                self._disk_size -= size
+                self._path(evicted).unlink(missing_ok=True)
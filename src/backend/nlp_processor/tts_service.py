@@ -0,0 +1,101 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from nlp_processor.text_to_speech import (
+    SpeechSynthesisBackend,
+    SynthesisLimiter,
+    TextToSpeech,
+)
+from nlp_processor.tts_cache import TTSCache
+
+
+class TTSService:
+    """
+    Process-wide text-to-speech service.
+
+    Owns the speech synthesis backend (the OpenAI client and so its HTTP connection
+    pool, or the local engine and its workers), the audio cache and the synthesis
+    limiter, and leases TextToSpeech handlers to connections, recycling them when the
+    connection closes.
+
+    Leasing never waits: handlers only hold per-turn state, and the shared resource
+    they contend for is the synthesis limiter, so its `synthesis_wait_*` counters are
+    the measure of TTS capacity.
+    """
+
+    def __init__(
+        self,
+        backend: SpeechSynthesisBackend,
+        handler_factory: Callable[[], TextToSpeech],
+        limiter: SynthesisLimiter,
+        cache: TTSCache | None = None,
+        max_idle_handlers: int = 16,
+    ) -> None:
+        """
+        Initializes the TTSService object.
+
+        Args:
+            backend: The speech synthesis backend used by the handlers.
+            handler_factory: Creates a new handler using `backend`, `limiter` and
+                `cache`.
+            limiter: Limiter shared by all handlers.
+            cache: Cache of synthesized audio shared by all handlers.
+            max_idle_handlers: Maximum number of handlers kept for reuse.
+        """
+        self.backend = backend
+        self.handler_factory = handler_factory
+        self.limiter = limiter
+        self.cache = cache
+        self.max_idle_handlers = max_idle_handlers
+        self._idle: list[TextToSpeech] = []
+        self.leased = 0
+        self.leases = 0
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[TextToSpeech]:
+        """
+        Leases a handler for the duration of the block.
+
+        Yields:
+            Handler for text-to-speech conversion.
+        """
+        handler = self._idle.pop() if self._idle else self.handler_factory()
+        self.leases += 1
+        self.leased += 1
+        try:
+            yield handler
+        finally:
+            self.leased -= 1
+            await handler.__aexit__(None, None, None)
+            if len(self._idle) < self.max_idle_handlers:
+                self._idle.append(handler)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Service counters.
+
+        Returns:
+            Handler leases, synthesis queue depth, active syntheses and slot wait times.
+        """
+        acquired = self.limiter.acquired
+        return {
+            "handlers_leased": self.leased,
+            "handlers_idle": len(self._idle),
+            "leases": self.leases,
+            "synthesis_max_concurrent": self.limiter.max_concurrent,
+            "synthesis_queue_depth": self.limiter.waiting,
+            "synthesis_active": self.limiter.active,
+            "synthesis_total": acquired,
+            "synthesis_wait_seconds_total": self.limiter.total_wait,
+            "synthesis_wait_seconds_avg": (
+                self.limiter.total_wait / acquired if acquired else 0.0
+            ),
+            "synthesis_wait_seconds_max": self.limiter.max_wait,
+        }
+
+    async def close(self) -> None:
+        """
+        Closes the speech synthesis backend.
+        """
+        self._idle.clear()
+        await self.backend.close()
@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+
+
+def frame_energies(pcm: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    Computes the energy of consecutive frames of audio.
+
+    Args:
+        pcm: Mono 16-bit PCM samples.
+        frame_length: Number of samples per frame. A trailing partial frame is ignored.
+
+    Returns:
+        RMS energy of each frame in dBFS.
+    """
+    n_frames = len(pcm) // frame_length
+    frames = pcm[: n_frames * frame_length].reshape(n_frames, frame_length)
+    samples = frames.astype(np.float32) / 32768.0
+    rms = np.sqrt(np.mean(np.square(samples), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+@dataclass
+class VadFrame:
+    """
+    A frame of audio classified by the endpointer.
+
+    Attributes:
+        audio: 16-bit PCM bytes of the frame.
+        voiced: Whether the frame contains speech.
+        event: "start" on the frame where speech is detected, "end" on the frame where
+            the end of speech is detected, None otherwise.
+    """
+
+    audio: bytes
+    voiced: bool
+    event: Literal["start", "end"] | None = None
+
+
+class Endpointer:
+    """
+    Streaming energy-based voice activity detector.
+
+    A frame is voiced when its energy exceeds both an absolute threshold and the
+    running noise floor by a margin. Speech starts after `min_speech_ms` of voiced
+    frames and ends after `end_silence_ms` of unvoiced frames.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        threshold_db: float = -45.0,
+        noise_margin_db: float = 10.0,
+        min_speech_ms: int = 60,
+        end_silence_ms: int = 600,
+    ) -> None:
+        """
+        Initializes the Endpointer object.
+
+        Args:
+            sample_rate: Sample rate of the audio in Hz.
+            frame_ms: Duration of a frame in milliseconds.
+            threshold_db: Minimum energy of a voiced frame in dBFS.
+            noise_margin_db: Margin above the noise floor of a voiced frame in dB.
+            min_speech_ms: Duration of voiced audio after which speech starts.
+            end_silence_ms: Duration of unvoiced audio after which speech ends.
+        """
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.threshold_db = threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self.in_speech = False
+        self._noise_floor_db = -60.0
+        self._run = 0
+        self._pending = b""
+
+    def process(self, pcm: bytes) -> list[VadFrame]:
+        """
+        Classifies the complete frames of the given audio, keeping any remainder for
+        the next call.
+
+        Args:
+            pcm: Mono 16-bit little-endian PCM bytes.
+
+        Returns:
+            The classified frames.
+        """
+        pcm = self._pending + pcm
+        frame_bytes = self.frame_length * 2
+        n_frames = len(pcm) // frame_bytes
+        self._pending = pcm[n_frames * frame_bytes :]
+        if n_frames == 0:
+            return []
+
+        samples = np.frombuffer(pcm[: n_frames * frame_bytes], dtype="<i2")
+        energies = frame_energies(samples, self.frame_length)
+
+        frames = []
+        for i, energy in enumerate(energies.tolist()):
+            threshold = max(self.threshold_db, self._noise_floor_db + self.noise_margin_db)
+            voiced = energy > threshold
+            if not voiced and not self.in_speech:
+                self._noise_floor_db = 0.95 * self._noise_floor_db + 0.05 * energy
+
+            event: Literal["start", "end"] | None = None
+            self._run = self._run + 1 if voiced != self.in_speech else 0
+            if not self.in_speech and self._run >= self.min_speech_frames:
+                self.in_speech, self._run, event = True, 0, "start"
+            elif self.in_speech and self._run >= self.end_silence_frames:
+                self.in_speech, self._run, event = False, 0, "end"
+
+            frames.append(
+                VadFrame(
+                    audio=pcm[i * frame_bytes : (i + 1) * frame_bytes],
+                    voiced=voiced,
+                    event=event,
+                )
+            )
+        return frames
+
+
+def speech_bounds(
+    pcm: np.ndarray,
+    sample_rate: int = 16000,
+    frame_ms: int = 20,
+    threshold_db: float = -45.0,
+    noise_margin_db: float = 10.0,
+    max_noise_floor_db: float = -55.0,
+    min_speech_ms: int = 100,
+    padding_ms: int = 200,
+) -> tuple[int, int] | None:
+    """
+    Finds the speech in a complete utterance with a single vectorized energy pass.
+
+    A frame is voiced when its energy exceeds both an absolute threshold and the noise
+    floor (the 10th percentile of the frame energies, capped so that an utterance
+    without any pause is not mistaken for noise) by a margin.
+
+    Args:
+        pcm: Mono 16-bit PCM samples.
+        sample_rate: Sample rate of the audio in Hz.
+        frame_ms: Duration of a frame in milliseconds.
+        threshold_db: Minimum energy of a voiced frame in dBFS.
+        noise_margin_db: Margin above the noise floor of a voiced frame in dB.
+        max_noise_floor_db: Maximum estimated noise floor in dBFS.
+        min_speech_ms: Minimum total duration of voiced frames of an utterance.
+        padding_ms: Audio kept before the first and after the last voiced frame.
+
+    Returns:
+        Start and end sample of the speech, or None if there is no speech.
+    """
+    frame_length = sample_rate * frame_ms // 1000
+    energies = frame_energies(pcm, frame_length)
+    if len(energies) == 0:
+        return None
+
+    noise_floor_db = min(float(np.percentile(energies, 10)), max_noise_floor_db)
+    voiced = np.flatnonzero(
+        energies > max(threshold_db, noise_floor_db + noise_margin_db)
+    )
+    if len(voiced) * frame_ms < min_speech_ms:
+        return None
+
+    padding = sample_rate * padding_ms // 1000
+    start = max(0, int(voiced[0]) * frame_length - padding)
+    end = min(len(pcm), (int(voiced[-1]) + 1) * frame_length + padding)
+    return start, end
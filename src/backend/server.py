@@ -1,28 +1,45 @@
+import asyncio
+import json
 from pathlib import Path
+from time import perf_counter
 
 import logfire
-from fastapi import Depends, FastAPI, WebSocket
-from fastapi.responses import HTMLResponse
-from groq import AsyncGroq
+from fastapi import Depends, FastAPI, Query, Request, WebSocket
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from loguru import logger
-from psycopg import AsyncConnection
 from pydantic import UUID4
 from pydantic_ai import Agent
 
 from api.dependencies import (
     get_agent,
     get_agent_dependencies,
+    get_conversation_context,
     get_conversation_id,
     get_db_conn,
-    get_groq_client,
+    get_history_writer,
+    get_intent_router,
+    get_metrics,
+    get_stt_backend,
     get_tts_handler,
 )
 from api.lifespan import app_lifespan as lifespan
-from convo_history_db.actions import get_conversation_history, store_message
-from nlp_processor.speech_to_text import transcribe_audio_data
+from api.metrics import Metrics
+from api.pipeline import (
+    ConversationSession,
+    TurnRunner,
+    TurnTimer,
+    current_turn,
+    spoken_prefix,
+)
+from config.settings import get_settings
+from nlp_processor.audio import PreparedAudio, prepare_audio
+from nlp_processor.speech_to_text import SpeechToTextBackend
+from nlp_processor.streaming_stt import StreamingTranscriber
 from nlp_processor.text_to_speech import TextToSpeech
 from ai_services.agent import Dependencies
-from ai_services.utils import format_messages_for_agent
+from ai_services.intents import CannedResponse, IntentRouter
+from ai_services.context import ConversationContext
+from convo_history_db.writer import HistoryWriter
 
 app = FastAPI(title="Voice to Voice Banking Assistant", lifespan=lifespan)
 
@@ -49,88 +66,471 @@ async def health(websocket: WebSocket) -> dict[str, str]:
         return {"status": "failed", "error": str(e)}
 
 
+@app.get("/stats")
+async def stats(request: Request) -> dict[str, dict[str, float]]:
+    """
+    Counters of the shared resources, for capacity planning.
+
+    Args:
+        request: HTTP request to get the application state.
+
+    Returns:
+        A dictionary of counters per resource.
+    """
+    return collect_stats(request)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request) -> str:
+    """
+    Latency histograms of the voice turns and counters of the shared resources, in the
+    Prometheus text format.
+
+    Args:
+        request: HTTP request to get the application state.
+
+    Returns:
+        Metrics exposition.
+    """
+    return request.state.metrics.render(collect_stats(request))
+
+
+def collect_stats(request: Request) -> dict[str, dict[str, float]]:
+    """
+    Collects the counters of the shared resources.
+
+    Args:
+        request: HTTP request to get the application state.
+
+    Returns:
+        A dictionary of counters per resource.
+    """
+    tts_service = request.state.tts_service
+    counters = {
+        "tts_cache": tts_service.cache.stats(),
+        "tts_service": tts_service.stats(),
+        "transactions_db": request.state.transactions_pool.stats(),
+        "history_db": request.state.pool.get_stats(),
+        "history_writer": request.state.history_writer.stats(),
+    }
+    if request.state.tool_cache is not None:
+        counters["tool_cache"] = request.state.tool_cache.stats()
+    if request.state.transaction_analytics is not None:
+        counters["transaction_analytics"] = request.state.transaction_analytics.stats()
+    if request.state.local_stt is not None:
+        counters["local_stt"] = request.state.local_stt.stats()
+    if request.state.intent_router is not None:
+        counters["intent_router"] = request.state.intent_router.stats()
+    if request.state.local_tts is not None:
+        counters["local_tts"] = request.state.local_tts.stats()
+    if request.state.stt_batcher is not None:
+        counters["stt_batcher"] = request.state.stt_batcher.stats()
+    return counters
+
+
+async def send_audio(
+    websocket: WebSocket,
+    tts_handler: TextToSpeech,
+    timer: TurnTimer,
+    metrics: Metrics,
+) -> None:
+    """
+    Sends synthesized audio to the client as it becomes available.
+
+    Runs alongside the LLM stream so that a slow websocket send never holds up
+    the generation of the next sentence. If sending fails, the synthesis is aborted
+    so that the LLM stream does not wait for audio nobody will send.
+
+    Args:
+        websocket: WebSocket connection.
+        tts_handler: Text-to-Speech handler whose submitted text to send as audio.
+        timer: Timer of the current turn.
+        metrics: Histograms recording how long each send takes.
+    """
+    with timer.stage("tts"):
+        try:
+            async for audio_chunk in tts_handler.stream():
+                timer.mark("first_audio")
+                start = perf_counter()
+                await websocket.send_bytes(data=audio_chunk)
+                elapsed = perf_counter() - start
+                timer.add("websocket_send", elapsed)
+                metrics.websocket_sends.observe(elapsed)
+        except Exception as e:
+            tts_handler.abort(e)
+            raise
+
+
+async def finish_turn(
+    websocket: WebSocket,
+    answer: str,
+    timer: TurnTimer,
+    metrics: Metrics,
+    send_timings: bool,
+) -> None:
+    """
+    Sends the text of the answer once its audio is sent, and records the timings of the
+    turn.
+
+    Args:
+        websocket: WebSocket connection.
+        answer: Text of the answer.
+        timer: Timer of the completed turn.
+        metrics: Histograms the timings of the turn are added to.
+        send_timings: Whether to send the timings of the turn to the client, as a
+            `Timings: <json>` frame.
+    """
+    await websocket.send_text(f"Agent: {answer}")
+
+    metrics.observe_turn(timer)
+    logger.info(f"Turn timings: {timer.report()}")
+    if send_timings:
+        await websocket.send_text(f"Timings: {json.dumps(timer.as_dict())}")
+
+
+async def reply(
+    websocket: WebSocket,
+    session: ConversationSession,
+    transcription: str,
+    response: CannedResponse,
+    tts_handler: TextToSpeech,
+    timer: TurnTimer,
+    metrics: Metrics,
+) -> None:
+    """
+    Answers a greeting, thanks or goodbye with its fixed response, recorded in the
+    history like an answer of the agent once its audio is sent. The pre-rendered audio
+    is sent as is; a response not rendered yet is synthesized (and so cached), and if
+    interrupted, only the part whose audio was delivered is recorded.
+
+    Args:
+        websocket: WebSocket connection.
+        session: Conversation state of the connection.
+        transcription: Transcribed utterance of the user.
+        response: Fixed response of the recognized intent.
+        tts_handler: Text-to-Speech handler, used if the audio is not rendered.
+        timer: Timer of the current turn.
+        metrics: Histograms recording how long each send takes.
+    """
+    logger.info(f"Answering the {response.intent} intent without the agent")
+    session.record(sender="user", content=transcription)
+    if response.audio is None:
+        async with tts_handler:
+            sender = asyncio.create_task(
+                send_audio(websocket, tts_handler, timer, metrics)
+            )
+            try:
+                await tts_handler.submit(text=response.text)
+                await tts_handler.end()
+                await sender
+            except BaseException:
+                sender.cancel()
+                await asyncio.gather(sender, return_exceptions=True)
+                # store only the part of the response the user heard
+                if spoken := spoken_prefix(response.text, tts_handler.streamed_segments):
+                    session.record(sender="agent", content=spoken)
+                raise
+    else:
+        with timer.stage("tts"):
+            for audio_chunk in response.audio:
+                timer.mark("first_audio")
+                start = perf_counter()
+                await websocket.send_bytes(data=audio_chunk)
+                elapsed = perf_counter() - start
+                timer.add("websocket_send", elapsed)
+                metrics.websocket_sends.observe(elapsed)
+    session.record(sender="agent", content=response.text)
+
+
+async def respond(
+    websocket: WebSocket,
+    session: ConversationSession,
+    transcription: str,
+    agent: Agent[Dependencies],
+    agent_deps: Dependencies,
+    tts_handler: TextToSpeech,
+    timer: TurnTimer,
+    metrics: Metrics,
+    send_timings: bool = False,
+    intent_router: IntentRouter | None = None,
+) -> None:
+    """
+    Generates the agent's answer to a transcribed utterance and streams it to the client
+    as speech. Greetings, thanks and goodbyes recognized by the intent router are
+    answered with a fixed response instead, without the agent.
+
+    If the turn is cancelled (e.g. interrupted by a new utterance), the LLM stream and
+    the pending syntheses are cancelled with it. If the answer was still being
+    generated, only the part whose audio was delivered is recorded in the history;
+    once generated, the whole answer is stored while its last audio is sent.
+
+    Args:
+        websocket: WebSocket connection.
+        session: Conversation state of the connection.
+        transcription: Transcribed utterance of the user.
+        agent: Language model agent for generating responses.
+        agent_deps: Dependencies for the agent.
+        tts_handler: Text-to-Speech handler for converting text to audio.
+        timer: Timer of the current turn, also timing the tool calls.
+        metrics: Histograms the timings of the completed turn are added to.
+        send_timings: Whether to send the timings of the turn to the client, as a
+            `Timings: <json>` frame after the answer.
+        intent_router: Router of the trivial utterances. Every utterance goes to the
+            agent if None.
+    """
+    current_turn.set(timer)
+
+    # answer the trivial utterances without the agent
+    with timer.stage("intent"):
+        response = intent_router.match(transcription) if intent_router else None
+    if response is not None:
+        await reply(websocket, session, transcription, response, tts_handler, timer, metrics)
+        metrics.llm_requests.observe(0)
+        await finish_turn(websocket, response.text, timer, metrics, send_timings)
+        return
+
+    # prepare the messages for the agent from the in-memory, bounded context
+    with timer.stage("context"):
+        agent_messages = session.agent_messages()
+
+    # queue the user's message to be stored in the background
+    session.record(sender="user", content=transcription)
+
+    # generate the agent's response
+    logger.info("Starting generation process")
+    generation = ""
+    async with tts_handler:
+        sender = asyncio.create_task(
+            send_audio(websocket, tts_handler, timer, metrics)
+        )
+        try:
+            with timer.stage("llm"):
+                async with agent.run_stream(
+                    user_prompt=transcription,
+                    message_history=agent_messages,
+                    deps=agent_deps,
+                ) as result:
+                    async for message in result.stream_text(delta=True):
+                        logger.debug("Delta: {m}", m=message)
+                        timer.mark("first_token")
+
+                        generation += message
+
+                        await tts_handler.submit(text=message)
+                    metrics.llm_requests.observe(result.usage.requests)
+
+        except BaseException:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+            # store only the part of the agent's response the user heard
+            if spoken := spoken_prefix(generation, tts_handler.streamed_segments):
+                session.record(sender="agent", content=spoken)
+            logger.info(f"Answer cut after {len(spoken)}/{len(generation)} characters")
+            raise
+
+        # store the agent's response while the last audio is sent
+        session.record(sender="agent", content=generation)
+
+        try:
+            await tts_handler.end()
+            with timer.stage("tts_drain"):
+                await sender
+        except BaseException:
+            sender.cancel()
+            raise
+    await finish_turn(websocket, generation, timer, metrics, send_timings)
+
+
 @app.websocket("/voice_stream")
 async def voice_to_voice(
     websocket: WebSocket,
+    audio_mime: str | None = None,
+    timings: bool = False,
     conversation_id: UUID4 = Depends(get_conversation_id),
-    db_conn: AsyncConnection = Depends(get_db_conn),
-    groq_client: AsyncGroq = Depends(get_groq_client),
+    history_writer: HistoryWriter = Depends(get_history_writer),
+    context: ConversationContext = Depends(get_conversation_context),
+    stt_backend: SpeechToTextBackend = Depends(get_stt_backend),
     agent: Agent[Dependencies] = Depends(get_agent),
     agent_deps: Dependencies = Depends(get_agent_dependencies),
     tts_handler: TextToSpeech = Depends(get_tts_handler),
+    metrics: Metrics = Depends(get_metrics),
+    intent_router: IntentRouter | None = Depends(get_intent_router),
 ):
     """
     WebSocket endpoint for voice-to-voice communication.
 
     - Receives audio bytes from the client
+    - Trims the silence around the speech, skipping the turn (and sending a
+      `Control: no_speech` frame) if there is no speech
     - Transcribes the audio to text
     - Generates a response using the language model agent
     - Converts the response text to speech, and streams the audio bytes back to the client.
 
+    Turns are processed in the background so that the next utterance is read right
+    away. An utterance containing speech interrupts the answer in progress: its
+    generation and synthesis are cancelled and a `Control: stop_playback` frame tells
+    the client to stop playing the audio it already received.
+
+    The conversation history is served from memory and messages are stored in the
+    background, in batches shared with the other connections, so database round-trips
+    stay off the path between the end of the user's speech and the first audio byte of
+    the answer. Only the most recent messages that fit in the context budget are sent
+    to the agent, after a summary of the older ones written in the background.
+
     Args:
         websocket: WebSocket connection.
+        audio_mime: MIME type of the audio recorded by the client (query parameter).
+            The container format is sniffed from the audio if it is not given.
+        timings: Whether to send the timings of each turn, as a `Timings: <json>`
+            frame after the answer (query parameter).
         conversation_id: Unique identifier for the conversation (dependency).
-        db_conn: Asynchronous database connection (dependency).
-        groq_client: Groq API client for transcription (dependency).
+        history_writer: Writer of the conversation history database (dependency).
+        context: Bounded conversation context sent to the agent (dependency).
+        stt_backend: Speech-to-text backend for transcription (dependency).
         agent: Language model agent for generating responses (dependency).
         agent_deps: Dependencies for the agent (dependency).
         tts_handler: Text-to-Speech handler for converting text to audio (dependency).
+        metrics: Latency histograms of the voice turns (dependency).
+        intent_router: Router answering greetings, thanks and goodbyes without the
+            agent (dependency).
     """
     await websocket.accept()
     logger.info(f"New websocket connection for conversation {conversation_id}")
+    settings = get_settings()
+    session = ConversationSession(
+        conversation_id=conversation_id, writer=history_writer, context=context
+    )
+    turns = TurnRunner()
 
-    async for incoming_audio_bytes in websocket.iter_bytes():
-        # 1: transcribe the incoming audio
+    async def process_turn(audio: PreparedAudio, timer: TurnTimer) -> None:
         logger.info("Starting transcription process")
-        transcription = await transcribe_audio_data(
-            audio_data=incoming_audio_bytes,
-            api_client=groq_client,
-            model_name="whisper-large-v3-turbo",
-        )
+        with timer.stage("stt"):
+            transcription = await stt_backend.transcribe(
+                audio_data=audio.data, filename=audio.filename
+            )
         await websocket.send_text(f"Client: {transcription}")
-        # 2: store the user's message
-        await store_message(
-            conn=db_conn,
-            conversation_id=conversation_id,
-            sender="user",
-            content=transcription,
-        )
 
-        # 3: retrieve the conversation history
-        conversation_history = await get_conversation_history(
-            conn=db_conn, conversation_id=conversation_id
+        await respond(
+            websocket=websocket,
+            session=session,
+            transcription=transcription,
+            agent=agent,
+            agent_deps=agent_deps,
+            tts_handler=tts_handler,
+            timer=timer,
+            metrics=metrics,
+            send_timings=timings,
+            intent_router=intent_router,
         )
 
-        # 4: prepare the messages for the agent
-        agent_messages = format_messages_for_agent(
-            conversation_history=conversation_history
-        )
+    try:
+        async for incoming_audio_bytes in websocket.iter_bytes():
+            timer = TurnTimer(conversation_id=conversation_id)
+            metrics.audio_received.observe(len(incoming_audio_bytes))
 
-        # 5: generate the agent's response
-        logger.info("Starting generation process")
-        generation = ""
-        async with tts_handler:
-            async with agent.run_stream(
-                user_prompt=transcription,
-                message_history=agent_messages,
-                deps=agent_deps,
-            ) as result:
-                async for message in result.stream_text(delta=True):
-                    logger.debug("Delta: {m}", m=message)
-                    
-                    generation += message
-
-                    async for audio_chunk in tts_handler.feed(text=message):
-                        await websocket.send_bytes(data=audio_chunk)
-
-            async for audio_chunk in tts_handler.flush():
-                await websocket.send_bytes(data=audio_chunk)
-        await websocket.send_text(f"Agent: {generation}")
-
-        # 6: store the agent's response for history tracking
-        await store_message(
-            conn=db_conn,
-            conversation_id=conversation_id,
-            sender="agent",
-            content=generation,
-        )
+            with timer.stage("preprocess"):
+                audio = await prepare_audio(
+                    data=incoming_audio_bytes,
+                    preprocess=settings.stt.preprocess,
+                    sample_rate=settings.stt.sample_rate,
+                    declared_mime_type=audio_mime,
+                )
+            if audio is None:
+                logger.info("No speech in the received audio, skipping the turn")
+                await websocket.send_text("Control: no_speech")
+                continue
+
+            if await turns.interrupt():
+                await websocket.send_text("Control: stop_playback")
+            turns.start(process_turn(audio, timer))
+    finally:
+        await turns.close()
+        await session.close()
+
+
+@app.websocket("/voice_stream/live")
+async def live_voice_to_voice(
+    websocket: WebSocket,
+    sample_rate: int = Query(16000, gt=0, le=48000),
+    timings: bool = False,
+    conversation_id: UUID4 = Depends(get_conversation_id),
+    history_writer: HistoryWriter = Depends(get_history_writer),
+    context: ConversationContext = Depends(get_conversation_context),
+    stt_backend: SpeechToTextBackend = Depends(get_stt_backend),
+    agent: Agent[Dependencies] = Depends(get_agent),
+    agent_deps: Dependencies = Depends(get_agent_dependencies),
+    tts_handler: TextToSpeech = Depends(get_tts_handler),
+    metrics: Metrics = Depends(get_metrics),
+    intent_router: IntentRouter | None = Depends(get_intent_router),
+):
+    """
+    WebSocket endpoint for voice-to-voice communication with streaming speech-to-text.
+
+    - Receives a continuous stream of mono 16-bit PCM audio frames from the client
+    - Detects the start and end of each utterance, transcribing the speech so far while
+      the user is still speaking and sending it as `Partial: <text>` frames
+    - On the end of speech, sends the final `Client: <text>` frame and answers it like
+      `/voice_stream`
+    - Speech detected while an answer is in progress interrupts it, like `/voice_stream`
+
+    Args:
+        websocket: WebSocket connection.
+        sample_rate: Sample rate of the incoming audio in Hz, at most 48000 (query
+            parameter).
+        timings: Whether to send the timings of each turn, as a `Timings: <json>`
+            frame after the answer (query parameter).
+        conversation_id: Unique identifier for the conversation (dependency).
+        history_writer: Writer of the conversation history database (dependency).
+        context: Bounded conversation context sent to the agent (dependency).
+        stt_backend: Speech-to-text backend for transcription (dependency).
+        agent: Language model agent for generating responses (dependency).
+        agent_deps: Dependencies for the agent (dependency).
+        tts_handler: Text-to-Speech handler for converting text to audio (dependency).
+        metrics: Latency histograms of the voice turns (dependency).
+        intent_router: Router answering greetings, thanks and goodbyes without the
+            agent (dependency).
+    """
+    await websocket.accept()
+    logger.info(f"New live websocket connection for conversation {conversation_id}")
+    session = ConversationSession(
+        conversation_id=conversation_id, writer=history_writer, context=context
+    )
+    transcriber = StreamingTranscriber(backend=stt_backend, sample_rate=sample_rate)
+
+    async def receive_audio() -> None:
+        try:
+            async for frame in websocket.iter_bytes():
+                transcriber.feed(frame)
+        finally:
+            await transcriber.close()
+
+    receiver = asyncio.create_task(receive_audio())
+    turns = TurnRunner()
+    try:
+        async for transcript in transcriber.transcripts():
+            if await turns.interrupt():
+                await websocket.send_text("Control: stop_playback")
+
+            if not transcript.is_final:
+                await websocket.send_text(f"Partial: {transcript.text}")
+                continue
+
+            await websocket.send_text(f"Client: {transcript.text}")
+            turns.start(
+                respond(
+                    websocket=websocket,
+                    session=session,
+                    transcription=transcript.text,
+                    agent=agent,
+                    agent_deps=agent_deps,
+                    tts_handler=tts_handler,
+                    timer=TurnTimer(conversation_id=conversation_id),
+                    metrics=metrics,
+                    send_timings=timings,
+                    intent_router=intent_router,
+                )
+            )
+    finally:
+        receiver.cancel()
+        await turns.close()
+        await session.close()
@@ -0,0 +1,93 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic_ai.messages import ModelRequest, SystemPromptPart, UserPromptPart
+
+from ai_services.context import ConversationContext, estimate_tokens
+from api.pipeline import ConversationSession
+from convo_history_db.writer import Message
+
+
+def conversation(turns: int) -> list[Message]:
+    history = []
+    for i in range(turns):
+        history.append(Message(sender="user", content=f"How much did I spend on travel in week {i}?"))
+        history.append(Message(sender="agent", content=f"In week {i} you spent 120 pounds on travel, mostly on trains."))
+    return history
+
+
+def test_token_estimate_counts_words_punctuation_and_long_words():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hi, Bob!") == 4
+    assert estimate_tokens("internationalization") == 5
+
+
+def test_context_stays_bounded_as_the_conversation_grows():
+    context = ConversationContext(max_tokens=200, summary_max_tokens=50)
+
+    sizes = []
+    for turns in (5, 50, 500):
+        messages = context.messages(conversation(turns))
+        sizes.append(len(messages))
+        assert isinstance(messages[0], ModelRequest) and isinstance(messages[0].parts[0], UserPromptPart), "The window should start with a user message"
+        assert messages[-1].parts[0].content.startswith(f"In week {turns - 1} ")
+
+    assert sizes[1] == sizes[2] < 2 * 50, "The window should not grow with the conversation"
+
+
+@pytest.mark.asyncio
+async def test_older_messages_are_summarized_in_the_background():
+    release = asyncio.Event()
+    folded = []
+
+    async def summarizer(summary, messages, max_tokens):
+        await release.wait()
+        folded.extend(messages)
+        return f"{summary} {len(messages)} messages about travel".strip()
+
+    context = ConversationContext(max_tokens=200, summary_max_tokens=50, summarizer=summarizer)
+    history = conversation(20)
+
+    context.update(history)
+    assert not any(isinstance(p, SystemPromptPart) for p in context.messages(history)[0].parts), "The summary should not be awaited"
+
+    release.set()
+    await context._summarizing
+
+    start = context.window_start(history)
+    assert folded == history[:start] and context.summarized == start
+    summary = context.messages(history)[0].parts[0]
+    assert isinstance(summary, SystemPromptPart) and summary.content == f"Summary of the earlier conversation: {start} messages about travel"
+
+    history += conversation(3)
+    context.update(history)
+    await context._summarizing
+    assert folded == history[: context.window_start(history)], "Only the newly dropped messages should be folded in"
+
+
+@pytest.mark.asyncio
+async def test_failed_summary_keeps_the_previous_one():
+    async def summarizer(summary, messages, max_tokens):
+        raise RuntimeError("rate limited")
+
+    context = ConversationContext(max_tokens=200, summary_max_tokens=50, summarizer=summarizer)
+    context.summary = "Earlier summary"
+    context.update(conversation(20))
+    await context._summarizing
+
+    assert context.summary == "Earlier summary" and context.summarized == 0
+
+
+@pytest.mark.asyncio
+async def test_session_summarizes_after_the_agent_answers(mocker):
+    context = ConversationContext(max_tokens=200, summary_max_tokens=50)
+    update = mocker.spy(context, "update")
+    session = ConversationSession(conversation_id=MagicMock(), writer=MagicMock(flush=AsyncMock()), context=context)
+
+    session.record(sender="user", content="Hi")
+    assert update.call_count == 0
+    session.record(sender="agent", content="Hello!")
+    assert update.call_count == 1
+    assert [m.parts[0].content for m in session.agent_messages()] == ["Hi", "Hello!"]
+    await session.close()
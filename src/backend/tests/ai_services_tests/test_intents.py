@@ -0,0 +1,90 @@
+import asyncio
+from typing import AsyncIterator
+from unittest.mock import AsyncMock, MagicMock, Mock
+
+import pytest
+
+from ai_services.intents import CannedResponse, IntentRouter
+from api.pipeline import ConversationSession, TurnTimer
+from nlp_processor.text_to_speech import SynthesisLimiter, TextToSpeech
+from nlp_processor.tts_service import TTSService
+
+
+class FakeSpeechSynthesis:
+    def __init__(self) -> None:
+        self.texts: list[str] = []
+
+    async def synthesize(self, text: str, model_name, voice, response_format, speed, chunk_size) -> AsyncIterator[bytes]:
+        self.texts.append(text)
+        for word in text.split():
+            yield word.encode()
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest.mark.parametrize(
+    "utterance, intent",
+    [
+        ("Hello!", "greeting"),
+        ("Hi there.", "greeting"),
+        ("Good morning", "greeting"),
+        ("Thank you very much!", "thanks"),
+        ("Okay, thanks a lot.", "thanks"),
+        ("Hi, thanks!", "thanks"),
+        ("Bye.", "goodbye"),
+        ("Thanks, bye!", "goodbye"),
+        ("See you later", "goodbye"),
+        ("Hi, how much did I spend last month?", None),
+        ("Thank you, and what about this week?", None),
+        ("Okay.", None),
+        ("", None),
+        ("Hello hello hello hello hello hello hello", None),
+    ],
+)
+def test_only_trivial_utterances_are_routed(utterance, intent):
+    router = IntentRouter(max_words=6)
+
+    response = router.match(utterance)
+
+    assert (response and response.intent) == intent
+
+
+@pytest.mark.asyncio
+async def test_responses_are_rendered_once_with_the_tts_service():
+    backend = FakeSpeechSynthesis()
+    limiter = SynthesisLimiter(max_concurrent=1)
+    service = TTSService(
+        backend=backend,
+        handler_factory=lambda: TextToSpeech(client=None, model_name="tts-1", limiter=limiter, backend=backend),
+        limiter=limiter,
+    )
+    router = IntentRouter()
+    assert router.match("Hello").audio is None, "A response should be usable before it is rendered"
+
+    await router.render(service)
+    first = router.match("Hello")
+    second = router.match("Hi")
+
+    assert first.audio == [b"Hello!", b"I", b"am", b"here", b"to", b"help", b"you", b"with", b"your", b"banking."]
+    assert second.audio is first.audio
+    assert len(backend.texts) == len(router.intents), "Each response should be synthesized once"
+    stats = router.stats()
+    assert stats["checked"] == 3 and stats["routed_greeting"] == 3 and stats["rendered"] == 3
+
+
+@pytest.mark.asyncio
+async def test_a_canned_reply_is_recorded_once_its_audio_is_sent():
+    from server import reply
+
+    response = CannedResponse(intent="greeting", text="Hello!", audio=[b"Hel", b"lo!"])
+    interrupted = ConversationSession(conversation_id="a", writer=MagicMock())
+    websocket = Mock(send_bytes=AsyncMock(side_effect=[None, asyncio.CancelledError()]))
+    with pytest.raises(asyncio.CancelledError):
+        await reply(websocket, interrupted, "Hi", response, Mock(), TurnTimer(), MagicMock())
+
+    delivered = ConversationSession(conversation_id="b", writer=MagicMock())
+    await reply(Mock(send_bytes=AsyncMock()), delivered, "Hi", response, Mock(), TurnTimer(), MagicMock())
+
+    assert [(m.sender, m.content) for m in interrupted.history] == [("user", "Hi")], "An interrupted reply should not be recorded"
+    assert [(m.sender, m.content) for m in delivered.history] == [("user", "Hi"), ("agent", "Hello!")]
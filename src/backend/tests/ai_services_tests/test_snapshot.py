@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+import pytest_asyncio
+from pydantic_ai import Tool
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from ai_services.agent import Dependencies, create_groq_agent
+from ai_services.tools import (
+    fetch_customer_snapshot,
+    get_recent_transactions,
+    prefetch_customer_snapshot,
+)
+from customer_transaction_db.analytics import TransactionAnalytics
+from customer_transaction_db.connection import SQLiteConnectionPool
+from customer_transaction_db.migrations import migrate_transactions_db
+
+TRANSACTIONS = [
+    ("14-10-2023", "Zara", "Clothing", 300.0),
+    ("10-10-2023", "Emirates", "Travel", 5000.0),
+    ("09-10-2023", "Starbucks", "Restaurant", 10.0),
+    ("20-09-2023", "Sephora", "Cosmetic", 25000.0),
+    ("01-08-2023", "Starbucks", "Restaurant", 12.0),
+]
+
+
+@pytest_asyncio.fixture
+async def pool(tmp_path):
+    path = tmp_path / "transactions.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE Ivanov_Transactions (Date TEXT, Merchant_Name TEXT, Category TEXT, Transaction_Amount REAL)")
+        db.executemany("INSERT INTO Ivanov_Transactions VALUES (?, ?, ?, ?)", TRANSACTIONS)
+    await migrate_transactions_db(str(path))
+    pool = SQLiteConnectionPool(str(path), size=1)
+    await pool.open()
+    yield pool
+    await pool.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("analytics", [None, TransactionAnalytics()], ids=["sql", "analytics"])
+async def test_snapshot_answers_the_common_questions(pool, analytics, mocker):
+    deps = Dependencies(settings=mocker.Mock(), transactions_db=pool, analytics=analytics, customer_id="Ivanov")
+
+    snapshot = await fetch_customer_snapshot(deps, last_n=2)
+
+    assert [t["Merchant_Name"] for t in snapshot.recent] == ["Zara", "Emirates"]
+    assert snapshot.this_week == {"Clothing": 300.0, "Travel": 5000.0, "Restaurant": 10.0}
+    assert snapshot.last_month["Cosmetic"] == {"spent": 25000.0, "budget": 20000, "status": "over budget"}
+    assert "Restaurant" in snapshot.last_month and len(snapshot.last_month) == 4
+    instructions = snapshot.instructions()
+    assert "Zara" in instructions and "over budget" in instructions
+
+
+def answer_from_snapshot_or_tool(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+    """ Answers from the snapshot when given one, or else calls a tool first. """
+    if info.instructions and "Customer snapshot" in info.instructions:
+        return ModelResponse(parts=[TextPart("You last spent 300 at Zara.")])
+    if not any(isinstance(part, ToolReturnPart) for message in messages for part in message.parts):
+        return ModelResponse(parts=[ToolCallPart("get_recent_transactions", {"last_n": "1"})])
+    return ModelResponse(parts=[TextPart("You last spent 300 at Zara.")])
+
+
+@pytest.mark.asyncio
+async def test_prefetched_snapshot_saves_the_tool_call_round_trip(pool, mocker):
+    agent = create_groq_agent(
+        groq_model=FunctionModel(answer_from_snapshot_or_tool),
+        tools=[Tool(get_recent_transactions, takes_ctx=True)],
+        system_prompt="You are a bank assistant.",
+    )
+    deps = Dependencies(settings=mocker.Mock(), transactions_db=pool, customer_id="Ivanov")
+
+    without_snapshot = await agent.run("What did I last buy?", deps=deps)
+    await prefetch_customer_snapshot(deps)
+    with_snapshot = await agent.run("What did I last buy?", deps=deps, message_history=without_snapshot.all_messages())
+
+    assert without_snapshot.usage.requests == 2
+    assert with_snapshot.usage.requests == 1, "The snapshot should be sent even with a message history"
+
+
+@pytest.mark.asyncio
+async def test_failed_prefetch_leaves_the_agent_to_the_tools(mocker):
+    pool = mocker.Mock()
+    pool.connection.side_effect = RuntimeError("database is locked")
+    deps = Dependencies(settings=mocker.Mock(), transactions_db=pool)
+
+    await prefetch_customer_snapshot(deps)
+
+    assert deps.snapshot is None
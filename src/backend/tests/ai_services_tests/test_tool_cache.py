@@ -0,0 +1,111 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from pydantic_ai import Tool
+
+from ai_services.agent import Dependencies
+from ai_services.tool_cache import (
+    ToolResultCache,
+    cached_tool,
+    normalize_arguments,
+)
+from ai_services.tools import (
+    detect_unusual_spending,
+    get_recent_transactions,
+    period_start,
+    summarize_spending,
+)
+from customer_transaction_db.connection import SQLiteConnectionPool
+from customer_transaction_db.migrations import migrate_transactions_db
+
+TRANSACTIONS = [
+    ("14-10-2023", "Zara", "Clothing", 300.0),
+    ("10-10-2023", "Emirates", "Travel", 5000.0),
+    ("09-10-2023", "Starbucks", "Restaurant", 10.0),
+]
+
+
+@pytest_asyncio.fixture
+async def ctx(tmp_path, mocker):
+    path = tmp_path / "transactions.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE Ivanov_Transactions (Date TEXT, Merchant_Name TEXT, Category TEXT, Transaction_Amount REAL)")
+        db.executemany("INSERT INTO Ivanov_Transactions VALUES (?, ?, ?, ?)", TRANSACTIONS)
+    await migrate_transactions_db(str(path))
+    pool = SQLiteConnectionPool(str(path), size=1)
+    await pool.open()
+    yield SimpleNamespace(deps=Dependencies(settings=mocker.Mock(), transactions_db=pool, customer_id="Ivanov"))
+    await pool.close()
+
+
+def test_equivalent_arguments_are_normalized():
+    assert normalize_arguments(
+        {"start_date": "01/10/2023", "end_date": "14-10-2023", "category": "Travel", "last_n": "05", "time_period": "This  Week", "specific_month": "August 2023"}
+    ) == {"start_date": "2023-10-01", "end_date": "2023-10-14", "category": "Travel", "last_n": "5", "time_period": "this week", "specific_month": "2023-08"}
+    assert normalize_arguments({"category": " travel", "start_date": "yesterday"}) == {"category": " travel", "start_date": "yesterday"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cached", [False, True], ids=["uncached", "cached"])
+async def test_tools_accept_the_equivalent_arguments(ctx, cached):
+    cache = ToolResultCache()
+    recent, spending, unusual = (
+        cached_tool(tool, cache) if cached else tool
+        for tool in (get_recent_transactions, summarize_spending, detect_unusual_spending)
+    )
+
+    assert await recent(ctx, start_date="10/10/2023", end_date="10.10.2023") == await recent(ctx, start_date="2023-10-10", end_date="2023-10-10")
+    assert await recent(ctx, start_date="10/10/2023", end_date="10.10.2023") != []
+    assert await spending(ctx, "Last  Month", True) == await spending(ctx, "last month", True)
+    assert period_start("Last  Month") == period_start("last month") != period_start("this week")
+    assert await unusual(ctx, specific_month="October 2023", threshold=100) == await unusual(ctx, specific_month="2023-10", threshold=100) != []
+    assert await recent(ctx, category="travel") == [], "Categories should be matched as spelled"
+
+
+@pytest.mark.asyncio
+async def test_equivalent_calls_are_served_from_the_cache(ctx):
+    cache = ToolResultCache()
+    recent = cached_tool(get_recent_transactions, cache)
+    spending = cached_tool(summarize_spending, cache)
+
+    first = await recent(ctx, category="Travel", end_date="14/10/2023")
+    second = await recent(ctx, category="Travel", last_n=5)
+    await spending(ctx, "this week")
+    await spending(ctx, time_period="This week")
+
+    assert first == second == [{"Transaction_Amount": 5000.0, "Date": "10-10-2023", "Merchant_Name": "Emirates", "Category": "Travel"}]
+    stats = cache.stats()
+    assert stats["get_recent_transactions_hits"] == 1 and stats["get_recent_transactions_hit_rate"] == 0.5
+    assert stats["summarize_spending_hits"] == 1 and stats["summarize_spending_seconds_saved"] > 0
+
+    ctx.deps.customer_id = "Petrov"
+    await recent(ctx, category="Travel")
+    assert cache.stats()["get_recent_transactions_misses"] == 2, "Results should not be shared between customers"
+
+
+@pytest.mark.asyncio
+async def test_cache_is_invalidated_by_new_transactions_and_expires(ctx, mocker):
+    cache = ToolResultCache(max_entries=1, ttl=60)
+    recent = cached_tool(get_recent_transactions, cache)
+    assert len(await recent(ctx, last_n="10")) == 3
+
+    with sqlite3.connect(ctx.deps.transactions_db.db_path) as db:
+        db.execute("INSERT INTO Ivanov_Transactions (Date, Merchant_Name, Category, Transaction_Amount) VALUES ('14-10-2023', 'Tesco', 'Market', 20.0)")
+
+    assert len(await recent(ctx, last_n="10")) == 4, "New transactions should invalidate cached results"
+    assert cache.stats()["invalidations"] == 1
+
+    mocker.patch("ai_services.tool_cache.monotonic", return_value=1e12)
+    await recent(ctx, last_n="10")
+    assert cache.stats()["get_recent_transactions_hits"] == 0, "Expired results should not be reused"
+
+
+def test_cached_tool_keeps_the_tool_schema():
+    cache = ToolResultCache()
+    plain = Tool(get_recent_transactions, takes_ctx=True).tool_def
+    cached = Tool(cached_tool(get_recent_transactions, cache), takes_ctx=True).tool_def
+
+    assert cached.name == plain.name and cached.description == plain.description
+    assert cached.parameters_json_schema == plain.parameters_json_schema
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from api.metrics import Histogram, Metrics, timed_tool
+from api.pipeline import StageTiming, TurnTimer, current_turn
+
+
+def test_histogram_renders_cumulative_buckets_per_label():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), label="stage")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "stt")
+
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == [
+        'latency_seconds_bucket{stage="stt",le="0.1"} 2',
+        'latency_seconds_bucket{stage="stt",le="1.0"} 3',
+        'latency_seconds_bucket{stage="stt",le="+Inf"} 4',
+        'latency_seconds_sum{stage="stt"} 3.65',
+        'latency_seconds_count{stage="stt"} 4',
+    ]
+
+
+def test_turn_is_split_into_stages_tools_and_marks():
+    timer = TurnTimer()
+    timer.stages = [
+        StageTiming(name="stt", start=0.0, end=0.3),
+        StageTiming(name="tool:summarize_spending", start=0.5, end=0.52),
+        StageTiming(name="tool:summarize_spending", start=0.6, end=0.61),
+    ]
+    timer.marks = {"first_token": 0.8}
+    timer.add("websocket_send", 0.01)
+    timer.add("websocket_send", 0.02)
+    metrics = Metrics()
+
+    metrics.observe_turn(timer)
+    metrics.llm_requests.observe(2)
+    exposition = metrics.render({"history_writer": {"pending": 3}})
+
+    assert 'voice2voice_turn_stage_seconds_count{stage="stt"} 1' in exposition
+    assert 'voice2voice_tool_call_seconds_count{tool="summarize_spending"} 2' in exposition
+    assert 'voice2voice_turn_total_seconds_count{total="websocket_send"} 1' in exposition, "Totals should be observed once per turn"
+    assert 'stage="websocket_send"' not in exposition, "Totals are not stages of the turn"
+    assert 'voice2voice_turn_mark_seconds_bucket{mark="first_token",le="1.0"} 1' in exposition
+    assert 'voice2voice_turn_llm_requests_bucket{le="1"} 0' in exposition
+    assert 'voice2voice_turn_llm_requests_bucket{le="2"} 1' in exposition
+    assert "voice2voice_history_writer_pending 3.0" in exposition
+    assert timer.as_dict() == {
+        "stages": {"stt": 300.0, "tool:summarize_spending": 30.0},
+        "marks": {"first_token": 800.0},
+        "totals": {"websocket_send": 30.0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_are_timed_within_the_current_turn():
+    async def get_recent_transactions(ctx, limit: int = 5) -> list[int]:
+        await asyncio.sleep(0.01)
+        return list(range(limit))
+
+    tool = timed_tool(get_recent_transactions)
+    assert tool.__name__ == "get_recent_transactions"
+    assert await tool(None, limit=2) == [0, 1], "Tools should run without a turn"
+
+    async def turn() -> TurnTimer:
+        timer = TurnTimer()
+        current_turn.set(timer)
+        await tool(None, limit=3)
+        return timer
+
+    timer = await asyncio.create_task(turn())
+    assert [s.name for s in timer.stages] == ["tool:get_recent_transactions"]
+    assert timer.stages[0].duration >= 0.01
+    assert current_turn.get() is None, "The timer should stay local to the turn"
@@ -0,0 +1,89 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from api.pipeline import (
+    ConversationSession,
+    TurnRunner,
+    TurnTimer,
+    spoken_prefix,
+)
+
+
+def test_turn_timer_records_stages_and_marks():
+    timer = TurnTimer()
+    with timer.stage("stt"):
+        timer.mark("first_token")
+        timer.mark("first_token")
+
+    assert [s.name for s in timer.stages] == ["stt"], "The stage should be recorded once"
+    assert timer.stages[0].duration >= 0, "Stage duration should not be negative"
+    assert list(timer.marks) == ["first_token"], "Only the first mark with a given name should be kept"
+    assert "stt=" in timer.report() and "first_token@" in timer.report()
+
+
+@pytest.mark.asyncio
+async def test_session_serves_history_from_memory_and_queues_messages_in_order():
+    writer = MagicMock(flush=AsyncMock())
+    session = ConversationSession(conversation_id="conversation", writer=writer)
+
+    session.record(sender="user", content="Hello")
+    session.record(sender="agent", content="Hi!")
+
+    assert [(m.sender, m.content) for m in session.history] == [
+        ("user", "Hello"),
+        ("agent", "Hi!"),
+    ], "The history should be updated without waiting for the database"
+    assert [c.args for c in writer.submit.call_args_list] == [
+        ("conversation", session.history[0]),
+        ("conversation", session.history[1]),
+    ], "Messages should be queued in the order they were recorded"
+
+    await session.close()
+
+    writer.flush.assert_awaited_once()
+
+
+def test_spoken_prefix_cuts_after_the_last_spoken_segment():
+    generation = "Your balance is 120 pounds.  Anything else? I can also"
+
+    assert spoken_prefix(generation, ["Your balance is 120 pounds."]) == "Your balance is 120 pounds."
+    assert spoken_prefix(generation, ["Your balance is 120 pounds.", "Anything else?"]) == "Your balance is 120 pounds.  Anything else?"
+    assert spoken_prefix(generation, []) == ""
+
+
+@pytest.mark.asyncio
+async def test_turn_runner_interrupts_the_turn_in_progress():
+    cancelled = asyncio.Event()
+
+    async def answer():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    turns = TurnRunner()
+    assert not await turns.interrupt(), "There is nothing to interrupt before a turn starts"
+
+    turns.start(answer())
+    await asyncio.sleep(0)
+    assert turns.busy
+
+    assert await turns.interrupt()
+    assert cancelled.is_set() and not turns.busy, "The turn should have wound down when interrupt returns"
+    assert turns.interruptions == 1
+
+
+@pytest.mark.asyncio
+async def test_turn_runner_survives_a_failed_turn():
+    async def fail():
+        raise RuntimeError("LLM unavailable")
+
+    turns = TurnRunner()
+    turns.start(fail())
+    await asyncio.sleep(0.01)
+
+    assert not turns.busy and not await turns.interrupt()
+    await turns.close()
@@ -30,3 +30,41 @@
 #     assert config.GROQ_API_KEY == "test_groq_key", f"GROQ API key should be {test_groq_key}"
 #     assert config.OPENAI_API_KEY == "test_openai_key", f"OpenAI API key should be {test_openai_key}"
 
+
+
+import pytest
+from pydantic import ValidationError
+
+from config.settings import (
+    DatabaseConfig,
+    IntentRouterConfig,
+    ToolCacheConfig,
+    TransactionsDBConfig,
+    TTSConfig,
+)
+
+
+def test_tts_connection_pool_must_cover_the_synthesis_cap():
+    assert TTSConfig(max_concurrent_syntheses=8, max_connections=8).max_connections == 8
+    assert TTSConfig(max_concurrent_syntheses=8).max_connections == 8, "The pool should default to the synthesis cap"
+
+    with pytest.raises(ValidationError):
+        TTSConfig(max_concurrent_syntheses=8, max_connections=4)
+
+
+def test_transactions_db_path_is_not_read_from_path(monkeypatch):
+    monkeypatch.setenv("PATH", "/usr/bin:/bin")
+    assert TransactionsDBConfig().db_path == ""
+
+
+def test_settings_only_read_their_prefixed_environment_variables(monkeypatch):
+    for name, value in {"ENABLED": "false", "MODEL": "bare", "ENGINE": "local", "USER": "bare", "POOL_SIZE": "99"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("TOOL_CACHE_ENABLED", "false")
+    monkeypatch.setenv("TTS_MODEL", "tts-1-hd")
+    monkeypatch.setenv("DB_USER", "history")
+
+    assert ToolCacheConfig().enabled is False and IntentRouterConfig().enabled is True
+    assert TTSConfig().model == "tts-1-hd" and TTSConfig().engine == "openai"
+    assert TransactionsDBConfig().pool_size == 4
+    assert DatabaseConfig().user == "history"
@@ -0,0 +1,132 @@
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+
+import pytest
+
+from convo_history_db.migrations import (
+    MIGRATIONS,
+    _create_partition,
+    _month,
+    maintain_partitions,
+    migrate_history_db,
+)
+
+
+class FakeCursor:
+    def __init__(self, rows: list[tuple]) -> None:
+        self.rows = rows
+
+    async def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    async def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    """Connection recording the statements of each transaction, answering the catalog queries."""
+
+    def __init__(self, version: int = 0, partitioned: bool = False, partitions: tuple[str, ...] = (), default_months: tuple[str, ...] = ()) -> None:
+        self.version = version
+        self.partitioned = partitioned
+        self.partitions = list(partitions)
+        self.default_months = default_months
+        self.transactions: list[list[str]] = []
+
+    @asynccontextmanager
+    async def connection(self):
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.transactions.append([])
+        yield
+
+    async def execute(self, query: str, params: tuple = ()) -> FakeCursor:
+        query = " ".join(query.split())
+        self.transactions[-1].append(query)
+        if query.startswith("SELECT max(version)"):
+            return FakeCursor([(self.version or None,)])
+        if query.startswith("INSERT INTO schema_migrations"):
+            self.version = params[0]
+        if "pg_partitioned_table" in query:
+            return FakeCursor([(1,)] if self.partitioned else [])
+        if query.startswith("SELECT min(timestamp)"):
+            return FakeCursor([(datetime(2024, 11, 3), datetime(2025, 1, 20))])
+        if query.startswith("SELECT 1 FROM messages_default"):
+            return FakeCursor([(1,)] if params[0] in self.default_months else [])
+        if "pg_inherits" in query:
+            return FakeCursor([(name,) for name in self.partitions])
+        return FakeCursor([])
+
+
+def test_month_arithmetic_wraps_years():
+    assert _month(date(2024, 12, 31), 1) == date(2025, 1, 1)
+    assert _month(date(2024, 1, 15), -13) == date(2022, 12, 1)
+    assert _create_partition(date(2024, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS messages_y2024m12 PARTITION OF messages "
+        "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')"
+    )
+
+
+@pytest.mark.asyncio
+async def test_migrations_run_once_each_in_their_own_locked_transaction():
+    conn = FakeConnection()
+
+    assert await migrate_history_db(conn) == len(MIGRATIONS)
+    assert len(conn.transactions) == len(MIGRATIONS) + 1
+    assert all(t[0].startswith("SELECT pg_advisory_xact_lock") for t in conn.transactions)
+    assert any("ADD COLUMN IF NOT EXISTS seq" in s for s in conn.transactions[1])
+    assert conn.transactions[1][-1] == "INSERT INTO schema_migrations (version) VALUES (%s)"
+
+    conn.transactions.clear()
+    assert await migrate_history_db(conn) == len(MIGRATIONS)
+    assert len(conn.transactions) == 1, "An up to date database should not be migrated again"
+
+
+@pytest.mark.asyncio
+async def test_partitioning_covers_the_months_of_the_stored_messages():
+    conn = FakeConnection(version=len(MIGRATIONS))
+
+    await migrate_history_db(conn, partitioned=True)
+    statements = conn.transactions[-1]
+    assert "PARTITION BY RANGE (timestamp)" in " ".join(statements)
+    created = [s.split()[5] for s in statements if s.startswith("CREATE TABLE IF NOT EXISTS messages_y")]
+    assert created == ["messages_y2024m11", "messages_y2024m12", "messages_y2025m01", "messages_y2025m02"]
+    assert statements.index("DROP TABLE messages_unpartitioned") > max(
+        i for i, s in enumerate(statements) if s.startswith("INSERT INTO messages")
+    ), "The old table should only be dropped once copied"
+
+    conn.partitioned = True
+    conn.transactions.clear()
+    await migrate_history_db(conn, partitioned=True)
+    assert not any("RENAME" in s for s in conn.transactions[-1]), "A partitioned table should not be rebuilt"
+
+
+@pytest.mark.asyncio
+async def test_maintenance_drops_only_the_partitions_past_retention():
+    today = date.today()
+    partitions = tuple(f"messages_y{m.year}m{m.month:02d}" for m in (_month(today, -3), _month(today, -2), _month(today, -1), today))
+    conn = FakeConnection(version=len(MIGRATIONS), partitioned=True, partitions=partitions)
+
+    assert await maintain_partitions(conn, months_ahead=1, retention_months=2) == [partitions[0]]
+    assert [sum(s.startswith("CREATE TABLE IF NOT EXISTS") for s in t) for t in conn.transactions] == [0, 1, 1, 0], "Each month should be created in its own transaction"
+    assert await maintain_partitions(FakeConnection(), retention_months=1) == [], "An unpartitioned table should be left alone"
+
+
+@pytest.mark.asyncio
+async def test_maintenance_moves_the_messages_of_a_missing_month_out_of_the_default_partition():
+    this_month = _month(date.today())
+    conn = FakeConnection(version=len(MIGRATIONS), partitioned=True, default_months=(this_month.isoformat(),))
+
+    await maintain_partitions(conn, months_ahead=1)
+
+    statements = [s.split(" WHERE ")[0] for s in conn.transactions[1][2:]]
+    assert statements == [
+        "ALTER TABLE messages DETACH PARTITION messages_default",
+        _create_partition(this_month),
+        "INSERT INTO messages (id, conversation_id, sender, timestamp, content, seq) SELECT id, conversation_id, sender, timestamp, content, seq FROM messages_default",
+        "DELETE FROM messages_default",
+        "ALTER TABLE messages ATTACH PARTITION messages_default DEFAULT",
+    ]
+    assert conn.transactions[2][2:] == [_create_partition(_month(this_month, 1))], "A month without stray messages should just be created"
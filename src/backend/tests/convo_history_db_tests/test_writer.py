@@ -0,0 +1,127 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timezone
+
+import pytest
+
+from convo_history_db.writer import HistoryWriter, Message
+
+
+class FakePool:
+    """Connection pool recording the batches inserted, failing the first `failures`."""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0) -> None:
+        self.batches: list[list[tuple]] = []
+        self.failures = failures
+        self.delay = delay
+
+    @asynccontextmanager
+    async def connection(self):
+        yield self
+
+    @asynccontextmanager
+    async def cursor(self):
+        yield self
+
+    async def executemany(self, query, rows):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("db down")
+        self.batches.append(list(rows))
+
+
+@pytest.mark.asyncio
+async def test_messages_of_all_sessions_are_batched_in_order():
+    pool = FakePool()
+    writer = HistoryWriter(pool, batch_size=3, linger=0.01)
+    writer.start()
+
+    for i in range(5):
+        writer.submit("a", Message(sender="user", content=f"a{i}"))
+        writer.submit("b", Message(sender="agent", content=f"b{i}"))
+    assert pool.batches == [], "Messages should be stored in the background"
+    await writer.flush()
+
+    assert [len(batch) for batch in pool.batches] == [3, 3, 3, 1]
+    stored = [row[3] for batch in pool.batches for row in batch]
+    assert stored == [f"{c}{i}" for i in range(5) for c in "ab"], "Messages should be stored in the order they were submitted"
+    assert all(row[2].tzinfo is timezone.utc for batch in pool.batches for row in batch)
+    stats = writer.stats()
+    assert stats.pop("write_seconds_total") > 0
+    assert stats == {"pending": 0, "batches": 4, "messages": 10, "failures": 0, "dropped": 0}
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_batches_are_retried_and_the_backlog_is_bounded():
+    pool = FakePool(failures=2)
+    writer = HistoryWriter(pool, batch_size=10, linger=0, max_pending=3, retry_delay=0.01)
+    writer.start()
+
+    for i in range(5):
+        writer.submit("a", Message(sender="user", content=str(i)))
+    await writer.flush()
+
+    assert [row[3] for batch in pool.batches for row in batch] == ["2", "3", "4"], "The oldest messages should be dropped beyond the bound"
+    assert writer.stats()["failures"] == 2 and writer.stats()["dropped"] == 2
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_only_waits_for_the_messages_submitted_before_it():
+    pool = FakePool(delay=0.05)
+    writer = HistoryWriter(pool, batch_size=1, linger=0)
+    writer.start()
+
+    writer.submit("a", Message(sender="user", content="first"))
+    flush = asyncio.create_task(writer.flush())
+    await asyncio.sleep(0)
+    writer.submit("b", Message(sender="user", content="second"))
+    await flush
+
+    assert [batch[0][3] for batch in pool.batches] == ["first"]
+    await writer.close()
+    assert [batch[0][3] for batch in pool.batches] == ["first", "second"], "Closing should store the queued messages"
+
+
+@pytest.mark.asyncio
+async def test_a_failing_batch_is_dropped_after_the_last_attempt():
+    pool = FakePool(failures=3)
+    writer = HistoryWriter(pool, batch_size=2, linger=0, retry_delay=0, max_attempts=3)
+    writer.start()
+
+    for i in range(3):
+        writer.submit("a", Message(sender="user", content=str(i)))
+    await writer.flush()
+
+    assert [row[3] for batch in pool.batches for row in batch] == ["2"], "Later batches should not be blocked by a failing one"
+    assert writer.stats()["failures"] == 3 and writer.stats()["dropped"] == 2
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_wakes_up_when_its_messages_are_dropped():
+    writer = HistoryWriter(FakePool(), linger=10, max_pending=1)
+    writer.start()
+
+    writer.submit("a", Message(sender="user", content="first"))
+    flush = asyncio.create_task(writer.flush())
+    await asyncio.sleep(0)
+    writer.submit("a", Message(sender="user", content="second"))
+
+    await asyncio.wait_for(flush, 0.1)
+    assert writer.stats()["dropped"] == 1
+    await writer.close(timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_flush_gives_up_after_the_timeout():
+    writer = HistoryWriter(FakePool(failures=1_000), linger=0, retry_delay=10, flush_timeout=0.05)
+    writer.start()
+
+    writer.submit("a", Message(sender="user", content="first"))
+    await asyncio.wait_for(writer.flush(), 0.5)
+
+    assert writer.stats()["pending"] == 0 and writer.stats()["failures"] == 1
+    await writer.close(timeout=0)
@@ -0,0 +1,79 @@
+import sqlite3
+
+import aiosqlite
+import pytest
+import pytest_asyncio
+
+from customer_transaction_db.analytics import TransactionAnalytics
+from customer_transaction_db.migrations import migrate_transactions_db
+from customer_transaction_db.queries import (
+    fetch_recent_transactions,
+    fetch_spending_by_category,
+)
+
+# Weekly coffees and groceries, with one flight and a first purchase at a new shop.
+TRANSACTIONS = [
+    *[(f"{day:02d}-08-2023", "Starbucks", "Restaurant", 10.0 + day % 3) for day in range(1, 29, 4)],
+    *[(f"{day:02d}-09-2023", "Starbucks", "Restaurant", 10.0 + day % 3) for day in range(1, 29, 4)],
+    *[(f"{day:02d}-09-2023", "Tesco", "Market", 50.0 + day % 5) for day in range(2, 29, 3)],
+    ("05-10-2023", "Emirates", "Travel", 5000.0),
+    ("08-10-2023", "Starbucks", "Restaurant", 300.0),
+    ("12-10-2023", "Waitrose", "Market", 90.0),
+    ("13-10-2023", "Tesco", "Market", 52.0),
+]
+
+
+@pytest_asyncio.fixture
+async def transactions_db(tmp_path):
+    path = tmp_path / "transactions.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE Ivanov_Transactions (Date TEXT, Merchant_Name TEXT, Category TEXT, Transaction_Amount REAL)")
+        db.executemany("INSERT INTO Ivanov_Transactions VALUES (?, ?, ?, ?)", TRANSACTIONS)
+    await migrate_transactions_db(str(path))
+    async with aiosqlite.connect(path) as db:
+        db.row_factory = aiosqlite.Row
+        yield db
+
+
+@pytest.mark.asyncio
+async def test_columns_answer_like_the_queries(transactions_db):
+    columns = await TransactionAnalytics().columns(transactions_db)
+
+    for start_date, end_date in [(None, None), ("2023-09-14", None), ("2023-08-05", "2023-09-13"), ("2024-01-01", None)]:
+        assert columns.spending_by_category(start_date, end_date) == pytest.approx(
+            await fetch_spending_by_category(transactions_db, start_date, end_date)
+        )
+    assert columns.recent(end_date="2023-10-14", limit=3) == await fetch_recent_transactions(transactions_db, end_date="2023-10-14", limit=3)
+    assert columns.recent(category="Market", merchant="Tesco", start_date="2023-09-20") == await fetch_recent_transactions(
+        transactions_db, category="Market", merchant="Tesco", start_date="2023-09-20"
+    )
+    assert columns.recent(merchant="Unknown") == []
+
+
+@pytest.mark.asyncio
+async def test_unusual_transactions_stand_out_from_their_category(transactions_db):
+    columns = await TransactionAnalytics().columns(transactions_db)
+
+    flagged = {t["Merchant_Name"]: t for t in columns.unusual(start_date="2023-09-14")}
+
+    assert set(flagged) == {"Emirates", "Starbucks", "Waitrose"}, "Usual coffees and groceries should not be flagged"
+    assert "far above the usual amount for the category" in flagged["Starbucks"]["Reasons"]
+    assert "well above recent spending in the category" in flagged["Starbucks"]["Reasons"]
+    assert "first payment to this merchant" in flagged["Waitrose"]["Reasons"]
+    assert flagged["Emirates"]["Reasons"][-1] == "first payment to this merchant", "A first payment in a new category should be compared with all spending"
+    assert flagged["Starbucks"]["Usual_Amount"] == 11.0
+    assert [t["Merchant_Name"] for t in columns.unusual(start_date="2023-09-14", threshold=1000)] == ["Emirates"]
+
+
+@pytest.mark.asyncio
+async def test_columns_are_reloaded_when_the_transactions_change(transactions_db):
+    analytics = TransactionAnalytics()
+    columns = await analytics.columns(transactions_db)
+    assert await analytics.columns(transactions_db) is columns, "Unchanged transactions should not be reloaded"
+
+    await transactions_db.execute("INSERT INTO Ivanov_Transactions (Date, Merchant_Name, Category, Transaction_Amount) VALUES ('14-10-2023', 'Zara', 'Clothing', 80.0)")
+    await transactions_db.commit()
+    reloaded = await analytics.columns(transactions_db)
+
+    assert reloaded is not columns and analytics.stats() == {"transactions": len(TRANSACTIONS) + 1, "loads": 2}
+    assert reloaded.recent(limit=1)[0]["Merchant_Name"] == "Zara"
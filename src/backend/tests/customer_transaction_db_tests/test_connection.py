@@ -1,15 +1,65 @@
-import pytest
+import asyncio
+import sqlite3
+
 import aiosqlite
-from customer_transaction_db.connection import get_customer_sqlite_client
+import pytest
+
+from customer_transaction_db.connection import (
+    SQLiteConnectionPool,
+    open_transactions_db_pool,
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "transactions.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE Ivanov_Transactions (Date TEXT, Transaction_Amount REAL)")
+        db.execute("INSERT INTO Ivanov_Transactions VALUES ('14-10-2023', 10.0)")
+    return str(path)
+
 
 @pytest.mark.asyncio
-async def test_get_customer_sqlite_client():
-    async def get_db_connection():
-        async for db in get_customer_sqlite_client():
-            return db
-    
-    db = await get_db_connection()
-    
-    assert db is not None
-    assert isinstance(db, aiosqlite.Connection)
-    assert db.row_factory == aiosqlite.Row
+async def test_pool_leases_read_only_connections(db_path):
+    pool = SQLiteConnectionPool(db_path, size=2)
+    await pool.open()
+
+    async with pool.connection() as db:
+        assert isinstance(db, aiosqlite.Connection)
+        assert db.row_factory == aiosqlite.Row
+        rows = await db.execute_fetchall("SELECT Transaction_Amount FROM Ivanov_Transactions")
+        assert rows[0]["Transaction_Amount"] == 10.0
+        with pytest.raises(sqlite3.OperationalError):
+            await db.execute("DELETE FROM Ivanov_Transactions")
+
+    await pool.close()
+    assert pool.stats()["connections"] == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_its_connections_and_queues_leases(db_path):
+    pool = SQLiteConnectionPool(db_path, size=2)
+    await pool.open()
+    seen = set()
+
+    async def query():
+        async with pool.connection() as db:
+            seen.add(id(db))
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(query() for _ in range(6)))
+
+    assert len(seen) == 2, "No more than `size` connections should ever be opened"
+    assert pool.stats()["leases"] == 6 and pool.stats()["idle"] == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_missing_database_leaves_the_pool_closed(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / "missing.db"))
+    await open_transactions_db_pool(pool)
+
+    with pytest.raises(RuntimeError):
+        async with pool.connection():
+            pass
+    assert not (tmp_path / "missing.db").exists(), "A read-only pool should never create the database"
@@ -0,0 +1,87 @@
+import sqlite3
+
+import aiosqlite
+import pytest
+import pytest_asyncio
+
+from ai_services.tools import month_range, period_start
+from customer_transaction_db.migrations import (
+    MIGRATIONS,
+    migrate_transactions_db,
+)
+from customer_transaction_db.queries import (
+    fetch_average_amount,
+    fetch_recent_transactions,
+    fetch_spending_by_category,
+    fetch_transactions_above,
+)
+
+TRANSACTIONS = [
+    ("14-10-2023", "Zara", "Clothing", 300.0),
+    ("10-10-2023", "Emirates", "Travel", 5000.0),
+    ("01-10-2023", "Zara", "Clothing", 100.0),
+    ("20-09-2023", "Starbucks", "Restaurant", 10.0),
+    ("15-08-2023", "Emirates", "Travel", 2000.0),
+    ("31-08-2023", "Apple", "Electronics", 900.0),
+]
+
+
+@pytest_asyncio.fixture
+async def transactions_db(tmp_path):
+    path = tmp_path / "transactions.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE Ivanov_Transactions (Date TEXT, Merchant_Name TEXT, Category TEXT, Transaction_Amount REAL)")
+        db.executemany("INSERT INTO Ivanov_Transactions VALUES (?, ?, ?, ?)", TRANSACTIONS)
+    assert await migrate_transactions_db(str(path)) == len(MIGRATIONS)
+    async with aiosqlite.connect(path) as db:
+        db.row_factory = aiosqlite.Row
+        yield db
+
+
+@pytest.mark.asyncio
+async def test_migration_is_idempotent_and_keeps_new_rows_in_sync(transactions_db, tmp_path):
+    assert await migrate_transactions_db(str(tmp_path / "transactions.db")) == len(MIGRATIONS)
+    assert await migrate_transactions_db(str(tmp_path / "missing.db")) == 0
+
+    await transactions_db.execute("INSERT INTO Ivanov_Transactions (Date, Merchant_Name, Category, Transaction_Amount) VALUES ('02-01-2024', 'Zara', 'Clothing', 1.0)")
+    rows = await transactions_db.execute_fetchall("SELECT Date_ISO FROM Ivanov_Transactions WHERE Date = '02-01-2024'")
+
+    assert rows[0][0] == "2024-01-02", "Inserted rows should get their ISO date from the trigger"
+
+
+@pytest.mark.asyncio
+async def test_tool_queries_use_the_date_indexes(transactions_db):
+    plans = {
+        "category": "SELECT * FROM Ivanov_Transactions WHERE Category = ? AND Date_ISO >= ? ORDER BY Date_ISO DESC",
+        "merchant": "SELECT * FROM Ivanov_Transactions WHERE Merchant_Name = ? AND Date_ISO >= ?",
+        "date": "SELECT * FROM Ivanov_Transactions WHERE Date_ISO >= ?",
+    }
+    for name, query in plans.items():
+        plan = " ".join(row[3] for row in await transactions_db.execute_fetchall(f"EXPLAIN QUERY PLAN {query}", ("x", "y")[: query.count("?")]))
+        assert "USING INDEX" in plan, f"The {name} filter should be served by an index: {plan}"
+
+
+@pytest.mark.asyncio
+async def test_recent_transactions_are_filtered_and_ordered(transactions_db):
+    recent = await fetch_recent_transactions(transactions_db, end_date="2023-10-14", limit=2)
+    clothing = await fetch_recent_transactions(transactions_db, category="Clothing", merchant="Zara", start_date="2023-10-02")
+
+    assert [t["Date"] for t in recent] == ["14-10-2023", "10-10-2023"]
+    assert clothing == [{"Transaction_Amount": 300.0, "Date": "14-10-2023", "Merchant_Name": "Zara", "Category": "Clothing"}]
+    assert await fetch_recent_transactions(transactions_db, merchant="x' OR '1'='1") == [], "Values should be bound, not interpolated"
+
+
+@pytest.mark.asyncio
+async def test_spending_and_unusual_transactions(transactions_db):
+    last_month = period_start("last month")
+    august = month_range("2023-08")
+
+    assert last_month == "2023-09-14" and august == ("2023-08-01", "2023-08-31")
+    assert await fetch_spending_by_category(transactions_db, start_date=last_month) == {
+        "Clothing": 400.0,
+        "Travel": 5000.0,
+        "Restaurant": 10.0,
+    }
+    assert await fetch_average_amount(transactions_db, *august) == 1450.0
+    assert [t["Merchant_Name"] for t in await fetch_transactions_above(transactions_db, 1000, *august)] == ["Emirates"]
+    assert await fetch_average_amount(transactions_db, start_date="2030-01-01") == 0.0
@@ -0,0 +1,90 @@
+import sqlite3
+
+import aiosqlite
+import pytest
+import pytest_asyncio
+
+from customer_transaction_db.migrations import migrate_transactions_db
+from customer_transaction_db.queries import (
+    fetch_average_amount,
+    fetch_spending_by_category,
+)
+from customer_transaction_db.rollups import (
+    fetch_rollup_average,
+    fetch_rollup_spending,
+    split_window,
+)
+
+TRANSACTIONS = [
+    ("14-10-2023", "Zara", "Clothing", 300.0),
+    ("10-10-2023", "Emirates", "Travel", 5000.0),
+    ("01-10-2023", "Zara", "Clothing", 100.0),
+    ("30-09-2023", "Starbucks", "Restaurant", 10.0),
+    ("20-09-2023", "Starbucks", "Restaurant", 12.5),
+    ("15-08-2023", "Emirates", "Travel", 2000.0),
+    ("31-07-2023", "Apple", "Electronics", 900.0),
+]
+
+WINDOWS = [
+    (None, None),
+    ("2023-09-14", None),
+    ("2023-08-01", "2023-09-30"),
+    ("2023-08-15", "2023-10-01"),
+    ("2023-09-20", "2023-09-20"),
+    (None, "2023-08-31"),
+    ("2024-01-01", None),
+]
+
+
+@pytest_asyncio.fixture
+async def transactions_db(tmp_path):
+    path = tmp_path / "transactions.db"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE Ivanov_Transactions (Date TEXT, Merchant_Name TEXT, Category TEXT, Transaction_Amount REAL)")
+        db.executemany("INSERT INTO Ivanov_Transactions VALUES (?, ?, ?, ?)", TRANSACTIONS)
+    await migrate_transactions_db(str(path))
+    async with aiosqlite.connect(path) as db:
+        yield db
+
+
+def test_split_window_uses_whole_months_where_possible():
+    assert split_window("2023-08-15", "2023-10-01") == [
+        ("daily", "2023-08-15", "2023-08-31"),
+        ("monthly", "2023-09", "2023-09"),
+        ("daily", "2023-10-01", "2023-10-01"),
+    ]
+    assert split_window("2023-08-01", "2023-09-30") == [("monthly", "2023-08", "2023-09")]
+    assert split_window("2023-09-14", "2023-10-13") == [("daily", "2023-09-14", "2023-10-13")]
+    assert split_window(None, "2023-07-31") == [("monthly", "0001-01", "2023-07")]
+    assert split_window("2023-10-02", "2023-10-01") == []
+
+
+async def assert_consistent(db: aiosqlite.Connection) -> None:
+    for start_date, end_date in WINDOWS:
+        assert await fetch_rollup_spending(db, start_date, end_date) == pytest.approx(
+            await fetch_spending_by_category(db, start_date, end_date)
+        ), f"Sums per category differ for {start_date}..{end_date}"
+        assert await fetch_rollup_average(db, start_date, end_date) == pytest.approx(
+            await fetch_average_amount(db, start_date, end_date)
+        ), f"Averages differ for {start_date}..{end_date}"
+
+
+@pytest.mark.asyncio
+async def test_rollups_match_raw_scans(transactions_db):
+    await assert_consistent(transactions_db)
+
+    assert await fetch_rollup_spending(transactions_db, "2023-09-01", "2023-10-31", key="merchant") == {
+        "Zara": 400.0,
+        "Emirates": 5000.0,
+        "Starbucks": 22.5,
+    }
+
+
+@pytest.mark.asyncio
+async def test_rollups_follow_appended_changed_and_deleted_transactions(transactions_db):
+    await transactions_db.execute("INSERT INTO Ivanov_Transactions (Date, Merchant_Name, Category, Transaction_Amount) VALUES ('13-10-2023', 'Zara', 'Clothing', 50.0)")
+    await transactions_db.execute("UPDATE Ivanov_Transactions SET Category = 'Travel', Transaction_Amount = 20.0 WHERE Merchant_Name = 'Starbucks' AND Date = '30-09-2023'")
+    await transactions_db.execute("DELETE FROM Ivanov_Transactions WHERE Merchant_Name = 'Apple'")
+
+    await assert_consistent(transactions_db)
+    assert "Electronics" not in await fetch_rollup_spending(transactions_db), "Emptied rollup rows should be removed"
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from nlp_processor.audio import (
+    decode_audio,
+    encode_audio,
+    prepare_audio,
+    preprocess_audio,
+)
+from nlp_processor.vad import speech_bounds
+
+SAMPLE_RATE = 48000
+
+
+def clip(*segments: tuple[str, float], sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """ Synthetic clip of ("speech" | "silence", seconds) segments, as 16-bit PCM. """
+    rng = np.random.default_rng(0)
+    parts = []
+    for kind, seconds in segments:
+        n = int(sample_rate * seconds)
+        if kind == "speech":
+            t = np.arange(n) / sample_rate
+            parts.append(0.3 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t)))
+        else:
+            parts.append(0.0005 * rng.standard_normal(n))
+    return (np.concatenate(parts) * 32767).astype(np.int16)
+
+
+def webm(pcm: np.ndarray) -> bytes:
+    """ Encodes a clip like the browser's MediaRecorder does. """
+    return encode_audio(pcm, sample_rate=SAMPLE_RATE, container_format="webm", bit_rate=64000)
+
+
+def test_decode_audio_resamples_to_mono_pcm():
+    pcm = decode_audio(webm(clip(("speech", 1.0))), sample_rate=16000)
+
+    assert pcm.dtype == np.int16
+    assert abs(len(pcm) - 16000) < 1600, "One second of audio should decode to about 16000 samples"
+
+
+def test_speech_bounds_trims_silence_and_rejects_silent_clips():
+    pcm = clip(("silence", 1.0), ("speech", 1.0), ("silence", 1.0), sample_rate=16000)
+
+    start, end = speech_bounds(pcm, sample_rate=16000, padding_ms=0)
+
+    assert abs(start - 16000) <= 320 and abs(end - 32000) <= 320
+    assert speech_bounds(clip(("silence", 2.0), sample_rate=16000), sample_rate=16000) is None
+    assert speech_bounds(clip(("speech", 2.0), sample_rate=16000), sample_rate=16000) == (0, 32000), "Speech without pauses should be kept whole"
+
+
+def test_preprocess_audio_uploads_only_the_speech():
+    data = webm(clip(("silence", 2.0), ("speech", 1.5), ("silence", 2.0)))
+
+    prepared = preprocess_audio(data)
+
+    assert prepared is not None and prepared.filename == "audio.ogg"
+    assert prepared.speech_duration < 2.5 < prepared.duration
+    assert len(prepared.data) < len(data), "The upload should be smaller than the received audio"
+
+
+@pytest.mark.asyncio
+async def test_prepare_audio_drops_empty_utterances_and_forwards_undecodable_audio():
+    assert await prepare_audio(webm(clip(("silence", 2.0)))) is None, "Utterances without speech should be dropped"
+
+    prepared = await prepare_audio(b"not audio")
+
+    assert prepared is not None and prepared.data == b"not audio"
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pytest
+
+from nlp_processor.audio import decode_audio, prepare_audio
+from nlp_processor.audio_format import (
+    AAC,
+    FLAC,
+    MP3,
+    MP4,
+    OGG,
+    WAV,
+    WEBM,
+    format_from_mime,
+    resolve_format,
+    sniff_format,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "audio"
+
+CONTAINERS = {
+    "speech.webm": WEBM,
+    "speech.ogg": OGG,
+    "speech.wav": WAV,
+    "speech.flac": FLAC,
+    "speech.mp3": MP3,
+    "speech.m4a": MP4,
+    "speech.aac": AAC,
+}
+
+
+@pytest.mark.parametrize("fixture, expected", CONTAINERS.items())
+def test_sniff_format_identifies_each_container(fixture, expected):
+    assert sniff_format((FIXTURES / fixture).read_bytes()) == expected
+
+
+def test_sniff_format_identifies_bare_mp3_frames_and_rejects_unknown_data():
+    assert sniff_format(b"\xff\xfb\x90\x64" + bytes(16)) == MP3
+    assert sniff_format(b"not audio") is None
+    assert sniff_format(b"") is None
+
+
+def test_format_from_mime_ignores_parameters_and_accepts_aliases():
+    assert format_from_mime("audio/webm;codecs=opus") == WEBM
+    assert format_from_mime("Audio/Ogg; codecs=opus") == OGG
+    assert format_from_mime("audio/x-wav") == WAV
+    assert format_from_mime("audio/x-m4a") == MP4
+    assert format_from_mime("text/plain") is None
+
+
+def test_resolve_format_prefers_magic_bytes_over_the_declared_type():
+    ogg = (FIXTURES / "speech.ogg").read_bytes()
+
+    assert resolve_format(ogg, "audio/webm;codecs=opus") == OGG, "A mislabelled upload should be sniffed"
+    assert resolve_format(b"\x00" * 16, "audio/webm") == WEBM
+    assert resolve_format(b"\x00" * 16) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fixture", ["speech.webm", "speech.ogg", "speech.wav", "speech.flac", "speech.mp3", "speech.m4a"])
+async def test_prepare_audio_forwards_supported_containers_natively(fixture):
+    data = (FIXTURES / fixture).read_bytes()
+
+    prepared = await prepare_audio(data, preprocess=False)
+
+    assert prepared is not None and prepared.data == data, "Supported audio should not be transcoded"
+    assert prepared.filename == f"audio.{CONTAINERS[fixture].extension}"
+
+
+@pytest.mark.asyncio
+async def test_prepare_audio_transcodes_unsupported_containers():
+    data = (FIXTURES / "speech.aac").read_bytes()
+
+    prepared = await prepare_audio(data, preprocess=False)
+
+    assert prepared is not None and prepared.filename == "audio.ogg"
+    assert sniff_format(prepared.data) == OGG
+    assert abs(len(decode_audio(prepared.data)) - 8000) < 1600, "The transcoded audio should keep the whole clip"
+
+
+@pytest.mark.asyncio
+async def test_prepare_audio_names_undecodable_audio_after_the_declared_type():
+    prepared = await prepare_audio(b"\x00" * 64, preprocess=True, declared_mime_type="audio/webm;codecs=opus")
+
+    assert prepared is not None and prepared.filename == "audio.webm"
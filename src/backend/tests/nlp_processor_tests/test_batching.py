@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from nlp_processor.batching import BatchingSpeechToText
+
+
+class FakeEngine:
+    def __init__(self, workers: int = 1, delay: float = 0.0) -> None:
+        self.workers = workers
+        self.delay = delay
+        self.batches: list[list[bytes]] = []
+
+    async def transcribe_batch(self, audios: list[bytes]) -> list[str]:
+        self.batches.append(audios)
+        await asyncio.sleep(self.delay)
+        return [audio.decode().upper() for audio in audios]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_utterances_are_transcribed_as_one_batch():
+    engine = FakeEngine()
+    batcher = BatchingSpeechToText(engine, max_batch_size=8, window=0.05)
+    batcher.start()
+
+    texts = await asyncio.gather(
+        *(batcher.transcribe(f"utterance {i}".encode(), filename="audio.wav") for i in range(5))
+    )
+
+    assert texts == [f"UTTERANCE {i}" for i in range(5)], "Each caller should get its own text"
+    assert len(engine.batches) == 1
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["jobs"] == 5 and stats["batch_size_avg"] == 5
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_and_grow_while_the_workers_are_busy():
+    engine = FakeEngine(workers=1, delay=0.05)
+    batcher = BatchingSpeechToText(engine, max_batch_size=3, window=0.0)
+    batcher.start()
+
+    first = asyncio.create_task(batcher.transcribe(b"a", filename="audio.wav"))
+    await asyncio.sleep(0.01)
+    # queued while the only worker transcribes the first utterance
+    rest = [batcher.transcribe(audio, filename="audio.wav") for audio in (b"b", b"c", b"d", b"e")]
+    await asyncio.gather(first, *rest)
+
+    assert engine.batches == [[b"a"], [b"b", b"c", b"d"], [b"e"]]
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_expired_utterances_time_out_and_are_not_transcribed():
+    engine = FakeEngine(workers=1, delay=0.1)
+    batcher = BatchingSpeechToText(engine, max_batch_size=1, window=0.0, timeout=0.05)
+    batcher.start()
+
+    results = await asyncio.gather(
+        batcher.transcribe(b"a", filename="audio.wav"),
+        batcher.transcribe(b"b", filename="audio.wav"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, TimeoutError) for result in results)
+    await asyncio.sleep(0.1)
+    assert engine.batches == [[b"a"]], "An utterance expired in the queue should be dropped"
+    assert batcher.stats()["expired"] == 2
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_engine_errors_fail_every_utterance_of_the_batch(mocker):
+    engine = FakeEngine()
+    mocker.patch.object(engine, "transcribe_batch", side_effect=RuntimeError("worker died"))
+    batcher = BatchingSpeechToText(engine, max_batch_size=4, window=0.01)
+    batcher.start()
+
+    results = await asyncio.gather(
+        batcher.transcribe(b"a", filename="audio.wav"),
+        batcher.transcribe(b"b", filename="audio.wav"),
+        return_exceptions=True,
+    )
+
+    assert [str(result) for result in results] == ["worker died", "worker died"]
+    await batcher.close()
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from nlp_processor import local_stt
+from nlp_processor.local_stt import LocalSpeechToText
+
+FIXTURES = Path(__file__).parent / "fixtures" / "audio"
+
+
+class FakeWhisperModel:
+    def __init__(self) -> None:
+        self.calls: list[np.ndarray] = []
+
+    def transcribe(self, audio: np.ndarray, **kwargs):
+        self.calls.append(audio)
+        segments = (SimpleNamespace(text=text) for text in (" How much did I", " spend?"))
+        return segments, SimpleNamespace(language=kwargs["language"])
+
+
+@pytest.fixture
+def model(mocker) -> FakeWhisperModel:
+    model = FakeWhisperModel()
+    mocker.patch.object(local_stt, "_model", model)
+    return model
+
+
+@pytest.mark.asyncio
+async def test_utterances_are_decoded_and_transcribed_by_the_workers(model):
+    engine = LocalSpeechToText(workers=2, executor=ThreadPoolExecutor(max_workers=2))
+    await engine.start()
+    assert len(model.calls) == 2, "Each worker should warm up before serving utterances"
+
+    text = await engine.transcribe((FIXTURES / "speech.wav").read_bytes(), filename="speech.wav")
+
+    assert text == "How much did I spend?"
+    samples = model.calls[-1]
+    assert samples.dtype == np.float32 and np.abs(samples).max() <= 1.0, "The model expects float samples"
+    stats = engine.stats()
+    assert stats["transcriptions"] == 1
+    assert stats["audio_seconds_total"] == pytest.approx(len(samples) / 16000)
+    assert stats["real_time_factor"] == stats["inference_seconds_total"] / stats["audio_seconds_total"]
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_engine_needs_faster_whisper(mocker):
+    mocker.patch("importlib.util.find_spec", return_value=None)
+    engine = LocalSpeechToText()
+
+    with pytest.raises(RuntimeError, match="faster-whisper"):
+        await engine.start()
+    with pytest.raises(RuntimeError, match="not started"):
+        await engine.transcribe(b"", filename="audio.wav")
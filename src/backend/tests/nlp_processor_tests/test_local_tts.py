@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from nlp_processor import local_tts
+from nlp_processor.audio import decode_audio
+from nlp_processor.local_tts import (
+    SAMPLE_RATE,
+    LocalSpeechSynthesis,
+    encode_speech,
+)
+from nlp_processor.text_to_speech import TextToSpeech
+
+pytest.importorskip("piper")
+
+
+class FakePiperVoice:
+    def __init__(self) -> None:
+        self.config = SimpleNamespace(sample_rate=22050, length_scale=1.0)
+        self.calls: list[tuple[str, float]] = []
+
+    def synthesize(self, text: str, syn_config):
+        self.calls.append((text, syn_config.length_scale))
+        # a tenth of a second of tone per word, one chunk per sentence
+        for sentence in text.replace("!", ".").replace("?", ".").split("."):
+            if words := len(sentence.split()):
+                samples = np.sin(np.arange(2205 * words) / 5) * 8000
+                yield SimpleNamespace(audio_int16_array=samples.astype(np.int16))
+
+
+@pytest.fixture
+def voice(mocker) -> FakePiperVoice:
+    voice = FakePiperVoice()
+    mocker.patch.object(local_tts, "_voice", voice)
+    return voice
+
+
+@pytest.mark.asyncio
+async def test_segments_are_synthesized_by_the_workers_and_streamed_in_order(voice):
+    engine = LocalSpeechSynthesis("voice.onnx", workers=2, executor=ThreadPoolExecutor(max_workers=2))
+    await engine.start()
+    assert len(voice.calls) == 2, "Each worker should warm up before serving sentences"
+
+    tts = TextToSpeech(client=None, model_name="voice.onnx", response_format="pcm", max_concurrency=2, backend=engine)
+    async with tts:
+        await tts.submit("Your balance is fine!")
+        await tts.submit(" Did you spend ten pounds?")
+        await tts.end()
+        audio = b"".join([chunk async for chunk in tts.stream()])
+        assert tts.streamed_segments == ["Your balance is fine!", " Did you spend ten pounds?"]
+
+    # 9 words at a tenth of a second each, resampled to the rate of the OpenAI API
+    assert len(audio) == pytest.approx(0.9 * SAMPLE_RATE * 2, rel=0.01)
+    stats = engine.stats()
+    assert stats["syntheses"] == 2 and stats["audio_seconds_total"] == pytest.approx(0.9, rel=0.01)
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_speed_shortens_the_phonemes(voice):
+    engine = LocalSpeechSynthesis("voice.onnx", workers=1, executor=ThreadPoolExecutor(max_workers=1))
+    await engine.start()
+
+    async for _ in engine.synthesize("Hello.", "voice.onnx", "nova", "wav", speed=2.0, chunk_size=1024):
+        pass
+
+    assert voice.calls[-1] == ("Hello.", 0.5)
+    await engine.close()
+
+
+@pytest.mark.parametrize("response_format", ["mp3", "opus", "aac", "flac", "wav"])
+def test_speech_is_encoded_to_the_response_format(response_format):
+    samples = (np.sin(np.arange(SAMPLE_RATE) / 5) * 8000).astype(np.int16)
+
+    audio = encode_speech(samples, response_format)
+
+    decoded = decode_audio(audio, sample_rate=SAMPLE_RATE)
+    assert len(decoded) == pytest.approx(SAMPLE_RATE, rel=0.1)
+
+
+@pytest.mark.asyncio
+async def test_engine_needs_piper(mocker):
+    mocker.patch("importlib.util.find_spec", return_value=None)
+    engine = LocalSpeechSynthesis("voice.onnx")
+
+    with pytest.raises(RuntimeError, match="piper-tts"):
+        await engine.start()
+    with pytest.raises(RuntimeError, match="not started"):
+        async for _ in engine.synthesize("Hello.", "voice.onnx", "nova", "wav", 1.0, 1024):
+            pass
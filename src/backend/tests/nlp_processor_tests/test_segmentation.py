@@ -0,0 +1,61 @@
+from nlp_processor.segmentation import AdaptiveSegmenter, FixedSegmenter
+
+
+def segment(segmenter, deltas: list[str]) -> list[str]:
+    segments = []
+    for delta in deltas:
+        segments.extend(segmenter.push(delta))
+    if rest := segmenter.flush():
+        segments.append(rest)
+    return segments
+
+
+def test_fixed_segmenter_keeps_legacy_behaviour():
+    segmenter = FixedSegmenter(buffer_size=10)
+
+    assert segmenter.push("Hi") == []
+    assert segmenter.push("!") == ["Hi!"], "A sentence ending should flush the buffer"
+    assert segmenter.push("0123456789") == ["0123456789"], "A full buffer should be flushed"
+    assert segmenter.flush() == ""
+
+
+def test_first_segment_is_cut_at_the_first_clause_boundary():
+    segmenter = AdaptiveSegmenter()
+
+    assert segmenter.push("Sure thing, here") == ["Sure thing,"], "The first clause should be spoken right away"
+    assert segmenter.push(" are your transactions") == [], "Later segments should wait for a sentence boundary"
+
+
+def test_first_segment_is_cut_after_max_words_without_boundary():
+    segmenter = AdaptiveSegmenter(first_max_words=4)
+
+    assert segmenter.push("Your five most recent transactions") == ["Your five most recent"]
+
+
+def test_amounts_decimals_and_abbreviations_are_never_split():
+    segmenter = AdaptiveSegmenter(min_chars=1)
+    deltas = ["You spent", " 1", ",", "234", ".", "50 at Dr", ". Smith's", " clinic", ".", " That", " is all."]
+
+    segments = segment(segmenter, deltas)
+
+    assert segments == ["You spent 1,234.50 at Dr. Smith's clinic.", "That is all."]
+
+
+def test_segments_grow_progressively():
+    segmenter = AdaptiveSegmenter(min_chars=20, growth=2.0, max_chars=1000)
+    text = "Okay. " + " ".join(f"Sentence number {i} is here." for i in range(12))
+
+    segments = segment(segmenter, [word + " " for word in text.split()])
+
+    assert segments[0] == "Okay."
+    assert len(segments[1]) >= 20 and len(segments[2]) >= 40, "Each segment should be at least as long as the growing minimum"
+    assert " ".join(segments) == text, "No text should be lost or reordered"
+
+
+def test_long_text_without_boundaries_is_cut_at_max_chars():
+    segmenter = AdaptiveSegmenter(max_chars=30)
+    segmenter.push("Hello. ")
+
+    segments = segmenter.push("word " * 20)
+
+    assert segments and all(len(s) <= 30 for s in segments), "Segments should not exceed max_chars"
@@ -0,0 +1,127 @@
+import asyncio
+import wave
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+from nlp_processor.streaming_stt import StreamingTranscriber, pcm_to_wav
+from nlp_processor.vad import Endpointer
+
+SAMPLE_RATE = 16000
+
+
+def recording(*segments: tuple[str, float]) -> bytes:
+    """ Synthetic recording of ("speech" | "silence", seconds) segments, as 16-bit PCM. """
+    rng = np.random.default_rng(0)
+    parts = []
+    for kind, seconds in segments:
+        n = int(SAMPLE_RATE * seconds)
+        if kind == "speech":
+            t = np.arange(n) / SAMPLE_RATE
+            parts.append(0.3 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t)))
+        else:
+            parts.append(0.001 * rng.standard_normal(n))
+    return (np.concatenate(parts) * 32767).astype("<i2").tobytes()
+
+
+class DurationTranscriber:
+    """ Local stand-in transcriber describing the duration of the audio it receives. """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        with wave.open(BytesIO(audio_data)) as wav:
+            return f"{wav.getnframes() / wav.getframerate():.1f}s"
+
+
+async def stream(transcriber: StreamingTranscriber, pcm: bytes, frame_ms: int = 20) -> list:
+    frame_bytes = SAMPLE_RATE * 2 * frame_ms // 1000
+    for start in range(0, len(pcm), frame_bytes):
+        transcriber.feed(pcm[start : start + frame_bytes])
+        await asyncio.sleep(0)
+    await transcriber.close()
+    return [t async for t in transcriber.transcripts()]
+
+
+def test_pcm_to_wav_round_trip():
+    pcm = recording(("speech", 0.1))
+
+    with wave.open(BytesIO(pcm_to_wav(pcm, SAMPLE_RATE))) as wav:
+        assert wav.getframerate() == SAMPLE_RATE and wav.getnchannels() == 1
+        assert wav.readframes(wav.getnframes()) == pcm
+
+
+def test_endpointer_detects_start_and_end_of_speech():
+    endpointer = Endpointer(sample_rate=SAMPLE_RATE)
+
+    frames = endpointer.process(recording(("silence", 0.5), ("speech", 1.0), ("silence", 1.0)))
+    events = [(i * 20, f.event) for i, f in enumerate(frames) if f.event]
+
+    assert [e for _, e in events] == ["start", "end"]
+    assert 500 <= events[0][0] <= 600, "Speech should start shortly after the silence"
+    assert 2000 <= events[1][0] <= 2200, "Speech should end after the end-of-speech silence"
+
+
+@pytest.mark.asyncio
+async def test_partials_are_emitted_while_speaking_and_finals_on_end_of_speech():
+    backend = DurationTranscriber()
+    transcriber = StreamingTranscriber(backend=backend, sample_rate=SAMPLE_RATE, partial_interval_ms=500)
+    pcm = recording(("silence", 0.5), ("speech", 2.0), ("silence", 1.0), ("speech", 1.0), ("silence", 1.0))
+
+    transcripts = await stream(transcriber, pcm)
+
+    finals = [t.text for t in transcripts if t.is_final]
+    partials = [t.text for t in transcripts if not t.is_final]
+    assert len(finals) == 2, "Each utterance should be finalized once"
+    assert partials, "Partial transcripts should be emitted while the user is speaking"
+    assert 2.0 <= float(finals[0][:-1]) <= 2.5, "The final transcript should cover the speech and the pre-roll only"
+    assert transcripts[-1].is_final, "No partial should be emitted after its utterance is final"
+
+
+@pytest.mark.asyncio
+async def test_speculative_transcription_is_reused_as_final():
+    backend = DurationTranscriber()
+    transcriber = StreamingTranscriber(backend=backend, sample_rate=SAMPLE_RATE, partial_interval_ms=400)
+    pcm = recording(("silence", 0.3), ("speech", 0.8), ("silence", 1.2))
+
+    transcripts = await stream(transcriber, pcm)
+
+    assert [t.is_final for t in transcripts][-1]
+    assert transcriber.speculative_hits == 1, "A partial covering all the speech should be used as the final transcript"
+
+
+class SlowFinalTranscriber:
+    """ Stand-in transcriber telling utterances apart by loudness, slow on the whole first utterance. """
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    async def transcribe(self, audio_data: bytes, filename: str) -> str:
+        with wave.open(BytesIO(audio_data)) as wav:
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+            duration = wav.getnframes() / wav.getframerate()
+        if np.abs(samples).max() > 0.5 * 32767:
+            return "second"
+        if duration >= 2.0:
+            await asyncio.sleep(self.latency)
+        return "first"
+
+
+@pytest.mark.asyncio
+async def test_partials_are_not_emitted_before_the_previous_final():
+    transcriber = StreamingTranscriber(backend=SlowFinalTranscriber(latency=0.2), sample_rate=SAMPLE_RATE, partial_interval_ms=300)
+    loud = (np.frombuffer(recording(("speech", 1.5)), dtype="<i2") * 2).astype("<i2").tobytes()
+    pcm = recording(("silence", 0.5), ("speech", 2.0), ("silence", 1.0)) + loud + recording(("silence", 1.0))
+
+    transcripts = await stream(transcriber, pcm)
+
+    labels = [(t.text, t.is_final) for t in transcripts]
+    assert ("first", True) in labels and ("second", True) in labels
+    assert labels.index(("first", True)) < min(i for i, (text, _) in enumerate(labels) if text == "second"), (
+        "Transcripts of the next utterance should follow the final transcript of the previous one"
+    )
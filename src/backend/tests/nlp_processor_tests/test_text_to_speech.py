@@ -0,0 +1,175 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from nlp_processor.text_to_speech import TextToSpeech
+from nlp_processor.tts_cache import TTSCache
+
+
+class FakeAudioStream:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    async def iter_bytes(self, chunk_size: int):
+        for word in self.text.split():
+            yield word.encode()
+
+
+def fake_openai_client(latency: float):
+    """ Fake AsyncOpenAI client whose speech requests take `latency` seconds to start streaming. """
+    calls = SimpleNamespace(in_flight=0, max_in_flight=0)
+
+    @asynccontextmanager
+    async def create(model, input, voice, response_format, speed):
+        calls.in_flight += 1
+        calls.max_in_flight = max(calls.max_in_flight, calls.in_flight)
+        try:
+            await asyncio.sleep(latency)
+            yield FakeAudioStream(input)
+        finally:
+            calls.in_flight -= 1
+
+    client = SimpleNamespace(
+        audio=SimpleNamespace(
+            speech=SimpleNamespace(
+                with_streaming_response=SimpleNamespace(create=create)
+            )
+        )
+    )
+    return client, calls
+
+
+async def speak(tts: TextToSpeech, deltas: list[str]) -> list[bytes]:
+    async def feed():
+        for delta in deltas:
+            await tts.submit(delta)
+        await tts.end()
+
+    async with tts:
+        feeder = asyncio.create_task(feed())
+        audio = [chunk async for chunk in tts.stream()]
+        await feeder
+    return audio
+
+
+@pytest.mark.asyncio
+async def test_submitted_segments_are_synthesized_concurrently_and_streamed_in_order():
+    latency = 0.05
+    client, calls = fake_openai_client(latency=latency)
+    tts = TextToSpeech(client=client, model_name="tts-1", max_concurrency=4)
+    deltas = ["One?", " Two!", " Three;", " Four:", " Five"]
+
+    started = time.perf_counter()
+    audio = await speak(tts, deltas)
+    elapsed = time.perf_counter() - started
+
+    assert audio == [b"One?", b"Two!", b"Three;", b"Four:", b"Five"], "Audio should be streamed in submission order"
+    assert calls.max_in_flight > 1, "Segments should be synthesized concurrently"
+    assert elapsed < latency * len(deltas), "Concurrent synthesis should be faster than sequential synthesis"
+
+
+@pytest.mark.asyncio
+async def test_stream_keeps_the_segments_whose_audio_was_delivered():
+    client, _ = fake_openai_client(latency=0)
+    tts = TextToSpeech(client=client, model_name="tts-1", max_concurrency=3)
+
+    async with tts:
+        for delta in ["One?", " Two!", " Three"]:
+            await tts.submit(delta)
+        await tts.end()
+        stream = tts.stream()
+        assert await anext(stream) == b"One?"
+        assert tts.streamed_segments == [], "A segment counts once all its audio was delivered"
+        assert await anext(stream) == b"Two!"
+        assert tts.streamed_segments == ["One?"]
+        await stream.aclose()
+
+    assert tts.streamed_segments == [], "Leaving the context should reset the delivered segments"
+
+
+@pytest.mark.asyncio
+async def test_leaving_the_context_waits_for_the_cancelled_syntheses():
+    client, calls = fake_openai_client(latency=10)
+    tts = TextToSpeech(client=client, model_name="tts-1", max_concurrency=2)
+
+    async with tts:
+        await tts.submit("One? Two!")
+        await tts.end()
+        await asyncio.sleep(0.01)
+        segments = []
+        while (segment := tts._segments.get_nowait()) is not None:
+            segments.append(segment)
+        tasks = set(tts._tasks)
+        assert tasks and calls.in_flight == len(tasks)
+
+    assert all(task.cancelled() for task in tasks), "The syntheses should be stopped on exit"
+    assert calls.in_flight == 0, "The requests of the cancelled syntheses should be closed"
+    assert all(audio.empty() for _, audio in segments), "A cancelled synthesis should not end its segment"
+
+
+@pytest.mark.asyncio
+async def test_in_flight_segments_are_bounded_by_max_concurrency():
+    client, calls = fake_openai_client(latency=0.01)
+    tts = TextToSpeech(client=client, model_name="tts-1", max_concurrency=2)
+
+    audio = await speak(tts, [f"Segment {i}!" for i in range(6)])
+
+    assert len(audio) == 12, "All segments should be spoken"
+    assert calls.max_in_flight <= 2, "No more than max_concurrency requests should be in flight"
+
+
+@pytest.mark.asyncio
+async def test_synthesis_errors_are_raised_from_stream():
+    client, _ = fake_openai_client(latency=0)
+    client.audio.speech.with_streaming_response.create = None
+    tts = TextToSpeech(client=client, model_name="tts-1")
+
+    with pytest.raises(TypeError):
+        await speak(tts, ["Hello!"])
+
+
+@pytest.mark.asyncio
+async def test_submit_fails_fast_once_the_stream_has_failed():
+    client, _ = fake_openai_client(latency=0)
+    create = client.audio.speech.with_streaming_response.create
+
+    @asynccontextmanager
+    async def rate_limited(model, input, **kwargs):
+        if input.startswith("Segment 0"):
+            raise ConnectionError("429 Too Many Requests")
+        async with create(model=model, input=input, **kwargs) as stream:
+            yield stream
+
+    client.audio.speech.with_streaming_response.create = rate_limited
+    tts = TextToSpeech(client=client, model_name="tts-1", max_concurrency=2)
+
+    async def consume():
+        async for _ in tts.stream():
+            pass
+
+    async with tts:
+        consumer = asyncio.create_task(consume())
+        with pytest.raises(ConnectionError):
+            async with asyncio.timeout(1):
+                for i in range(6):
+                    await tts.submit(f"Segment {i}!")
+                await tts.end()
+        with pytest.raises(ConnectionError):
+            await consumer
+
+
+@pytest.mark.asyncio
+async def test_cached_phrases_are_not_synthesized_again():
+    client, _ = fake_openai_client(latency=0)
+    cache = TTSCache(max_bytes=1024)
+    tts = TextToSpeech(client=client, model_name="tts-1", cache=cache)
+    await tts.warm_up(["I am here to help you with your banking."])
+
+    client.audio.speech.with_streaming_response.create = None
+    audio = await speak(tts, ["I am here to help you with your banking."])
+
+    assert b"".join(audio) == b"Iamheretohelpyouwithyourbanking.", "Cached audio should be streamed"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
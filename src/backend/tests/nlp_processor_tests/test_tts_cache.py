@@ -0,0 +1,65 @@
+import pytest
+
+from nlp_processor.tts_cache import TTSCache
+
+
+def test_key_depends_on_every_synthesis_parameter():
+    key = TTSCache.key("Hello!", "tts-1", "nova", "aac", 1.0)
+
+    assert key == TTSCache.key(" Hello! ", "tts-1", "nova", "aac", 1.0), "Surrounding whitespace should not matter"
+    assert key != TTSCache.key("Hello!", "tts-1", "alloy", "aac", 1.0)
+    assert key != TTSCache.key("Hello!", "tts-1", "nova", "mp3", 1.0)
+    assert key != TTSCache.key("Hello!", "tts-1", "nova", "aac", 1.25)
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entries_are_evicted_by_size():
+    cache = TTSCache(max_bytes=10)
+    await cache.store("a", b"1234")
+    await cache.store("b", b"1234")
+    assert await cache.load("a") == b"1234"
+
+    await cache.store("c", b"1234")
+
+    assert await cache.load("b") is None, "The least recently used entry should be evicted"
+    assert await cache.load("a") == b"1234" and await cache.load("c") == b"1234"
+    assert cache.stats() == {
+        "hits": 3,
+        "disk_hits": 0,
+        "misses": 1,
+        "bytes_served": 12,
+        "entries": 2,
+        "memory_bytes": 8,
+        "disk_bytes": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restarts(tmp_path):
+    await TTSCache(max_bytes=1024, directory=tmp_path).store("key", b"audio")
+
+    cache = TTSCache(max_bytes=1024, directory=tmp_path)
+
+    assert await cache.load("key") == b"audio", "Audio should be read back from disk"
+    assert cache.stats()["disk_hits"] == 1
+    assert await cache.load("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_prunes_least_recently_used_files(tmp_path):
+    cache = TTSCache(max_bytes=1, directory=tmp_path, max_disk_bytes=10)
+    await cache.store("a", b"1234")
+    await cache.store("b", b"1234")
+    assert await cache.load("a") == b"1234"
+
+    await cache.store("c", b"1234")
+
+    assert await cache.load("b") is None, "The least recently used file should be deleted"
+    assert await cache.load("a") == b"1234" and await cache.load("c") == b"1234"
+    assert cache.stats()["disk_bytes"] == 8
+    assert sorted(p.name for p in tmp_path.glob("*/*")) == ["a", "c"]
+
+    restarted = TTSCache(max_bytes=1, directory=tmp_path, max_disk_bytes=10)
+    await restarted.store("d", b"1234")
+
+    assert sorted(p.name for p in tmp_path.glob("*/*")) == ["c", "d"], "The budget should hold across restarts"
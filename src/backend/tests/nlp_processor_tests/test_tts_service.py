@@ -0,0 +1,56 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from nlp_processor.text_to_speech import (
+    OpenAISpeechSynthesis,
+    SynthesisLimiter,
+    TextToSpeech,
+)
+from nlp_processor.tts_service import TTSService
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_syntheses_beyond_the_cap():
+    limiter = SynthesisLimiter(max_concurrent=2)
+    max_active = 0
+    queue_depths = []
+
+    async def synthesize():
+        nonlocal max_active
+        async with limiter.slot():
+            max_active = max(max_active, limiter.active)
+            queue_depths.append(limiter.waiting)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(synthesize() for _ in range(6)))
+
+    assert max_active == 2, "No more than max_concurrent syntheses should run at once"
+    assert max(queue_depths) > 0, "Syntheses beyond the cap should be queued"
+    assert limiter.acquired == 6 and limiter.waiting == 0 and limiter.active == 0
+    assert limiter.max_wait > 0
+
+
+@pytest.mark.asyncio
+async def test_handlers_are_recycled_between_leases():
+    limiter = SynthesisLimiter(max_concurrent=1)
+    client = MagicMock()
+    client.close = AsyncMock()
+    service = TTSService(
+        backend=OpenAISpeechSynthesis(client),
+        handler_factory=lambda: TextToSpeech(client=client, model_name="tts-1", limiter=limiter),
+        limiter=limiter,
+        max_idle_handlers=1,
+    )
+
+    async with service.lease() as first:
+        assert service.stats()["handlers_leased"] == 1
+    async with service.lease() as second:
+        pass
+
+    assert first is second, "An idle handler should be reused"
+    assert service.stats()["leases"] == 2 and service.stats()["handlers_idle"] == 1
+
+    await service.close()
+    client.close.assert_awaited_once()
@@ -6,6 +6,8 @@ import ChatContainer from './components/ChatContainer.tsx';
 import './App.css';
 import welcomeLlama from './welcome_llama.png';
 
+const AUDIO_MIME_TYPE: string = 'audio/webm;codecs=opus';
+
 const App: FC = () => {
   const [statusMessage, setStatusMessage] = useState<string>('Click to start recording');
   const [isRecording, setIsRecording] = useState<boolean>(false);
@@ -17,9 +19,11 @@ const App: FC = () => {
   const audioContextRef = useRef<AudioContext | null>(null);
   const audioQueueRef = useRef<Array<ArrayBuffer>>([]);
   const isPlayingRef = useRef<boolean>(false);
+  const currentSourceRef = useRef<AudioBufferSourceNode | null>(null);
+  const playbackEpochRef = useRef<number>(0);
 
   const initializeWebSocket = (): void => {
-    const ws: WebSocket = new WebSocket(`ws://localhost:8000/voice_stream`);
+    const ws: WebSocket = new WebSocket(`ws://localhost:8000/voice_stream?audio_mime=${encodeURIComponent(AUDIO_MIME_TYPE)}`);
     ws.binaryType = 'arraybuffer';
 
     ws.onopen = () => {
@@ -31,13 +35,14 @@ const App: FC = () => {
       if (event.data instanceof ArrayBuffer) {
         const arrayBuffer: ArrayBuffer = event.data;
         if (arrayBuffer.byteLength > 0) {
-          setButtonDisabled(true);
           audioQueueRef.current.push(arrayBuffer);
           if (!isPlayingRef.current) {
             isPlayingRef.current = true;
             processAudioQueue();
           }
         }
+      } else if (typeof event.data === 'string' && event.data.startsWith('Control: ')) {
+        handleControlMessage(event.data.slice(9));
       } else if (typeof event.data === 'string') {
         const sender: string = event.data.slice(0, 5);
         const content: string = event.data.slice(6);
@@ -68,6 +73,26 @@ const App: FC = () => {
     websocketRef.current = ws;
   };
 
+  const handleControlMessage = (control: string): void => {
+    if (control === 'no_speech') {
+      setButtonDisabled(false);
+      setStatusMessage('No speech detected. Click to start recording');
+    } else if (control === 'stop_playback') {
+      stopPlayback();
+    }
+  };
+
+  const stopPlayback = (): void => {
+    audioQueueRef.current = [];
+    isPlayingRef.current = false;
+    playbackEpochRef.current += 1;
+    if (currentSourceRef.current) {
+      currentSourceRef.current.onended = null;
+      currentSourceRef.current.stop();
+      currentSourceRef.current = null;
+    }
+  };
+
   const processAudioQueue = (): void => {
     if (audioQueueRef.current.length === 0) {
       isPlayingRef.current = false;
@@ -75,6 +100,7 @@ const App: FC = () => {
     }
 
     const arrayBuffer: ArrayBuffer = audioQueueRef.current.shift()!;
+    const epoch: number = playbackEpochRef.current;
 
     if (!audioContextRef.current) {
       audioContextRef.current = new (window.AudioContext || window.AudioContext)();
@@ -82,14 +108,20 @@ const App: FC = () => {
 
     if (audioContextRef.current) {
       audioContextRef.current.decodeAudioData(arrayBuffer).then((audioBuffer: AudioBuffer) => {
+        if (epoch !== playbackEpochRef.current) {
+          // playback was stopped while decoding
+          return;
+        }
         const source: AudioBufferSourceNode = audioContextRef.current!.createBufferSource();
         source.buffer = audioBuffer;
         if (audioContextRef.current) {
           source.connect(audioContextRef.current.destination);
         }
         source.onended = () => {
+          currentSourceRef.current = null;
           processAudioQueue();
         };
+        currentSourceRef.current = source;
         source.start(0);
       }).catch((error: Error) => {
         console.error('Error decoding audio data:', error);
@@ -110,7 +142,7 @@ const App: FC = () => {
         setStatusMessage('Recording...');
         setIsRecording(true);
 
-        const mimeType: string = 'audio/webm;codecs=opus';
+        const mimeType: string = AUDIO_MIME_TYPE;
         
         if (!MediaRecorder.isTypeSupported(mimeType)) {
           throw new Error(`${mimeType} is not supported on your browser.`);